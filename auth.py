@@ -1,18 +1,23 @@
 # auth.py - Sistema de autenticación completo (CORREGIDO)
 
 from datetime import datetime, timedelta, timezone  # ✅ Agregar timezone
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+import hashlib
+import time
 import uuid
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
 
-from db import get_db
-from models import Usuario
+from cache import TTLCache
+from repositories import users
+from hashing import hash_pool, HashPoolSaturado
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from models import Usuario
 
 load_dotenv()
 
@@ -24,8 +29,23 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 días
 
-# Contexto para hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cuánto se cachea la token_version de cada usuario: es el retraso máximo con
+# que otra instancia ve un token revocado (esta instancia lo ve al momento)
+TOKEN_VERSION_TTL = float(os.getenv("TOKEN_VERSION_TTL", "30"))  # segundos
+TOKEN_VERSION_CACHE_MAXSIZE = int(os.getenv("TOKEN_VERSION_CACHE_MAXSIZE", "4096"))
+
+# Tokens ya verificados que se recuerdan (la SPA envía el mismo en cada llamada)
+JWT_CACHE_MAXSIZE = int(os.getenv("JWT_CACHE_MAXSIZE", "2048"))
+
+# Contexto para hashing de contraseñas (passlib se carga en el primer hash)
+_pwd_context = None
+
+def _contexto_hash():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 # Security scheme para tokens Bearer
 security = HTTPBearer()
@@ -36,11 +56,32 @@ security = HTTPBearer()
 
 def hash_password(password: str) -> str:
     """Hashea una contraseña usando bcrypt"""
-    return pwd_context.hash(password)
+    return _contexto_hash().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica que una contraseña coincida con su hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _contexto_hash().verify(plain_password, hashed_password)
+
+def _pool_saturado() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": "1"},
+    )
+
+async def hash_password_async(password: str) -> str:
+    """hash_password en el pool de bcrypt (no bloquea el event loop)"""
+    try:
+        return await hash_pool.run(hash_password, password)
+    except HashPoolSaturado:
+        raise _pool_saturado()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password en el pool de bcrypt (no bloquea el event loop)"""
+    try:
+        return await hash_pool.run(verify_password, plain_password, hashed_password)
+    except HashPoolSaturado:
+        raise _pool_saturado()
 
 # ========================================
 # FUNCIONES JWT
@@ -75,27 +116,156 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     
     return encoded_jwt
 
+# sha256(token) -> payload; cada entrada caduca con el "exp" de su token
+_jwt_cache = TTLCache(maxsize=JWT_CACHE_MAXSIZE, ttl=0)
+
 def decode_access_token(token: str) -> Optional[dict]:
     """
     Decodifica y valida un token JWT
     
+    Los tokens válidos se guardan (por su sha256) hasta su ``exp``: las
+    llamadas siguientes con el mismo token no repiten la verificación HS256.
+    Un token inválido nunca se cachea.
+    
     Args:
         token: Token JWT a decodificar
         
     Returns:
-        Payload del token si es válido, None si es inválido
+        Payload del token si es válido, None si es inválido o expiró
     """
+    clave = hashlib.sha256(token.encode()).digest()
+    payload = _jwt_cache.get(clave)
+    if payload is not None:
+        # Doble comprobación con el reloj de pared (la caché usa monotonic)
+        if payload["exp"] > time.time():
+            return dict(payload)
+        _jwt_cache.invalidate(clave)
+        return None
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
 
+    # TTLCache no devuelve entradas vencidas: la entrada muere con el token
+    restante = payload.get("exp", 0) - time.time()
+    if restante > 0:
+        _jwt_cache.set(clave, payload, ttl=restante)
+    return dict(payload)
+
+def jwt_cache_stats() -> dict:
+    """Métricas de la caché de tokens verificados"""
+    return _jwt_cache.stats()
+
+# ========================================
+# TOKENS CON CLAIMS (SIN CONSULTA POR PETICIÓN)
+# ========================================
+
+# user_id -> token_version vigente (None si el usuario ya no existe)
+_token_versions = TTLCache(maxsize=TOKEN_VERSION_CACHE_MAXSIZE, ttl=TOKEN_VERSION_TTL)
+_SIN_CACHE = object()
+
+def create_user_token(user: dict) -> str:
+    """
+    Crea un token Bearer con los datos de sesión del usuario como claims
+
+    Incluye ``ver`` (token_version): al cambiar contraseña o email se
+    incrementa en la base de datos y los tokens anteriores dejan de valer.
+    """
+    return create_access_token(data={
+        "sub": str(user["id"]),
+        "email": user["email"],
+        "nombre": user["nombre"],
+        "rol": user.get("rol"),
+        "email_verified": user.get("email_verified", False),
+        "ver": user.get("token_version") or 0,
+    })
+
+def next_token_version(user: dict) -> int:
+    """token_version a guardar para revocar los tokens emitidos hasta ahora"""
+    return (user.get("token_version") or 0) + 1
+
+# Campos del usuario que viajan como claims en create_user_token
+CLAIMS_USUARIO = ("email", "nombre", "rol", "email_verified")
+
+def con_token_version(user: dict, updates: dict) -> dict:
+    """
+    ``updates`` con la token_version incrementada si cambia algún claim
+
+    Así ningún token sigue circulando con datos viejos (p.ej.
+    email_verified=False); quien hizo el cambio recibe uno nuevo.
+    """
+    if any(campo in updates and updates[campo] != user.get(campo) for campo in CLAIMS_USUARIO):
+        return {**updates, "token_version": next_token_version(user)}
+    return updates
+
+def invalidate_token_version(user_id: str):
+    """Olvida la versión cacheada (tras cambiar contraseña/email o borrar la cuenta)"""
+    _token_versions.invalidate(str(user_id))
+
+async def _token_version(user_id: str) -> Optional[int]:
+    """token_version vigente del usuario, cacheada TOKEN_VERSION_TTL segundos"""
+    version = _token_versions.get(user_id, _SIN_CACHE)
+    if version is _SIN_CACHE:
+        user = await users.get_by_id(user_id)
+        version = (user.get("token_version") or 0) if user else None
+        _token_versions.set(user_id, version)
+    return version
+
+def _user_from_claims(payload: dict) -> dict:
+    return {
+        "id": payload["sub"],
+        "email": payload.get("email"),
+        "nombre": payload.get("nombre"),
+        "rol": payload.get("rol"),
+        "email_verified": payload.get("email_verified", False),
+    }
+
+async def get_user_from_token(token: str) -> Optional[dict]:
+    """
+    Valida un token Bearer y devuelve los datos de sesión del usuario
+
+    Con claims (``ver``) no consulta la base de datos salvo para refrescar
+    la token_version cacheada. Los tokens antiguos, solo con ``sub``, se
+    resuelven buscando al usuario como antes.
+
+    Returns:
+        Dict de sesión (id, email, nombre, rol, email_verified) o None
+    """
+    payload = decode_access_token(token)
+    if not payload:
+        return None
+
+    try:
+        user_id = str(uuid.UUID(payload.get("sub")))
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+    if "ver" in payload:
+        if await _token_version(user_id) != payload["ver"]:
+            return None
+        return _user_from_claims(payload)
+
+    user = await users.get_by_id(user_id)
+    if not user:
+        return None
+    return {
+        "id": str(user["id"]),
+        "email": user["email"],
+        "nombre": user["nombre"],
+        "rol": user.get("rol"),
+        "email_verified": user.get("email_verified", False),
+    }
+
+def token_version_stats() -> dict:
+    """Métricas de la caché de token_version"""
+    return _token_versions.stats()
+
 # ========================================
 # AUTENTICACIÓN DE USUARIO
 # ========================================
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuario]:
+def authenticate_user(db: "Session", email: str, password: str) -> Optional["Usuario"]:
     """
     Autentica un usuario por email y contraseña
     
@@ -107,6 +277,8 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuari
     Returns:
         Usuario si las credenciales son correctas, None si no
     """
+    from models import Usuario
+
     usuario = db.query(Usuario).filter(Usuario.email == email).first()
     
     if not usuario:
@@ -122,22 +294,20 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuari
 # ========================================
 
 async def get_current_user_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Usuario:
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
     """
     Obtiene el usuario actual desde un token Bearer
     Usado para endpoints API que requieren autenticación
     
     Args:
         credentials: Credenciales HTTP Bearer (token)
-        db: Sesión de base de datos
         
     Returns:
-        Usuario autenticado
+        Datos de sesión del usuario (id, email, nombre, rol, email_verified)
         
     Raises:
-        HTTPException: Si el token es inválido o el usuario no existe
+        HTTPException: Si el token es inválido, fue revocado o el usuario no existe
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -145,24 +315,8 @@ async def get_current_user_token(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    
-    if payload is None:
-        raise credentials_exception
-    
-    user_id_str: str = payload.get("sub")
-    if user_id_str is None:
-        raise credentials_exception
-    
-    # ✅ Convertir string de vuelta a UUID
-    try:
-        user_uuid = uuid.UUID(user_id_str)
-    except (ValueError, AttributeError, TypeError):
-        raise credentials_exception
-    
-    # ✅ Buscar usuario por UUID correcto
-    usuario = db.query(Usuario).filter(Usuario.id == user_uuid).first()
+    # ✅ Validación local: claims firmados + token_version cacheada
+    usuario = await get_user_from_token(credentials.credentials)
     
     if usuario is None:
         raise credentials_exception
@@ -213,14 +367,13 @@ def require_user_session(request: Request) -> dict:
 # AUTENTICACIÓN HÍBRIDA (TOKEN O SESIÓN)
 # ========================================
 
-def get_current_user_hybrid(request: Request, db: Session) -> Optional[dict]:
+async def get_current_user_hybrid(request: Request) -> Optional[dict]:
     """
     Obtiene el usuario actual desde token Bearer o sesión
     Intenta primero con sesión, luego con token
     
     Args:
         request: Request object de FastAPI
-        db: Sesión de base de datos
         
     Returns:
         Diccionario con datos del usuario si está autenticado, None si no
@@ -233,29 +386,7 @@ def get_current_user_hybrid(request: Request, db: Session) -> Optional[dict]:
     # Intentar obtener desde token Bearer
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
-        token = auth_header.split(" ")[1]
-        payload = decode_access_token(token)
-        
-        if payload:
-            user_id_str = payload.get("sub")
-            if user_id_str:
-                try:
-                    # ✅ Convertir string a UUID
-                    user_uuid = uuid.UUID(user_id_str)
-                    
-                    # ✅ Buscar usuario por UUID
-                    usuario = db.query(Usuario).filter(Usuario.id == user_uuid).first()
-                    
-                    if usuario:
-                        return {
-                            "id": str(usuario.id),  # ✅ Convertir UUID a string para JSON
-                            "email": usuario.email,
-                            "nombre": usuario.nombre,
-                            "rol": usuario.rol,
-                            "email_verificado": usuario.email_verified
-                        }
-                except (ValueError, AttributeError, TypeError):
-                    pass  # UUID inválido, ignorar
+        return await get_user_from_token(auth_header.split(" ")[1])
     
     return None
 
@@ -284,8 +415,8 @@ def require_admin(user: dict) -> dict:
     return user
 
 async def get_current_admin(
-    current_user: Usuario = Depends(get_current_user_token)
-) -> Usuario:
+    current_user: dict = Depends(get_current_user_token)
+) -> dict:
     """
     Obtiene el usuario actual y verifica que sea administrador
     Usado como dependencia en endpoints que requieren permisos de admin
@@ -299,7 +430,7 @@ async def get_current_admin(
     Raises:
         HTTPException: Si el usuario no es administrador
     """
-    if current_user.rol != "admin":
+    if current_user.get("rol") != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tiene permisos de administrador"
@@ -310,7 +441,7 @@ async def get_current_admin(
 # UTILIDADES
 # ========================================
 
-def create_user_session_data(usuario: Usuario) -> dict:
+def create_user_session_data(usuario: "Usuario") -> dict:
     """
     Crea un diccionario con los datos del usuario para almacenar en sesión
     
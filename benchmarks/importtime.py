@@ -0,0 +1,92 @@
+# benchmarks/importtime.py - Perfil de importación de main.py (arranque en frío) con presupuesto
+#
+# Uso (desde la raíz del proyecto, con el .env cargado):
+#   python benchmarks/importtime.py [--budget-ms 1500] [--runs 3] [--top 15]
+#
+# Ejecuta `python -X importtime -c "import main"` en un proceso limpio y
+# falla (exit 1) si:
+#   - el tiempo total de importación supera el presupuesto, o
+#   - se importa al arrancar algún módulo que debe cargarse solo al usarse
+#     (Pillow, SQLAlchemy, supabase, httpx, ...).
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuesto por defecto del import de main (ms); IMPORT_BUDGET_MS lo sobrescribe
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+# Paquetes que solo necesitan algunas rutas y no deben cargarse al arrancar
+MODULOS_DIFERIDOS = (
+    "PIL", "pillow_avif", "sqlalchemy", "asyncpg", "db", "models",
+    "supabase", "storage3", "httpx", "requests", "passlib", "resend",
+)
+
+
+def _importtime() -> List[Tuple[str, int, int]]:
+    """(módulo, self µs, acumulado µs) de cada import, en orden de aparición"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        sys.exit(f"❌ import main falló:\n{resultado.stderr[-2000:]}")
+
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|", 2)
+        # El nombre conserva la sangría (2 espacios por nivel de anidamiento)
+        filas.append((modulo[1:].rstrip(), int(propio), int(acumulado)))
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    mejor: Dict[str, int] = {}
+    total_ms = None
+    filas = []
+    for _ in range(args.runs):
+        filas = _importtime()
+        total = next(acumulado for modulo, _, acumulado in reversed(filas) if modulo.strip() == "main") / 1000
+        total_ms = total if total_ms is None else min(total_ms, total)
+        for modulo, _, acumulado in filas:
+            nombre = modulo.strip()
+            mejor[nombre] = min(mejor.get(nombre, acumulado), acumulado)
+
+    # Imports directos de main (un nivel de sangría) ordenados por coste
+    directos = sorted(
+        {modulo.strip() for modulo, _, _ in filas if modulo.startswith("  ") and not modulo.startswith("    ")},
+        key=lambda nombre: mejor[nombre], reverse=True,
+    )
+    print(f"\nimport main: {total_ms:.0f} ms (mejor de {args.runs}, presupuesto {args.budget_ms:.0f} ms)\n")
+    for nombre in directos[:args.top]:
+        print(f"  {mejor[nombre] / 1000:8.1f} ms  {nombre}")
+
+    cargados = {modulo.strip().split(".")[0] for modulo, _, _ in filas}
+    indebidos = sorted(set(MODULOS_DIFERIDOS) & cargados)
+
+    errores = []
+    if total_ms > args.budget_ms:
+        errores.append(f"import main tarda {total_ms:.0f} ms (> {args.budget_ms:.0f} ms)")
+    if indebidos:
+        errores.append(f"se importan al arrancar: {', '.join(indebidos)}")
+
+    if errores:
+        print("\n❌ " + "\n❌ ".join(errores))
+        sys.exit(1)
+    print("\n✅ Dentro del presupuesto y sin imports pesados al arrancar")
+
+
+if __name__ == "__main__":
+    main()
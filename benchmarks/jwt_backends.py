@@ -0,0 +1,59 @@
+# benchmarks/jwt_backends.py - Coste de verificar un token HS256: python-jose vs PyJWT vs caché
+#
+# Uso (desde la raíz del proyecto, con el .env cargado):
+#   python benchmarks/jwt_backends.py [iteraciones]
+#
+# PyJWT es opcional (pip install PyJWT); si no está instalado se omite.
+
+import os
+import sys
+import timeit
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt as jose_jwt  # noqa: E402
+
+import auth  # noqa: E402
+
+try:
+    import jwt as pyjwt
+except ImportError:
+    pyjwt = None
+
+
+def main(iteraciones: int = 20000):
+    token = auth.create_access_token(
+        {
+            "sub": "7f1d3c5e-2b8a-4c6d-9e0f-1a2b3c4d5e6f",
+            "email": "cliente@example.com",
+            "nombre": "Cliente",
+            "rol": "usuario",
+            "email_verified": True,
+            "ver": 0,
+        },
+        expires_delta=timedelta(hours=1),
+    )
+
+    casos = {
+        "python-jose": lambda: jose_jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]),
+    }
+    if pyjwt is not None:
+        casos["PyJWT"] = lambda: pyjwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    # Primera llamada verifica y cachea; el resto son aciertos
+    auth.decode_access_token(token)
+    casos["decode_access_token (caché)"] = lambda: auth.decode_access_token(token)
+
+    print(f"\n{iteraciones} verificaciones del mismo token\n")
+    base = None
+    for nombre, fn in casos.items():
+        segundos = min(timeit.repeat(fn, number=iteraciones, repeat=3))
+        por_llamada = segundos / iteraciones * 1_000_000
+        base = base or por_llamada
+        print(f"  {nombre:<30} {por_llamada:8.2f} µs/llamada   x{base / por_llamada:.1f}")
+
+    print(f"\n  Caché: {auth.jwt_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,138 @@
+# cache.py - Caché en memoria (TTL + LRU) para el catálogo público
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))  # segundos
+CATALOG_CACHE_MAXSIZE = int(os.getenv("CATALOG_CACHE_MAXSIZE", "256"))  # entradas
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración (TTL), tamaño máximo y desalojo LRU
+
+    Es local a cada proceso: en Vercel cada instancia caliente tiene la suya,
+    por eso el TTL acota cuánto puede tardar en verse un cambio hecho desde
+    otra instancia. Las escrituras hechas en esta instancia invalidan al
+    momento.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Devuelve el valor si existe y no ha expirado"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Guarda un valor; desaloja el menos usado si se supera maxsize"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Elimina una clave"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Elimina todas las claves que cumplan el predicado"""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para monitorear la tasa de aciertos"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# Instancia global del catálogo
+catalog_cache = TTLCache(maxsize=CATALOG_CACHE_MAXSIZE, ttl=CATALOG_CACHE_TTL)
+
+# ========================================
+# CLAVES E INVALIDACIÓN DEL CATÁLOGO
+# ========================================
+# ("productos", categoria, destacado, activo, skip, limit, *extra) -> lista o sobre
+# ("producto", producto_id)                                 -> detalle
+# ("categorias",)                                           -> lista de categorías
+# ("carrusel", activo)                                      -> items del carrusel
+
+def productos_key(categoria, destacado, activo, skip, limit, *extra) -> tuple:
+    """
+    Clave de un listado de productos según su tupla de filtros
+
+    ``extra`` agrega filtros opcionales (orden, rangos, count...) al final
+    para que la categoría siga en la posición 1 al invalidar.
+    """
+    return ("productos", categoria, destacado, activo, skip, limit, *extra)
+
+def invalidate_productos(*categorias: Optional[str], producto_id: Optional[str] = None) -> int:
+    """
+    Invalida lo afectado por una escritura de productos
+
+    Elimina el detalle del producto, los listados de las categorías indicadas
+    (la anterior y la nueva si cambió), los listados sin filtro de categoría
+    (p.ej. destacados) y la lista de categorías.
+    """
+    afectadas = {c for c in categorias if c}
+
+    def afectada(key) -> bool:
+        if key[0] == "productos":
+            return key[1] is None or key[1] in afectadas
+        if key[0] == "producto":
+            return producto_id is not None and key[1] == producto_id
+        return key[0] == "categorias"
+
+    return catalog_cache.invalidate_where(afectada)
+
+def invalidate_carrusel() -> int:
+    """Invalida los listados del carrusel"""
+    return catalog_cache.invalidate_where(lambda key: key[0] == "carrusel")
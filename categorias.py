@@ -0,0 +1,89 @@
+# categorias.py - Registro de categorías (slug → valor en BD → nombre → orden) y sus conteos
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cache import catalog_cache
+from repositories import products
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# Una categoría nueva solo necesita una entrada en este archivo:
+#   slug    ruta pública (/<slug>)
+#   valor   columna productos.categoria
+#   nombre  nombre visible
+#   orden   posición en menús y listados
+#   imagen  portada en "Nuestras colecciones" (ruta dentro de /static)
+CATEGORIAS_FILE = os.getenv("CATEGORIAS_FILE", str(Path(__file__).resolve().parent / "categorias.json"))
+
+# Rutas de una sola parte que ya usa la aplicación: un slug no puede taparlas
+_SLUGS_RESERVADOS = {"api", "static", "login", "register", "logout", "perfil", "carrito", "admin", "producto", "health"}
+
+
+def _cargar(ruta: str) -> List[Dict[str, Any]]:
+    """Lee y valida el registro; un error aquí impide arrancar con rutas rotas"""
+    with open(ruta, encoding="utf-8") as f:
+        categorias = json.load(f)
+
+    slugs, valores = set(), set()
+    for categoria in categorias:
+        faltantes = {"slug", "valor", "nombre", "orden"} - categoria.keys()
+        if faltantes:
+            raise ValueError(f"Categoría {categoria} sin {', '.join(sorted(faltantes))}")
+        if categoria["slug"] in _SLUGS_RESERVADOS or categoria["slug"] in slugs:
+            raise ValueError(f"Slug de categoría reservado o repetido: {categoria['slug']}")
+        if categoria["valor"] in valores:
+            raise ValueError(f"Valor de categoría repetido: {categoria['valor']}")
+        slugs.add(categoria["slug"])
+        valores.add(categoria["valor"])
+
+    return sorted(categorias, key=lambda c: c["orden"])
+
+
+CATEGORIAS = _cargar(CATEGORIAS_FILE)
+_POR_SLUG = {c["slug"]: c for c in CATEGORIAS}
+_POR_VALOR = {c["valor"]: c for c in CATEGORIAS}
+
+
+def por_slug(slug: str) -> Optional[Dict[str, Any]]:
+    """Categoría de una ruta pública (None si no existe)"""
+    return _POR_SLUG.get(slug)
+
+
+def por_valor(valor: str) -> Optional[Dict[str, Any]]:
+    """Categoría de un valor de productos.categoria (None si no está registrada)"""
+    return _POR_VALOR.get(valor)
+
+
+# ========================================
+# CONTEOS
+# ========================================
+
+async def categorias_con_conteo() -> List[Dict[str, Any]]:
+    """
+    Registro completo con los productos activos de cada categoría
+
+    Los conteos se calculan juntos (una consulta limit=0 por categoría) y
+    se guardan en catalog_cache bajo ("categorias", ...): invalidate_productos
+    los descarta en cada escritura de productos.
+    """
+    cache_key = ("categorias", "conteo")
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    resultados = await asyncio.gather(*(
+        products.list_with_total({"categoria": c["valor"], "activo": True, "skip": 0, "limit": 0})
+        for c in CATEGORIAS
+    ))
+    categorias = [
+        {**categoria, "url": f"/{categoria['slug']}", "total": total or 0}
+        for categoria, (_, total) in zip(CATEGORIAS, resultados)
+    ]
+    catalog_cache.set(cache_key, categorias)
+    return categorias
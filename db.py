@@ -2,10 +2,14 @@
 
 from typing import Annotated
 from fastapi import Depends
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, exc, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 import os
+import time
+import uuid
+from urllib.parse import urlsplit, urlunsplit
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,12 +23,120 @@ DATABASE_URL = os.getenv("URL_DATABASE")
 if not DATABASE_URL:
     raise ValueError("❌ URL_DATABASE no está configurada en .env")
 
+# URL tal como viene del entorno (el motor async la adapta por su cuenta)
+DATABASE_URL_ORIGINAL = DATABASE_URL
+
 # Detectar entorno
 IS_VERCEL = os.getenv("VERCEL") is not None or os.getenv("ENVIRONMENT") == "production"
 
 print(f"🌐 Entorno: {'VERCEL (Production)' if IS_VERCEL else 'Local (Development)'}")
 print(f"🔗 Database URL: {DATABASE_URL[:50]}...")
 
+# ========================================
+# POOL DE CONEXIONES
+# ========================================
+
+# Pool pequeño por proceso: en una instancia "caliente" de Vercel las
+# conexiones se reutilizan entre peticiones en lugar de abrir TLS cada vez.
+# DB_POOL_MODE=null vuelve al comportamiento anterior (sin pool).
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "2" if IS_VERCEL else "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "2" if IS_VERCEL else "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5" if IS_VERCEL else "30"))
+
+# El pooler de Supabase (Supavisor) cierra clientes inactivos: se recicla antes
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300" if IS_VERCEL else "3600"))
+
+# Solo se hace ping al sacar una conexión que lleva este tiempo sin usarse
+# (sustituye al SELECT 1 que antes se ejecutaba en cada get_db)
+DB_PING_AFTER_IDLE = float(os.getenv("DB_PING_AFTER_IDLE", "30"))
+
+
+class _MedirEspera:
+    """Mide la espera por una conexión libre (mixin para las clases de pool)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.pings = 0
+        self.ping_failures = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            self.checkouts += 1
+            self.wait_total += espera
+            self.wait_max = max(self.wait_max, espera)
+
+
+class TimedQueuePool(_MedirEspera, QueuePool):
+    """QueuePool con métricas de espera"""
+
+
+class TimedAsyncQueuePool(_MedirEspera, AsyncAdaptedQueuePool):
+    """Pool del motor async (asyncpg) con métricas de espera"""
+
+
+def _registrar_ping_tras_inactividad(engine):
+    """Ping al hacer checkout solo si la conexión estuvo inactiva DB_PING_AFTER_IDLE"""
+
+    @event.listens_for(engine, "checkin")
+    def _al_devolver(dbapi_connection, connection_record):
+        connection_record.info["ultimo_uso"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _al_sacar(dbapi_connection, connection_record, connection_proxy):
+        ultimo_uso = connection_record.info.get("ultimo_uso")
+        if ultimo_uso is None or time.monotonic() - ultimo_uso < DB_PING_AFTER_IDLE:
+            return
+        pool = engine.pool
+        pool.pings += 1
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            pool.ping_failures += 1
+            # El pool descarta esta conexión y reintenta con una nueva
+            raise exc.DisconnectionError()
+
+
+def _estadisticas_pool(pool) -> dict:
+    if not isinstance(pool, _MedirEspera):
+        return {"mode": "null"}
+    return {
+        "mode": "queue",
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checkouts": pool.checkouts,
+        "wait_avg_ms": round(pool.wait_total / pool.checkouts * 1000, 2) if pool.checkouts else None,
+        "wait_max_ms": round(pool.wait_max * 1000, 2),
+        "timeouts": pool.timeouts,
+        "pings": pool.pings,
+        "ping_failures": pool.ping_failures,
+    }
+
+
+def pool_stats() -> dict:
+    """Métricas del pool: conexiones en uso, overflow y espera por conexión"""
+    stats = _estadisticas_pool(engine.pool)
+    if _async_engine is not None:
+        stats["async"] = _estadisticas_pool(_async_engine.pool)
+    return stats
+
+
 # ========================================
 # 🔥 CONFIGURACIÓN PARA VERCEL - CRÍTICO
 # ========================================
@@ -45,21 +157,45 @@ if IS_VERCEL:
     
     DATABASE_URL += "sslmode=require&connect_timeout=10"
     
-    # 🔥 CRÍTICO: NullPool + configuración mínima
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,
-        poolclass=NullPool,  # ✅ NO mantener conexiones
-        connect_args={
-            "connect_timeout": 10,
-            "application_name": "aurum_vercel",
-            # 🔥 IMPORTANTE: Deshabilitar keepalives en Vercel
-            "keepalives": 0,
-        },
-        execution_options={
-            "isolation_level": "AUTOCOMMIT"
-        }
-    )
+    # psycopg2 no usa prepared statements del lado del servidor, así que es
+    # seguro con el pooler en modo transacción (6543). AUTOCOMMIT evita dejar
+    # transacciones abiertas que retengan la conexión del pooler.
+    if DB_POOL_MODE == "null":
+        engine = create_engine(
+            DATABASE_URL,
+            echo=False,
+            poolclass=NullPool,  # ✅ NO mantener conexiones
+            connect_args={
+                "connect_timeout": 10,
+                "application_name": "aurum_vercel",
+                "keepalives": 0,
+            },
+            execution_options={
+                "isolation_level": "AUTOCOMMIT"
+            }
+        )
+    else:
+        print(f"♻️ Pool por instancia: {DB_POOL_SIZE} (+{DB_MAX_OVERFLOW}), recycle {DB_POOL_RECYCLE}s")
+        engine = create_engine(
+            DATABASE_URL,
+            echo=False,
+            poolclass=TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_use_lifo=True,  # Reutiliza la más reciente; las demás caducan por recycle
+            connect_args={
+                "connect_timeout": 10,
+                "application_name": "aurum_vercel",
+                "keepalives": 1,
+                "keepalives_idle": 30,
+            },
+            execution_options={
+                "isolation_level": "AUTOCOMMIT"
+            }
+        )
+        _registrar_ping_tras_inactividad(engine)
     
 else:
     # 🏠 CONFIGURACIÓN PARA LOCAL
@@ -68,14 +204,16 @@ else:
     engine = create_engine(
         DATABASE_URL,
         echo=False,
-        pool_size=5,
-        max_overflow=10,
-        pool_pre_ping=True,
-        pool_recycle=3600,
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
         connect_args={
             "connect_timeout": 10,
         }
     )
+    _registrar_ping_tras_inactividad(engine)
 
 # ========================================
 # SESSION MAKER
@@ -96,12 +234,12 @@ def get_db():
     """
     Dependency para obtener sesión de DB
     ✅ Compatible con Vercel Serverless
+
+    La conexión se toma del pool al primer query; el ping solo ocurre si
+    estuvo inactiva (ver DB_PING_AFTER_IDLE).
     """
     db = SessionLocal()
     try:
-        # 🔥 Test rápido de conexión en Vercel
-        if IS_VERCEL:
-            db.execute(text("SELECT 1"))
         yield db
     except Exception as e:
         print(f"❌ Error en get_db: {e}")
@@ -111,6 +249,101 @@ def get_db():
 
 SessionDepends = Annotated[Session, Depends(get_db)]
 
+# ========================================
+# MOTOR ASYNC (asyncpg)
+# ========================================
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def _async_database_url() -> str:
+    """URL para asyncpg: mismo host (6543 en Vercel) y sin parámetros de libpq"""
+    partes = urlsplit(DATABASE_URL_ORIGINAL)
+    esquema = "postgresql+asyncpg"
+    netloc = partes.netloc
+    if IS_VERCEL:
+        netloc = netloc.replace(":5432", ":6543")
+    # sslmode/connect_timeout son de libpq; asyncpg los recibe en connect_args
+    return urlunsplit((esquema, netloc, partes.path, "", ""))
+
+
+def get_async_engine():
+    """
+    Motor async, creado en el primer uso (asyncpg solo se importa si hace falta)
+
+    Compatible con el pooler en modo transacción (pgbouncer / Supavisor):
+    sin caché de prepared statements y con nombres únicos por sentencia,
+    porque dos peticiones pueden caer en distintas conexiones del servidor.
+    """
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        connect_args = {
+            "timeout": 10,
+            "statement_cache_size": 0,  # caché de asyncpg
+            "prepared_statement_cache_size": 0,  # caché del adaptador de SQLAlchemy
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            "server_settings": {"application_name": "aurum_vercel" if IS_VERCEL else "aurum"},
+        }
+        if IS_VERCEL:
+            connect_args["ssl"] = "require"
+
+        opciones_pool = {"poolclass": NullPool} if IS_VERCEL and DB_POOL_MODE == "null" else {
+            "poolclass": TimedAsyncQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_use_lifo": True,
+        }
+
+        _async_engine = create_async_engine(
+            _async_database_url(),
+            echo=False,
+            connect_args=connect_args,
+            **opciones_pool,
+        )
+        if opciones_pool["poolclass"] is TimedAsyncQueuePool:
+            _registrar_ping_tras_inactividad(_async_engine.sync_engine)
+
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Nueva AsyncSession (equivalente async de SessionLocal)"""
+    get_async_engine()
+    return _AsyncSessionLocal()
+
+
+async def get_async_db():
+    """
+    Dependency async para obtener sesión de DB
+
+    No ocupa un hilo del threadpool mientras espera a la base de datos.
+    """
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    except Exception as e:
+        print(f"❌ Error en get_async_db: {e}")
+        raise
+    finally:
+        await db.close()
+
+
+async def dispose_async_engine():
+    """Cierra las conexiones del motor async (shutdown)"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+AsyncSessionDepends = Annotated[AsyncSession, Depends(get_async_db)]
+
 # ========================================
 # TEST DE CONEXIÓN
 # ========================================
@@ -3,13 +3,12 @@ email_service.py — Servicio de envío de correos con Resend
 Actualizado para usar dominio propio y mejorar compatibilidad.
 """
 
-import resend
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-resend.api_key = os.getenv("RESEND_API_KEY")
+RESEND_API_KEY = os.getenv("RESEND_API_KEY")
 
 # ── Configuración ──────────────────────────────────────────────────────────────
 # FROM_EMAIL debe ser una dirección verificada de tu dominio, p.ej.:
@@ -164,6 +163,9 @@ def _base_html(body_content: str) -> str:
 def _send(to_email: str, subject: str, html: str) -> bool:
     """Función interna para enviar el correo vía Resend."""
     try:
+        # resend (y requests) se importan al enviar el primer correo, no al arrancar
+        import resend
+        resend.api_key = RESEND_API_KEY
         resend.Emails.send({
             "from":    _from_header(),
             "to":      [to_email],
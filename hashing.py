@@ -0,0 +1,117 @@
+# hashing.py - Pool acotado de hilos para bcrypt (fuera del event loop)
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# bcrypt libera el GIL, así que un hilo por núcleo da paralelismo real
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Máximo de hashes en curso + en cola; por encima se responde 503
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+
+# Muestras recientes que se guardan para los percentiles
+HASH_METRICS_WINDOW = 512
+
+
+class HashPoolSaturado(RuntimeError):
+    """La cola del pool de hashing está llena"""
+
+
+class BoundedHashPool:
+    """
+    Ejecuta funciones costosas de CPU (bcrypt) en un ThreadPoolExecutor propio
+
+    Limita cuántas tareas pueden estar pendientes a la vez: si la cola está
+    llena se lanza ``HashPoolSaturado`` en lugar de acumular logins que
+    acabarían expirando. Mide la espera en cola y la duración de cada hash.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._queue_wait: Deque[float] = deque(maxlen=HASH_METRICS_WINDOW)
+        self._latency: Deque[float] = deque(maxlen=HASH_METRICS_WINDOW)
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Ejecuta ``fn(*args)`` en el pool sin bloquear el event loop
+
+        Raises:
+            HashPoolSaturado: Si ya hay ``max_pending`` tareas pendientes
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HashPoolSaturado("Demasiadas operaciones de autenticación en curso")
+            self._pending += 1
+
+        encolado = time.perf_counter()
+
+        def tarea():
+            inicio = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                fin = time.perf_counter()
+                with self._lock:
+                    self._queue_wait.append(inicio - encolado)
+                    self._latency.append(fin - inicio)
+                    self.completed += 1
+
+        try:
+            futuro = self._executor.submit(tarea)
+        except BaseException:
+            self._liberar()
+            raise
+        # El hueco se libera cuando el hilo termina (o la tarea se cancela sin
+        # empezar), no cuando deja de esperarla la petición: un cliente que se
+        # desconecta no puede dejar bcrypt corriendo fuera de max_pending
+        futuro.add_done_callback(self._liberar)
+        return await asyncio.wrap_future(futuro)
+
+    def _liberar(self, _futuro=None):
+        with self._lock:
+            self._pending -= 1
+
+    @staticmethod
+    def _resumen(muestras) -> Dict[str, Any]:
+        if not muestras:
+            return {"avg_ms": None, "p95_ms": None, "max_ms": None}
+        ordenadas = sorted(muestras)
+        p95 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+        return {
+            "avg_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(ordenadas[-1] * 1000, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del pool: ocupación, rechazos, latencia y espera en cola"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "hash_latency": self._resumen(self._latency),
+                "queue_wait": self._resumen(self._queue_wait),
+            }
+
+
+# Instancia global
+hash_pool = BoundedHashPool()
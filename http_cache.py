@@ -0,0 +1,133 @@
+# http_cache.py - GET condicional (ETag / Last-Modified / 304) para la API pública
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# El navegador guarda la respuesta pero revalida siempre (If-None-Match):
+# así un admin ve sus cambios al instante y el visitante recibe un 304 vacío.
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+
+def _row_version(row: Dict[str, Any]) -> str:
+    """Versión de una fila: id + updated_at, o la fila completa si no hay updated_at"""
+    updated_at = row.get("updated_at")
+    if updated_at:
+        return f"{row.get('id')}@{updated_at}"
+    return json.dumps(row, sort_keys=True, default=str)
+
+
+def compute_etag(rows: Union[Dict[str, Any], List[Dict[str, Any]]], *filters: Any) -> str:
+    """
+    ETag fuerte a partir de los updated_at de las filas y del set de filtros
+
+    No serializa el payload: solo hashea ids y marcas de tiempo.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(filters).encode())
+    for row in rows:
+        digest.update(b"\x00")
+        digest.update(_row_version(row).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def compute_last_modified(rows: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Optional[datetime]:
+    """Mayor updated_at (o created_at) de las filas, sin microsegundos"""
+    if isinstance(rows, dict):
+        rows = [rows]
+
+    fechas = [
+        _parse_timestamp(row.get("updated_at") or row.get("created_at"))
+        for row in rows
+        if row.get("updated_at") or row.get("created_at")
+    ]
+    fechas = [f for f in fechas if f is not None]
+    if not fechas:
+        return None
+    return max(fechas).astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidatos: Iterable[str] = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidatos)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def conditional_json(
+    request: Request,
+    content: Union[Dict[str, Any], List[Dict[str, Any]]],
+    *filters: Any,
+    rows: Optional[List[Dict[str, Any]]] = None,
+    cache_control: str = CATALOG_CACHE_CONTROL,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Responde 304 si el cliente ya tiene esta versión, si no JSON con validadores
+
+    Args:
+        request: Request con If-None-Match / If-Modified-Since
+        content: Fila o filas a devolver
+        filters: Filtros que distinguen esta consulta (entran en el ETag)
+        rows: Filas para validadores si ``content`` es un sobre (p.ej. con total)
+        cache_control: Valor de Cache-Control
+        headers: Cabeceras adicionales
+
+    Returns:
+        Response 304 sin cuerpo o JSONResponse con ETag (y Last-Modified
+        si es una sola fila)
+    """
+    if rows is None:
+        rows = content
+    etag = compute_etag(rows, *filters)
+    # Solo un recurso individual lleva Last-Modified: en un listado la fila
+    # más reciente no cambia al borrar o desactivar otra (If-Modified-Since
+    # daría un 304 falso); los listados se validan solo con el ETag
+    last_modified = compute_last_modified(rows) if isinstance(rows, dict) else None
+
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=content, headers=headers)
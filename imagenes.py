@@ -0,0 +1,252 @@
+# imagenes.py - Ingesta acotada y variantes responsivas (WebP / AVIF) de las imágenes del catálogo
+
+import hashlib
+import io
+import json
+import os
+import re
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# Anchos (px) generados por cada imagen
+VARIANTES_PRODUCTO = {"thumb": 200, "card": 400, "detail": 800, "zoom": 1600}
+VARIANTES_CARRUSEL = {"mobile": 768, "tablet": 1280, "desktop": 1920}
+
+# Límites de ingesta: se comprueban antes de decodificar la imagen
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+
+# Entra en la clave de contenido: subirla regenera las variantes de imágenes
+# ya conocidas cuando cambian anchos, formatos o calidades
+VERSION_PIPELINE = "v1"
+
+# Nombre de objeto direccionado por contenido: <prefijo>_<clave>[_<ancho>].<ext>
+_CLAVE_EN_URL = re.compile(r"_([0-9a-f]{32})(?:_\d+)?\.[a-z0-9]+$")
+
+# Formato -> (extensión, content-type, opciones de guardado)
+_FORMATOS = {
+    "avif": ("avif", "image/avif", {"quality": 55, "speed": 6}),
+    "webp": ("webp", "image/webp", {"quality": 80, "method": 4}),
+}
+
+
+_pil = None
+_formatos_variantes: Optional[List[str]] = None
+
+
+def _pillow():
+    """
+    Importa y configura Pillow en el primer uso
+
+    Solo las subidas de imágenes lo necesitan: el resto de peticiones (y el
+    arranque en frío) no pagan su importación ni la de sus plugins.
+    """
+    global _pil
+    if _pil is None:
+        from PIL import Image
+
+        try:
+            # Pillow 10 no trae AVIF; el plugin lo registra si está instalado
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+
+        # Red de seguridad de Pillow contra decompression bombs
+        Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+        _pil = Image
+    return _pil
+
+
+def formatos_disponibles() -> List[str]:
+    """Formatos modernos que este Pillow sabe codificar (AVIF primero)"""
+    global _formatos_variantes
+    if _formatos_variantes is None:
+        Image = _pillow()
+        Image.init()
+        _formatos_variantes = [fmt for fmt in _FORMATOS if fmt.upper() in Image.SAVE]
+    return _formatos_variantes
+
+
+class ImagenRechazada(ValueError):
+    """La imagen supera MAX_UPLOAD_BYTES o MAX_IMAGE_PIXELS"""
+
+
+def tamano_archivo(fileobj: BinaryIO) -> int:
+    """Tamaño en bytes de un archivo abierto (sin leerlo)"""
+    fileobj.seek(0, os.SEEK_END)
+    tamano = fileobj.tell()
+    fileobj.seek(0)
+    return tamano
+
+
+def validar_tamano(tamano: int):
+    """
+    Raises:
+        ImagenRechazada: Si el archivo supera MAX_UPLOAD_BYTES
+    """
+    if tamano > MAX_UPLOAD_BYTES:
+        raise ImagenRechazada(
+            f"La imagen pesa {tamano / 1024 / 1024:.1f} MB "
+            f"(máximo {MAX_UPLOAD_BYTES / 1024 / 1024:.0f} MB)"
+        )
+
+
+def clave_contenido(fileobj: BinaryIO) -> str:
+    """
+    Clave de contenido: sha256 (truncado a 128 bits) de los bytes subidos
+
+    Se calcula por bloques, sin cargar el archivo entero en memoria.
+    """
+    digest = hashlib.sha256(VERSION_PIPELINE.encode())
+    fileobj.seek(0)
+    for bloque in iter(lambda: fileobj.read(1024 * 1024), b""):
+        digest.update(bloque)
+    fileobj.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def clave_de_url(url: str) -> Optional[str]:
+    """Clave de contenido de una URL de storage (None en nombres antiguos con uuid)"""
+    match = _CLAVE_EN_URL.search(url or "")
+    return match.group(1) if match else None
+
+
+def abrir_imagen(fileobj: BinaryIO, ancho_necesario: int) -> "Image.Image":
+    """
+    Abre y decodifica una imagen desde un archivo, sin copiarlo a memoria
+
+    Lee solo la cabecera para rechazar imágenes con demasiados píxeles
+    antes de decodificar. En JPEG usa draft mode: libjpeg decodifica
+    directamente a 1/2, 1/4 u 1/8 de escala mientras el resultado siga
+    siendo al menos ``ancho_necesario``.
+
+    Raises:
+        ImagenRechazada: Si supera MAX_IMAGE_PIXELS
+    """
+    fileobj.seek(0)
+    image = _pillow().open(fileobj)
+    ancho, alto = image.size
+    if ancho * alto > MAX_IMAGE_PIXELS:
+        image.close()
+        raise ImagenRechazada(
+            f"La imagen tiene {ancho}x{alto} píxeles "
+            f"(máximo {MAX_IMAGE_PIXELS / 1_000_000:.0f} megapíxeles)"
+        )
+
+    if image.format == "JPEG" and ancho > ancho_necesario:
+        image.draft(None, (ancho_necesario, max(1, alto * ancho_necesario // ancho)))
+    image.load()
+    return image
+
+
+def a_rgb(image: "Image.Image") -> "Image.Image":
+    """Aplana transparencias sobre fondo blanco (JPEG no admite alfa)"""
+    Image = _pillow()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def generar_variantes(image: "Image.Image", anchos: Dict[str, int]) -> List[Dict[str, Any]]:
+    """
+    Redimensiona la imagen a cada ancho y la codifica en cada formato moderno
+
+    No amplía: los anchos mayores que el original se omiten (se conserva al
+    menos uno, al ancho original). Cada reducción parte de la anterior, de
+    mayor a menor, para no repetir el remuestreo desde la imagen completa.
+
+    Returns:
+        Lista de {"ancho", "formato", "ext", "mime", "contenido"}
+    """
+    Image = _pillow()
+    ancho_original, alto_original = image.size
+    objetivos = sorted({min(ancho, ancho_original) for ancho in anchos.values()}, reverse=True)
+
+    variantes = []
+    actual = image
+    for ancho in objetivos:
+        if ancho < actual.width:
+            alto = max(1, round(alto_original * ancho / ancho_original))
+            anterior, actual = actual, actual.resize((ancho, alto), Image.Resampling.LANCZOS)
+            # Libera cada reducción intermedia en cuanto deja de hacer falta
+            if anterior is not image:
+                anterior.close()
+        for formato in formatos_disponibles():
+            ext, mime, opciones = _FORMATOS[formato]
+            output = io.BytesIO()
+            actual.save(output, format=formato.upper(), **opciones)
+            variantes.append({
+                "ancho": ancho,
+                "formato": formato,
+                "ext": ext,
+                "mime": mime,
+                "contenido": output.getvalue(),
+            })
+    if actual is not image:
+        actual.close()
+    return variantes
+
+
+def construir_srcset(src: str, subidas: List[Tuple[str, int, str]]) -> Dict[str, str]:
+    """
+    Estructura lista para <picture>: {"src": jpeg, "webp": srcset, "avif": srcset}
+
+    Args:
+        src: URL del JPEG de respaldo
+        subidas: (formato, ancho, url) de cada variante subida
+    """
+    resultado = {"src": src}
+    for formato in _FORMATOS:
+        candidatos = sorted((ancho, url) for fmt, ancho, url in subidas if fmt == formato)
+        if candidatos:
+            resultado[formato] = ", ".join(f"{url} {ancho}w" for ancho, url in candidatos)
+    return resultado
+
+
+def urls_de_srcset(variantes: Optional[Dict[str, str]]) -> List[str]:
+    """Todas las URLs de una estructura srcset (para borrarlas del storage)"""
+    if not variantes:
+        return []
+    urls = [variantes["src"]] if variantes.get("src") else []
+    for formato in _FORMATOS:
+        for candidato in (variantes.get(formato) or "").split(","):
+            url = candidato.strip().split(" ")[0]
+            if url:
+                urls.append(url)
+    return urls
+
+
+def url_variante(srcset: Optional[str], ancho_minimo: int) -> Optional[str]:
+    """URL del candidato más pequeño de un srcset que cubra el ancho pedido (como urlVariante en api.js)"""
+    candidatos = []
+    for candidato in (srcset or "").split(","):
+        url, _, ancho = candidato.strip().partition(" ")
+        if url:
+            candidatos.append((int(ancho.rstrip("w")) if ancho.rstrip("w").isdigit() else 0, url))
+    candidatos.sort()
+    for ancho, url in candidatos:
+        if ancho >= ancho_minimo:
+            return url
+    return candidatos[-1][1] if candidatos else None
+
+
+def cargar_variantes(texto: Optional[str]) -> Any:
+    """Decodifica la columna JSON de variantes (None si está vacía o corrupta)"""
+    if not texto:
+        return None
+    try:
+        return json.loads(texto)
+    except (TypeError, ValueError):
+        return None
@@ -1,23 +1,33 @@
 # main.py - Aplicación Principal Optimizada para Vercel
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy import text
 from pathlib import Path
 from typing import Optional
-from sqlalchemy.orm import Session
+import asyncio
 import secrets
+import sys
 import os
 
-from db import get_db
-from auth import get_current_user_session, get_current_user_hybrid
+# db.py (SQLAlchemy) se importa al usarlo: el arranque en frío no lo necesita
+from repositories import repository_stats
+from cache import catalog_cache
+from hashing import hash_pool
+from storage_queue import deletion_queue, sweep_orphans, sweep_loop, STORAGE_SWEEP_INTERVAL
+from storage_service import storage_stats
+from page_cache import page_cache, tag_categoria, tag_producto
+from auth import get_current_user_session, get_current_user_hybrid, jwt_cache_stats, token_version_stats
 
 # Importar routers
-from routers import auth_router, productos_router, carrusel_router
+from routers import auth_router, productos_router, carrusel_router, categorias_router
+from routers.productos_router import consultar_productos, obtener_producto
+from routers.carrusel_router import items_carrusel
+from imagenes import cargar_variantes, url_variante
+from categorias import CATEGORIAS, por_slug
 
 app = FastAPI(
     title="Aurum Joyería",
@@ -114,19 +124,40 @@ def custom_url_for(name: str, **path_params):
             'register': '/register',
             'perfil': '/perfil',
             'carrito': '/carrito',
-            'anillos': '/anillos',
-            'pulseras': '/pulseras',
-            'cadenas': '/cadenas',
-            'aretes': '/aretes',
-            'combos': '/combos',
-            'dijes': '/dijes',
-            'balineria': '/balineria',
             'admin': '/admin',
         }
+        # Las categorías se nombran por su slug (ver categorias.json)
+        if name not in route_map and por_slug(name):
+            return f"/{name}"
         return route_map.get(name, '/')
 
+def formato_precio(valor) -> str:
+    """Precio como lo muestra el JS (toLocaleString('es-CO')): 45000 -> 45.000"""
+    entero, _, decimales = f"{float(valor):,.2f}".partition(".")
+    entero = entero.replace(",", ".")
+    decimales = decimales.rstrip("0")
+    return f"{entero},{decimales}" if decimales else entero
+
+def primera_variante(producto: dict) -> Optional[dict]:
+    """Estructura srcset de la primera imagen del producto (variantesProducto(p)[0] en api.js)"""
+    variantes = cargar_variantes(producto.get("imagenes_variantes"))
+    if isinstance(variantes, list) and variantes and isinstance(variantes[0], dict):
+        return variantes[0]
+    return None
+
+def imagen_slide(item: dict) -> str:
+    """Variante WebP del slide para pantallas medianas (JPEG si no hay variantes)"""
+    variantes = cargar_variantes(item.get("imagen_variantes"))
+    if isinstance(variantes, dict):
+        return url_variante(variantes.get("webp"), 1280) or item.get("imagen_url")
+    return item.get("imagen_url")
+
 templates.env.globals['static_url'] = static_url
 templates.env.globals['url_for'] = custom_url_for
+templates.env.globals['primera_variante'] = primera_variante
+templates.env.globals['imagen_slide'] = imagen_slide
+templates.env.globals['categorias'] = CATEGORIAS
+templates.env.filters['precio'] = formato_precio
 
 # ========================================
 # 🔥 INCLUIR ROUTERS API (CORREGIDO)
@@ -136,6 +167,7 @@ templates.env.globals['url_for'] = custom_url_for
 app.include_router(auth_router, prefix="/api", tags=["Autenticación"])
 app.include_router(productos_router, prefix="/api", tags=["Productos"])
 app.include_router(carrusel_router, prefix="/api", tags=["Carrusel"])
+app.include_router(categorias_router, prefix="/api", tags=["Categorías"])
 
 # ========================================
 # HELPER FUNCTIONS
@@ -150,15 +182,73 @@ def safe_get_user(request: Request) -> Optional[dict]:
         print(f"⚠️ Error obteniendo usuario: {e}")
         return None
 
+# ========================================
+# DATOS INICIALES (RENDERIZADO EN SERVIDOR)
+# ========================================
+# La primera página se pinta en la plantilla y viaja también como JSON
+# (#datos-iniciales): el JS la hidrata sin pedirla otra vez a la API. Las
+# consultas son las mismas que haría el navegador, así que comparten caché.
+# Si fallan, la página sale sin datos y el JS los pide como antes.
+
+# Debe coincidir con itemsPorPagina de cargar_productos.js / cargar_destacados.js
+SSR_ITEMS_POR_PAGINA = 12
+
+async def _datos_categoria(categoria: str) -> Optional[dict]:
+    """Primera página de la categoría y contadores del filtro"""
+    try:
+        (pagina, _), (destacados, _), (con_stock, _) = await asyncio.gather(
+            consultar_productos(categoria, None, True, 0, SSR_ITEMS_POR_PAGINA, "default", count="exact"),
+            consultar_productos(categoria, True, True, 0, 0, count="exact"),
+            consultar_productos(categoria, None, True, 0, 0, stock_min=1, count="exact"),
+        )
+    except Exception as e:
+        print(f"⚠️ Error precargando productos de '{categoria}': {e}")
+        return None
+    return {
+        "pagina": pagina,
+        "estadisticas": {"destacados": destacados["total"] or 0, "conStock": con_stock["total"] or 0},
+    }
+
+async def _datos_inicio() -> Optional[dict]:
+    """Primera página de destacados e items activos del carrusel"""
+    try:
+        (pagina, _), carrusel = await asyncio.gather(
+            consultar_productos(None, True, True, 0, SSR_ITEMS_POR_PAGINA, "default", count="exact"),
+            items_carrusel(True),
+        )
+    except Exception as e:
+        print(f"⚠️ Error precargando la página de inicio: {e}")
+        return None
+    return {"pagina": pagina, "carrusel": carrusel}
+
+def _render_pagina(request: Request, plantilla: str, contexto: dict):
+    """TemplateResponse; sin datos iniciales no se guarda en ninguna caché"""
+    response = templates.TemplateResponse(
+        plantilla, {"request": request, "user": safe_get_user(request), **contexto}
+    )
+    if contexto.get("datos_iniciales", True) is None:
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
+async def _render_categoria(request: Request, categoria: dict):
+    """Página de categoría con la primera página de productos ya renderizada"""
+    async def render():
+        return _render_pagina(request, "base_categoria.html", {
+            "categoria": categoria["valor"], "categoria_nombre": categoria["nombre"],
+            "datos_iniciales": await _datos_categoria(categoria["valor"]),
+        })
+    return await page_cache.responder(request, [tag_categoria(categoria["valor"])], render)
+
 # ========================================
 # RUTAS PRINCIPALES (PÁGINAS HTML)
 # ========================================
 
 @app.get("/", response_class=HTMLResponse, name="index")
 async def index(request: Request):
-    """Página de inicio"""
-    user = safe_get_user(request)
-    return templates.TemplateResponse("index.html", {"request": request, "user": user})
+    """Página de inicio (destacados y carrusel renderizados en servidor)"""
+    async def render():
+        return _render_pagina(request, "index.html", {"datos_iniciales": await _datos_inicio()})
+    return await page_cache.responder(request, ["destacados", "carrusel"], render)
 
 # ========================================
 # RUTAS DE AUTENTICACIÓN
@@ -202,78 +292,27 @@ async def carrito(request: Request):
     user = safe_get_user(request)
     return templates.TemplateResponse("carrito.html", {"request": request, "user": user})
 
-# ========================================
-# RUTAS DE CATEGORÍAS
-# ========================================
-
-@app.get("/anillos", response_class=HTMLResponse, name="anillos")
-async def anillos(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "anillos", "categoria_nombre": "Anillos"}
-    )
-
-@app.get("/pulseras", response_class=HTMLResponse, name="pulseras")
-async def pulseras(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "pulseras", "categoria_nombre": "Pulseras"}
-    )
-
-@app.get("/cadenas", response_class=HTMLResponse, name="cadenas")
-async def cadenas(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "cadenas", "categoria_nombre": "Cadenas"}
-    )
-
-@app.get("/aretes", response_class=HTMLResponse, name="aretes")
-async def aretes(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "aretes", "categoria_nombre": "Aretes"}
-    )
-
-@app.get("/combos", response_class=HTMLResponse, name="combos")
-async def combos(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "otros", "categoria_nombre": "Combos"}
-    )
-
-@app.get("/dijes", response_class=HTMLResponse, name="dijes")
-async def dijes(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "tobilleras", "categoria_nombre": "Dijes y Herrajes"}
-    )
-
-@app.get("/balineria", response_class=HTMLResponse, name="balineria")
-async def balineria(request: Request):
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "base_categoria.html", 
-        {"request": request, "user": user, "categoria": "balineria", "categoria_nombre": "Balinería"}
-    )
-
 # ========================================
 # RUTAS DE PRODUCTO
 # ========================================
 
 @app.get("/producto/{producto_id}", response_class=HTMLResponse, name="producto_detalle")
 async def producto_detalle(request: Request, producto_id: str):
-    """Página de detalle de producto"""
-    user = safe_get_user(request)
-    return templates.TemplateResponse(
-        "producto.html", 
-        {"request": request, "user": user, "producto_id": producto_id}
-    )
+    """Página de detalle de producto (404 si el producto no existe)"""
+    async def render():
+        # Un id inventado no debe ocupar la caché de páginas: se comprueba
+        # (desde catalog_cache) antes de renderizar y guardar
+        try:
+            producto = await obtener_producto(producto_id)
+        except Exception as e:
+            print(f"⚠️ Error comprobando producto '{producto_id}': {e}")
+            response = _render_pagina(request, "producto.html", {"producto_id": producto_id})
+            response.headers["Cache-Control"] = "no-store"
+            return response
+        if not producto:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+        return _render_pagina(request, "producto.html", {"producto_id": producto_id})
+    return await page_cache.responder(request, [tag_producto(producto_id.lower())], render)
 
 # ========================================
 # RUTAS DE ADMINISTRACIÓN
@@ -310,13 +349,16 @@ async def health_check():
 async def health_check_db():
     """🔥 Verificar conexión a base de datos"""
     try:
-        db = next(get_db())
-        result = db.execute(text("SELECT 1"))
-        db.close()
+        from sqlalchemy import text
+        from db import get_async_engine, pool_stats
+
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
         return {
             "status": "ok",
             "database": "connected",
-            "message": "Conexión a base de datos exitosa"
+            "message": "Conexión a base de datos exitosa",
+            "pool": pool_stats()
         }
     except Exception as e:
         print(f"❌ Error en health check DB: {e}")
@@ -329,6 +371,58 @@ async def health_check_db():
             }
         )
 
+@app.get("/api/health/pool")
+async def health_check_pool():
+    """Métricas del pool de conexiones (en uso, overflow, espera)"""
+    from db import pool_stats
+    return pool_stats()
+
+@app.get("/api/health/repositories")
+async def health_check_repositories():
+    """Backend y latencia por operación de los repositorios de datos"""
+    return repository_stats()
+
+@app.get("/api/health/auth")
+async def health_check_auth():
+    """Cachés de la validación local de tokens Bearer (JWT verificados y token_version)"""
+    return {"jwt": jwt_cache_stats(), "token_versions": token_version_stats()}
+
+@app.get("/api/health/cache")
+async def health_check_cache():
+    """Estadísticas de la caché del catálogo y de la de páginas HTML"""
+    return {**catalog_cache.stats(), "paginas": page_cache.stats()}
+
+@app.get("/api/health/hashing")
+async def health_check_hashing():
+    """Métricas del pool de bcrypt (latencia, espera en cola, rechazos)"""
+    return hash_pool.stats()
+
+@app.get("/api/health/storage")
+async def health_check_storage():
+    """Cola de borrados y tiempos de procesado/subida/borrado por bucket"""
+    return {**deletion_queue.stats(), "operaciones": storage_stats()}
+
+# Barrido programado: Vercel Cron (vercel.json) llama con "Authorization: Bearer $CRON_SECRET"
+CRON_SECRET = os.getenv("CRON_SECRET")
+
+@app.get("/api/cron/storage-sweep")
+async def storage_sweep_cron(request: Request):
+    """Barrido periódico de imágenes huérfanas (Vercel Cron)"""
+    autorizacion = request.headers.get("authorization", "")
+    if not CRON_SECRET or not secrets.compare_digest(autorizacion.encode(), f"Bearer {CRON_SECRET}".encode()):
+        return JSONResponse(status_code=401, content={"detail": "No autorizado"})
+    resumen = await sweep_orphans()
+    print(f"🧹 Barrido de huérfanos (cron): {resumen}")
+    return resumen
+
+@app.post("/api/admin/storage/sweep")
+async def storage_sweep(request: Request, dry_run: bool = False):
+    """Borra del Storage las imágenes que ninguna fila referencia (solo admin)"""
+    user = get_current_user_session(request)
+    if not user or user.get("rol") != "admin":
+        return JSONResponse(status_code=403, content={"detail": "No tiene permisos de administrador"})
+    return await sweep_orphans(dry_run=dry_run)
+
 @app.get("/api/test")
 async def api_test():
     """🔥 TEST: Verificar que la API responde correctamente"""
@@ -341,10 +435,25 @@ async def api_test():
             "auth_register": "/api/auth/register",
             "productos": "/api/productos",
             "carrusel": "/api/carrusel",
+            "categorias": "/api/categorias",
             "health_db": "/api/health/db"
         }
     })
 
+# ========================================
+# RUTAS DE CATEGORÍAS
+# ========================================
+# Va después de todas las rutas de una sola parte (/login, /admin, /health...)
+# para no taparlas: /<slug> solo atiende los slugs de categorias.json.
+
+@app.get("/{categoria_slug}", response_class=HTMLResponse, name="categoria")
+async def categoria_page(request: Request, categoria_slug: str):
+    """Página de una categoría del registro"""
+    categoria = por_slug(categoria_slug)
+    if categoria is None:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    return await _render_categoria(request, categoria)
+
 # ========================================
 # MANEJO DE ERRORES
 # ========================================
@@ -395,13 +504,25 @@ async def startup_event():
     print(f"   Secret Key: {'✅ Configurada' if SECRET_KEY else '❌ No configurada'}")
     print("=" * 60)
     
-    # Test de conexión a Supabase REST API
-    try:
-        from supabase_client import supabase
-        users = supabase.get_all_users(skip=0, limit=1)
-        print("✅ Conexión a Supabase REST API exitosa")
-    except Exception as e:
-        print(f"❌ Error conectando a Supabase: {e}")
+    # Sin I/O de red al arrancar: la conectividad se comprueba en /api/health/db
+    
+    # Barrido periódico de imágenes huérfanas (solo en servidores de larga duración)
+    if STORAGE_SWEEP_INTERVAL > 0:
+        app.state.sweep_task = asyncio.create_task(sweep_loop())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Vacía la cola de borrados y cierra los pools HTTP y de base de datos"""
+    sweep_task = getattr(app.state, "sweep_task", None)
+    if sweep_task is not None:
+        sweep_task.cancel()
+    await deletion_queue.flush()
+    
+    from supabase_client import supabase, supabase_async
+    await supabase_async.aclose()
+    supabase.close()
+    if "db" in sys.modules:
+        await sys.modules["db"].dispose_async_engine()
 
 # ========================================
 # PUNTO DE ENTRADA
@@ -0,0 +1,19 @@
+-- 001_usuarios_codigos_idx.sql
+-- Índices parciales para buscar usuarios por código de verificación,
+-- recuperación de contraseña y cambio de email (ver models.Usuario).
+-- Ejecutar en el SQL Editor de Supabase. El editor ejecuta el lote en una
+-- sola transacción, así que los índices no usan CONCURRENTLY (no se admite
+-- dentro de una transacción); con una tabla de usuarios pequeña el bloqueo
+-- de escrituras mientras se crean dura muy poco.
+
+CREATE INDEX IF NOT EXISTS ix_usuarios_verification_code
+    ON usuarios (verification_code)
+    WHERE verification_code IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_usuarios_password_reset_code
+    ON usuarios (password_reset_code)
+    WHERE password_reset_code IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_usuarios_pending_email_code
+    ON usuarios (pending_email_code)
+    WHERE pending_email_code IS NOT NULL;
@@ -0,0 +1,10 @@
+-- 002_imagenes_variantes.sql
+-- Variantes responsivas (WebP / AVIF) de las imágenes subidas.
+-- Cada valor es JSON con la forma {"src": jpeg, "webp": srcset, "avif": srcset}:
+--   productos.imagenes_variantes -> array alineado con imagenes_urls
+--   carrusel.imagen_variantes    -> objeto de la imagen del slide
+-- Ejecutar en el SQL Editor de Supabase.
+
+ALTER TABLE productos ADD COLUMN IF NOT EXISTS imagenes_variantes TEXT;
+
+ALTER TABLE carrusel ADD COLUMN IF NOT EXISTS imagen_variantes TEXT;
@@ -0,0 +1,12 @@
+-- 003_productos_imagenes_trgm.sql
+-- Las imágenes se guardan por contenido (producto_<sha256>...). Para saber si
+-- una foto ya existe, o si otro producto aún la usa, se filtra
+-- imagenes_urls LIKE '%<clave>%'. Este índice trigram evita el seq scan.
+-- Ejecutar en el SQL Editor de Supabase (una sola transacción: la extensión
+-- se crea antes que el índice, que no puede ser CONCURRENTLY dentro de una
+-- transacción; con el catálogo de la tienda el bloqueo es breve).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_productos_imagenes_urls_trgm
+    ON productos USING gin (imagenes_urls gin_trgm_ops);
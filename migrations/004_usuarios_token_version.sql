@@ -0,0 +1,9 @@
+-- 004_usuarios_token_version.sql
+-- Versión de los tokens Bearer de cada usuario. Los tokens llevan la versión
+-- con la que se emitieron ("ver"); al cambiar contraseña o email se
+-- incrementa y los tokens anteriores dejan de ser válidos.
+-- Para revocar a mano (p.ej. tras cambiar el rol desde el SQL Editor):
+--   UPDATE usuarios SET token_version = token_version + 1 WHERE email = '...';
+-- Ejecutar en el SQL Editor de Supabase.
+
+ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
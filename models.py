@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, Text, DateTime, UUID
+from sqlalchemy import Column, String, Integer, Float, Boolean, Text, DateTime, UUID, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import uuid
@@ -28,8 +28,22 @@ class Usuario(Base):
     pending_email_code = Column(String(64), nullable=True)
     pending_email_expires = Column(DateTime(timezone=True), nullable=True)
     
+    # Se incrementa al cambiar contraseña o email: revoca los tokens Bearer anteriores
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Índices parciales para buscar por código sin recorrer la tabla
+    # (solo indexan las filas con un código pendiente)
+    __table_args__ = (
+        Index("ix_usuarios_verification_code", "verification_code",
+              postgresql_where=verification_code.isnot(None)),
+        Index("ix_usuarios_password_reset_code", "password_reset_code",
+              postgresql_where=password_reset_code.isnot(None)),
+        Index("ix_usuarios_pending_email_code", "pending_email_code",
+              postgresql_where=pending_email_code.isnot(None)),
+    )
 
 
 class Producto(Base):
@@ -43,7 +57,35 @@ class Producto(Base):
     stock = Column(Integer, default=0)
     imagen_url = Column(Text)
     imagenes_urls = Column(Text, nullable=True)  # JSON array de URLs
+    imagenes_variantes = Column(Text, nullable=True)  # JSON array de {"src", "webp", "avif"} (srcset)
     destacado = Column(Boolean, default=False, index=True)
     activo = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Trigram sobre imagenes_urls: búsqueda de imágenes por clave de contenido (LIKE '%clave%').
+    # gin_trgm_ops necesita la extensión pg_trgm (migrations/003_productos_imagenes_trgm.sql);
+    # metadata.create_all la crea antes de la tabla (ver el listener de abajo).
+    __table_args__ = (
+        Index("ix_productos_imagenes_urls_trgm", "imagenes_urls",
+              postgresql_using="gin", postgresql_ops={"imagenes_urls": "gin_trgm_ops"}),
+    )
+
+# Sin pg_trgm, create_all fallaría al crear el índice trigram de productos
+event.listen(
+    Producto.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+class Carrusel(Base):
+    __tablename__ = "carrusel"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    titulo = Column(String(255))
+    descripcion = Column(Text)
+    imagen_url = Column(Text)
+    imagen_variantes = Column(Text, nullable=True)  # JSON {"src", "webp", "avif"} (srcset)
+    orden = Column(Integer, default=0)
+    activo = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
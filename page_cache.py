@@ -0,0 +1,214 @@
+# page_cache.py - Caché de páginas HTML completas para visitantes anónimos (con etiquetas de purga)
+
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from cache import TTLCache
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "60"))  # segundos (caché del proceso)
+PAGE_CACHE_MAXSIZE = int(os.getenv("PAGE_CACHE_MAXSIZE", "128"))  # páginas
+
+# Caché del edge de Vercel: sirve la página s-maxage segundos y, vencida,
+# la sigue sirviendo hasta stale-while-revalidate mientras la regenera.
+# La purga por etiqueta es local a cada instancia: en el edge un cambio
+# tarda como mucho s-maxage en verse (más la ventana de revalidación).
+PAGE_CACHE_S_MAXAGE = int(os.getenv("PAGE_CACHE_S_MAXAGE", "60"))
+PAGE_CACHE_SWR = int(os.getenv("PAGE_CACHE_SWR", "300"))
+
+PAGE_CACHE_CONTROL = (
+    f"public, max-age=0, s-maxage={PAGE_CACHE_S_MAXAGE}, "
+    f"stale-while-revalidate={PAGE_CACHE_SWR}"
+)
+# Con sesión la respuesta no se comparte (ni navegador ni edge la reutilizan)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+# Cabeceras de la respuesta original que se guardan con la página
+_CABECERAS_GUARDADAS = ("content-type", "content-language")
+
+
+# ========================================
+# ETIQUETAS
+# ========================================
+# categoria:<slug>  página de la categoría
+# producto:<id>     detalle del producto
+# destacados        inicio (productos destacados de cualquier categoría)
+# carrusel          inicio (slides)
+
+def tag_categoria(categoria: str) -> str:
+    return f"categoria:{categoria}"
+
+
+def tag_producto(producto_id: str) -> str:
+    return f"producto:{producto_id}"
+
+
+# ========================================
+# CACHÉ
+# ========================================
+
+class PageCache:
+    """
+    Páginas HTML renderizadas, por ruta + query, con índice de etiquetas
+
+    Solo se guardan respuestas 200 de visitantes anónimos (sin sesión ni
+    Authorization) que no fijen cookies; las rutas validan antes lo que
+    piden (slug, id de producto) para no guardar páginas de 404. Las escrituras de productos y
+    carrusel purgan por etiqueta las páginas que los muestran.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60):
+        self._paginas = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._por_tag: Dict[str, Set[tuple]] = {}
+        self._max_tags = maxsize * 4
+        self._lock = threading.Lock()
+        self.bypasses = 0
+        self.purged = 0
+
+    @staticmethod
+    def es_anonima(request: Request) -> bool:
+        """Sin usuario en la sesión ni token Bearer"""
+        return not request.session.get("user") and "authorization" not in request.headers
+
+    @staticmethod
+    def clave(request: Request, params: Iterable[str] = ()) -> tuple:
+        """
+        Ruta + solo los parámetros de query que lee la página (ordenados)
+
+        El resto de la query (utm_*, ?verified=..., valores al azar) no
+        cambia el HTML: no debe crear entradas nuevas ni desalojar las útiles.
+        """
+        params = set(params)
+        return (
+            "pagina",
+            request.url.path,
+            tuple(sorted((k, v) for k, v in request.query_params.multi_items() if k in params)),
+        )
+
+    async def responder(
+        self,
+        request: Request,
+        tags: Iterable[str],
+        render: Callable[[], Awaitable[Response]],
+        params: Iterable[str] = (),
+    ) -> Response:
+        """
+        Sirve la página desde la caché o la renderiza y la guarda
+
+        Args:
+            request: Request de la página
+            tags: Etiquetas de purga de la página
+            render: Corrutina que renderiza la respuesta (TemplateResponse);
+                con ``Cache-Control: no-store`` la respuesta no se guarda y
+                una HTTPException (p.ej. 404) se propaga sin guardar nada
+            params: Parámetros de query que usa el render (forman parte de
+                la clave); los demás se ignoran
+
+        Returns:
+            Response con Cache-Control público (anónimo) o privado (con sesión)
+        """
+        if not PAGE_CACHE_ENABLED or not self.es_anonima(request):
+            with self._lock:
+                self.bypasses += 1
+            response = await render()
+            response.headers["Cache-Control"] = PRIVATE_CACHE_CONTROL
+            return response
+
+        tags = sorted(set(tags))
+        clave = self.clave(request, params)
+        guardada = self._paginas.get(clave)
+        if guardada is not None:
+            return self._respuesta(guardada, cache="HIT")
+
+        # Una página renderizada sin sus datos (p.ej. BD caída) llega con no-store
+        response = await render()
+        if (
+            response.status_code != 200
+            or "set-cookie" in response.headers
+            or "no-store" in response.headers.get("cache-control", "")
+        ):
+            return response
+
+        guardada = {
+            "body": response.body,
+            "headers": {k: v for k, v in response.headers.items() if k in _CABECERAS_GUARDADAS},
+            "tags": tags,
+        }
+        self._paginas.set(clave, guardada)
+        with self._lock:
+            # El índice no se entera de los desalojos LRU: si crece demasiado
+            # (p.ej. muchas URLs de producto distintas) se vacía junto con las páginas
+            if len(self._por_tag) > self._max_tags:
+                self._paginas.clear()
+                self._por_tag.clear()
+                self._paginas.set(clave, guardada)
+            for tag in tags:
+                self._por_tag.setdefault(tag, set()).add(clave)
+        return self._respuesta(guardada, cache="MISS")
+
+    @staticmethod
+    def _respuesta(guardada: Dict[str, Any], cache: str) -> Response:
+        headers = {
+            **guardada["headers"],
+            "Cache-Control": PAGE_CACHE_CONTROL,
+            # Etiquetas para purgar en un CDN que las soporte (Surrogate-Key / Cache-Tag)
+            "Surrogate-Key": " ".join(guardada["tags"]),
+            "X-Page-Cache": cache,
+        }
+        return Response(content=guardada["body"], status_code=200, headers=headers)
+
+    def purge(self, *tags: Optional[str]) -> int:
+        """Elimina las páginas con alguna de las etiquetas; devuelve cuántas"""
+        with self._lock:
+            claves = set()
+            for tag in tags:
+                if tag:
+                    claves |= self._por_tag.pop(tag, set())
+        for clave in claves:
+            self._paginas.invalidate(clave)
+        with self._lock:
+            self.purged += len(claves)
+        return len(claves)
+
+    def clear(self):
+        """Vacía la caché"""
+        self._paginas.clear()
+        with self._lock:
+            self._por_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos de la caché, peticiones con sesión (sin caché) y purgas"""
+        with self._lock:
+            return {
+                **self._paginas.stats(),
+                "bypasses": self.bypasses,
+                "purged": self.purged,
+                "tags": len(self._por_tag),
+                "cache_control": PAGE_CACHE_CONTROL,
+            }
+
+
+# Instancia global
+page_cache = PageCache(maxsize=PAGE_CACHE_MAXSIZE, ttl=PAGE_CACHE_TTL)
+
+
+def purge_productos(*categorias: Optional[str], producto_id: Optional[str] = None) -> int:
+    """Purga las páginas afectadas por una escritura de productos (como invalidate_productos)"""
+    return page_cache.purge(
+        "destacados",
+        *(tag_categoria(c) for c in categorias if c),
+        tag_producto(producto_id) if producto_id else None,
+    )
+
+
+def purge_carrusel() -> int:
+    """Purga las páginas que muestran el carrusel"""
+    return page_cache.purge("carrusel")
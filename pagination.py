@@ -0,0 +1,55 @@
+# pagination.py - Cursores opacos para paginación keyset (created_at, id)
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Cursor opaco que apunta justo después de ``row``"""
+    raw = json.dumps([row.get("created_at"), str(row.get("id"))], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, str]]:
+    """
+    Decodifica un cursor a (created_at, id)
+
+    Un cursor vacío significa "primera página" y devuelve None. El cursor
+    llega del cliente: created_at se valida como fecha ISO 8601 y el id
+    como UUID, y se devuelven normalizados (nunca el texto recibido), ya
+    que ambos acaban dentro del filtro de PostgREST.
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(created_at, str) or not isinstance(row_id, str):
+        raise ValueError("Cursor inválido")
+    try:
+        created_at = datetime.fromisoformat(created_at)
+        row_id = uuid.UUID(row_id)
+    except ValueError as e:
+        raise ValueError("Cursor inválido") from e
+    return created_at.isoformat(), str(row_id)
+
+
+def keyset_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Recorta una consulta hecha con ``limit + 1`` filas
+
+    Returns:
+        (filas de la página, next_cursor o None si no hay más)
+    """
+    items = rows[:limit]
+    if len(rows) > limit and items:
+        return items, encode_cursor(items[-1])
+    return items, None
@@ -0,0 +1,301 @@
+# repositories.py - Acceso a datos unificado (PostgREST o SQL directo) para usuarios, productos y carrusel
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from supabase_client import supabase_async
+
+load_dotenv()
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# Backend por repositorio u operación: "users=sql,products.get_by_id=sql".
+# Lo que no aparece usa REPOSITORY_DEFAULT_BACKEND.
+REPOSITORY_DEFAULT_BACKEND = os.getenv("REPOSITORY_DEFAULT_BACKEND", "rest")
+REPOSITORY_BACKENDS = os.getenv("REPOSITORY_BACKENDS", "")
+
+BACKENDS_DISPONIBLES = ("rest", "sql")
+
+
+def _validar_backend(backend: str, origen: str) -> str:
+    """Un nombre mal escrito falla al arrancar y no como KeyError en cada petición"""
+    if backend not in BACKENDS_DISPONIBLES:
+        raise ValueError(
+            f"Backend de repositorio desconocido en {origen}: '{backend}' "
+            f"(opciones: {', '.join(BACKENDS_DISPONIBLES)})"
+        )
+    return backend
+
+
+def _parse_backends(texto: str) -> Dict[str, str]:
+    """'users=sql, products.list=rest' -> {"users": "sql", "products.list": "rest"}"""
+    resultado = {}
+    for parte in texto.split(","):
+        clave, _, backend = parte.partition("=")
+        if clave.strip() and backend.strip():
+            resultado[clave.strip()] = _validar_backend(backend.strip(), f"REPOSITORY_BACKENDS ({parte.strip()})")
+    return resultado
+
+
+_validar_backend(REPOSITORY_DEFAULT_BACKEND, "REPOSITORY_DEFAULT_BACKEND")
+_BACKENDS_CONFIGURADOS = _parse_backends(REPOSITORY_BACKENDS)
+
+
+# ========================================
+# BACKEND POSTGREST
+# ========================================
+
+class _RestBackend:
+    """Delegación en AsyncSupabaseClient (HTTP a PostgREST)"""
+
+    client = supabase_async
+
+
+class UserRestBackend(_RestBackend):
+    async def get_by_email(self, email):
+        return await self.client.get_user_by_email(email)
+
+    async def get_by_id(self, user_id):
+        return await self.client.get_user_by_id(user_id)
+
+    async def get_by_code(self, column, code):
+        return await self.client.get_user_by_code(column, code)
+
+    async def create(self, data):
+        return await self.client.create_user(data)
+
+    async def update(self, user_id, updates):
+        return await self.client.update_user(user_id, updates)
+
+    async def delete(self, user_id):
+        return await self.client.delete_user(user_id)
+
+    async def list(self, skip, limit):
+        return await self.client.get_all_users(skip, limit)
+
+    async def page(self, limit, after):
+        return await self.client.get_users_page(limit, after)
+
+    async def count(self, rol):
+        return await self.client.count_users(rol=rol)
+
+
+class ProductRestBackend(_RestBackend):
+    async def list(self, filters):
+        return await self.client.get_productos(filters)
+
+    async def list_with_total(self, filters):
+        return await self.client.get_productos_con_total(filters)
+
+    async def get_by_id(self, producto_id):
+        return await self.client.get_producto_by_id(producto_id)
+
+    async def list_images(self, skip, limit):
+        return await self.client.get_productos_imagenes(skip, limit)
+
+    async def find_by_image(self, clave, exclude_id, limit):
+        return await self.client.get_productos_by_imagen(clave, exclude_id=exclude_id, limit=limit)
+
+    async def create(self, data):
+        return await self.client.create_producto(data)
+
+    async def update(self, producto_id, updates):
+        return await self.client.update_producto(producto_id, updates)
+
+    async def delete(self, producto_id):
+        return await self.client.delete_producto(producto_id)
+
+
+class CarouselRestBackend(_RestBackend):
+    async def list(self, activo):
+        return await self.client.get_carrusel_items(activo)
+
+    async def get_by_id(self, carrusel_id):
+        return await self.client.get_carrusel_by_id(carrusel_id)
+
+    async def create(self, data):
+        return await self.client.create_carrusel(data)
+
+    async def update(self, carrusel_id, updates):
+        return await self.client.update_carrusel(carrusel_id, updates)
+
+    async def delete(self, carrusel_id):
+        return await self.client.delete_carrusel(carrusel_id)
+
+
+# ========================================
+# REPOSITORIOS
+# ========================================
+
+class _Repository:
+    """
+    Punto único de acceso a una tabla
+
+    Elige el backend de cada operación según REPOSITORY_BACKENDS y mide
+    llamadas, errores y latencia por operación.
+    """
+
+    nombre = ""
+    sql_backend = ""  # Clase en repositories_sql (SQLAlchemy se importa al usarla)
+
+    def __init__(self, backends: Dict[str, Any]):
+        self.backends = backends
+        self._lock = threading.Lock()
+        self._metricas: Dict[str, Dict[str, Any]] = {}
+
+    def backend_for(self, operacion: str) -> str:
+        """Nombre del backend que atiende la operación"""
+        return _BACKENDS_CONFIGURADOS.get(
+            f"{self.nombre}.{operacion}",
+            _BACKENDS_CONFIGURADOS.get(self.nombre, REPOSITORY_DEFAULT_BACKEND),
+        )
+
+    def _backend(self, nombre: str) -> Any:
+        if nombre not in self.backends and nombre == "sql":
+            import repositories_sql
+            self.backends["sql"] = getattr(repositories_sql, self.sql_backend)()
+        return self.backends[nombre]
+
+    async def _run(self, operacion: str, *args: Any) -> Any:
+        backend = self.backend_for(operacion)
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return await getattr(self._backend(backend), operacion)(*args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self._lock:
+                m = self._metricas.setdefault(operacion, {"calls": 0, "errors": 0, "total": 0.0, "max": 0.0})
+                m["calls"] += 1
+                m["errors"] += error
+                m["total"] += duracion
+                m["max"] = max(m["max"], duracion)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas por operación (backend, llamadas, errores, latencia)"""
+        with self._lock:
+            return {
+                operacion: {
+                    "backend": self.backend_for(operacion),
+                    "calls": m["calls"],
+                    "errors": m["errors"],
+                    "avg_ms": round(m["total"] / m["calls"] * 1000, 2),
+                    "max_ms": round(m["max"] * 1000, 2),
+                }
+                for operacion, m in self._metricas.items()
+            }
+
+
+class UserRepository(_Repository):
+    nombre = "users"
+    sql_backend = "UserSqlBackend"
+
+    def __init__(self):
+        super().__init__({"rest": UserRestBackend()})
+
+    async def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return await self._run("get_by_email", email)
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run("get_by_id", user_id)
+
+    async def get_by_code(self, column: str, code: str) -> Optional[Dict[str, Any]]:
+        """Usuario por código de un solo uso (ver CODIGOS_USUARIO)"""
+        return await self._run("get_by_code", column, code)
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run("create", data)
+
+    async def update(self, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run("update", user_id, updates)
+
+    async def delete(self, user_id: str) -> bool:
+        return await self._run("delete", user_id)
+
+    async def list(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        return await self._run("list", skip, limit)
+
+    async def page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Página keyset ordenada por (created_at, id) descendente"""
+        return await self._run("page", limit, after)
+
+    async def count(self, rol: Optional[str] = None) -> Optional[int]:
+        return await self._run("count", rol)
+
+
+class ProductRepository(_Repository):
+    nombre = "products"
+    sql_backend = "ProductSqlBackend"
+
+    def __init__(self):
+        super().__init__({"rest": ProductRestBackend()})
+
+    async def list(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        return await self._run("list", filters)
+
+    async def list_with_total(self, filters: Dict[str, Any] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Página de productos y total que cumple los filtros"""
+        return await self._run("list_with_total", filters)
+
+    async def get_by_id(self, producto_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run("get_by_id", producto_id)
+
+    async def list_images(self, skip: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Solo columnas de imágenes (barrido de huérfanos)"""
+        return await self._run("list_images", skip, limit)
+
+    async def find_by_image(self, clave: str, exclude_id: Optional[str] = None, limit: int = 1) -> List[Dict[str, Any]]:
+        """Productos que referencian la imagen con esa clave de contenido"""
+        return await self._run("find_by_image", clave, exclude_id, limit)
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run("create", data)
+
+    async def update(self, producto_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run("update", producto_id, updates)
+
+    async def delete(self, producto_id: str) -> bool:
+        return await self._run("delete", producto_id)
+
+
+class CarouselRepository(_Repository):
+    nombre = "carousel"
+    sql_backend = "CarouselSqlBackend"
+
+    def __init__(self):
+        super().__init__({"rest": CarouselRestBackend()})
+
+    async def list(self, activo: Optional[bool] = None) -> List[Dict[str, Any]]:
+        return await self._run("list", activo)
+
+    async def get_by_id(self, carrusel_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run("get_by_id", carrusel_id)
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run("create", data)
+
+    async def update(self, carrusel_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run("update", carrusel_id, updates)
+
+    async def delete(self, carrusel_id: str) -> bool:
+        return await self._run("delete", carrusel_id)
+
+
+# Instancias globales
+users = UserRepository()
+products = ProductRepository()
+carousel = CarouselRepository()
+
+
+def repository_stats() -> Dict[str, Any]:
+    """Métricas de los tres repositorios"""
+    return {repo.nombre: repo.stats() for repo in (users, products, carousel)}
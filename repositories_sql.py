@@ -0,0 +1,291 @@
+# repositories_sql.py - Backend SQL directo (SQLAlchemy async + asyncpg) de los repositorios
+
+import re
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Uuid, and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db import AsyncSessionLocal
+from models import Carrusel, Producto, Usuario
+from supabase_client import CODIGOS_USUARIO, ORDENES_PRODUCTOS
+
+# ========================================
+# SERIALIZACIÓN (mismo JSON que PostgREST)
+# ========================================
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, uuid.UUID):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+def _a_dict(fila) -> Optional[Dict[str, Any]]:
+    """Objeto ORM -> dict con las mismas claves y tipos que devuelve PostgREST"""
+    if fila is None:
+        return None
+    return {col.name: _valor_json(getattr(fila, col.key)) for col in fila.__table__.columns}
+
+
+def _orden_sql(modelo, orden: str) -> list:
+    """Traduce un order de PostgREST ("precio.asc.nullsfirst,id.asc") a cláusulas ORDER BY"""
+    clausulas = []
+    for campo in orden.split(","):
+        nombre, *modificadores = campo.split(".")
+        columna = getattr(modelo, nombre)
+        clausula = columna.desc() if "desc" in modificadores else columna.asc()
+        if "nullsfirst" in modificadores:
+            clausula = clausula.nulls_first()
+        elif "nullslast" in modificadores:
+            clausula = clausula.nulls_last()
+        clausulas.append(clausula)
+    return clausulas
+
+
+def _despues_de(modelo, after: Tuple[str, str]):
+    """Keyset: filas estrictamente después de (created_at, id) en orden descendente"""
+    created_at, row_id = after
+    created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    row_id = uuid.UUID(row_id)
+    return or_(
+        modelo.created_at < created_at,
+        and_(modelo.created_at == created_at, modelo.id < row_id),
+    )
+
+
+def _valores_sql(modelo, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos en JSON (como se envían a PostgREST) -> tipos Python que espera asyncpg"""
+    valores = {}
+    for clave, valor in data.items():
+        columna = modelo.__table__.columns.get(clave)
+        if isinstance(valor, str) and columna is not None:
+            if isinstance(columna.type, Uuid):
+                valor = uuid.UUID(valor)
+            elif isinstance(columna.type, DateTime):
+                valor = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        valores[clave] = valor
+    return valores
+
+
+def _uuid(valor: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(valor))
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+
+# ========================================
+# BACKENDS
+# ========================================
+
+class _SqlBackend:
+    """
+    Consultas directas con el motor async de db.py
+
+    Devuelve dicts con la misma forma que PostgREST y los mismos valores
+    "vacíos" (None, [], False) cuando no hay fila o la escritura falla.
+    """
+
+    model = None
+
+    async def _fila(self, statement) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            return _a_dict((await db.execute(statement)).scalars().first())
+
+    async def _filas(self, statement) -> List[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            return [_a_dict(fila) for fila in (await db.execute(statement)).scalars().all()]
+
+    async def _columnas(self, statement) -> List[Dict[str, Any]]:
+        """Filas de un select de columnas sueltas (no de la entidad completa)"""
+        async with AsyncSessionLocal() as db:
+            return [
+                {columna: _valor_json(valor) for columna, valor in fila._mapping.items()}
+                for fila in (await db.execute(statement)).all()
+            ]
+
+    async def _escalar(self, statement) -> Any:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(statement)).scalar()
+
+    async def _crear(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            try:
+                fila = (await db.execute(insert(self.model).values(**_valores_sql(self.model, data)).returning(self.model))).scalars().first()
+                await db.commit()
+            except IntegrityError as e:
+                await db.rollback()
+                print(f"❌ Error creando {self.model.__tablename__}: {e}")
+                return None
+            return _a_dict(fila)
+
+    async def _actualizar(self, row_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        row_uuid = _uuid(row_id)
+        if row_uuid is None:
+            return None
+        statement = update(self.model).where(self.model.id == row_uuid).values(**_valores_sql(self.model, updates)).returning(self.model)
+        async with AsyncSessionLocal() as db:
+            try:
+                fila = (await db.execute(statement)).scalars().first()
+                await db.commit()
+            except IntegrityError as e:
+                await db.rollback()
+                print(f"❌ Error actualizando {self.model.__tablename__}: {e}")
+                return None
+            return _a_dict(fila)
+
+    async def _borrar(self, row_id: str) -> bool:
+        row_uuid = _uuid(row_id)
+        if row_uuid is None:
+            return False
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(self.model).where(self.model.id == row_uuid))
+            await db.commit()
+            return result.rowcount > 0
+
+    async def _por_id(self, row_id: str) -> Optional[Dict[str, Any]]:
+        row_uuid = _uuid(row_id)
+        if row_uuid is None:
+            return None
+        return await self._fila(select(self.model).where(self.model.id == row_uuid))
+
+
+class UserSqlBackend(_SqlBackend):
+    model = Usuario
+
+    async def get_by_email(self, email):
+        return await self._fila(select(self.model).where(self.model.email == email))
+
+    async def get_by_id(self, user_id):
+        return await self._por_id(user_id)
+
+    async def get_by_code(self, column, code):
+        if column not in CODIGOS_USUARIO:
+            raise ValueError(f"Columna de código no permitida: {column}")
+        return await self._fila(select(self.model).where(getattr(self.model, column) == code).limit(1))
+
+    async def create(self, data):
+        return await self._crear(data)
+
+    async def update(self, user_id, updates):
+        return await self._actualizar(user_id, updates)
+
+    async def delete(self, user_id):
+        return await self._borrar(user_id)
+
+    async def list(self, skip, limit):
+        return await self._filas(select(self.model).offset(skip).limit(limit))
+
+    async def page(self, limit, after):
+        statement = select(self.model).order_by(self.model.created_at.desc(), self.model.id.desc()).limit(limit)
+        if after:
+            statement = statement.where(_despues_de(self.model, after))
+        return await self._filas(statement)
+
+    async def count(self, rol):
+        statement = select(func.count()).select_from(self.model)
+        if rol is not None:
+            statement = statement.where(self.model.rol == rol)
+        return await self._escalar(statement)
+
+
+class ProductSqlBackend(_SqlBackend):
+    model = Producto
+
+    def _query(self, filters: Optional[Dict[str, Any]], paginar: bool = True):
+        """Equivalente SQL de _SupabaseBase._productos_query"""
+        statement = select(Producto)
+        if not filters:
+            return statement
+
+        if filters.get("categoria"):
+            statement = statement.where(Producto.categoria == filters["categoria"])
+        if filters.get("destacado") is not None:
+            statement = statement.where(Producto.destacado == filters["destacado"])
+        if filters.get("activo") is not None:
+            statement = statement.where(Producto.activo == filters["activo"])
+        if filters.get("precio_min") is not None:
+            statement = statement.where(Producto.precio >= filters["precio_min"])
+        if filters.get("precio_max") is not None:
+            statement = statement.where(Producto.precio <= filters["precio_max"])
+        if filters.get("stock_min") is not None:
+            statement = statement.where(Producto.stock >= filters["stock_min"])
+
+        if filters.get("after"):
+            statement = statement.where(_despues_de(Producto, filters["after"]))
+        if "after" in filters:
+            statement = statement.order_by(*_orden_sql(Producto, ORDENES_PRODUCTOS["default"]))
+        elif filters.get("order"):
+            statement = statement.order_by(*_orden_sql(Producto, ORDENES_PRODUCTOS[filters["order"]]))
+
+        if paginar:
+            statement = statement.offset(filters.get("skip", 0)).limit(filters.get("limit", 100))
+        return statement
+
+    async def list(self, filters):
+        return await self._filas(self._query(filters))
+
+    async def list_with_total(self, filters):
+        total = await self._escalar(
+            select(func.count()).select_from(self._query(filters, paginar=False).order_by(None).subquery())
+        )
+        return await self._filas(self._query(filters)), total
+
+    async def get_by_id(self, producto_id):
+        return await self._por_id(producto_id)
+
+    async def list_images(self, skip, limit):
+        statement = (
+            select(Producto.id, Producto.imagen_url, Producto.imagenes_urls, Producto.imagenes_variantes)
+            .order_by(Producto.id.asc()).offset(skip).limit(limit)
+        )
+        return await self._columnas(statement)
+
+    async def find_by_image(self, clave, exclude_id, limit):
+        if not re.fullmatch(r"[0-9a-f]+", clave):
+            raise ValueError(f"Clave de imagen no válida: {clave}")
+        statement = (
+            select(Producto.id, Producto.imagenes_urls, Producto.imagenes_variantes)
+            .where(Producto.imagenes_urls.like(f"%{clave}%")).limit(limit)
+        )
+        if exclude_id is not None:
+            statement = statement.where(Producto.id != _uuid(exclude_id))
+        return await self._columnas(statement)
+
+    async def create(self, data):
+        return await self._crear(data)
+
+    async def update(self, producto_id, updates):
+        return await self._actualizar(producto_id, updates)
+
+    async def delete(self, producto_id):
+        return await self._borrar(producto_id)
+
+
+class CarouselSqlBackend(_SqlBackend):
+    model = Carrusel
+
+    async def list(self, activo):
+        statement = select(self.model).order_by(self.model.orden.asc())
+        if activo is not None:
+            statement = statement.where(self.model.activo == activo)
+        return await self._filas(statement)
+
+    async def get_by_id(self, carrusel_id):
+        return await self._por_id(carrusel_id)
+
+    async def create(self, data):
+        return await self._crear(data)
+
+    async def update(self, carrusel_id, updates):
+        return await self._actualizar(carrusel_id, updates)
+
+    async def delete(self, carrusel_id):
+        return await self._borrar(carrusel_id)
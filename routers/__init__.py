@@ -2,5 +2,6 @@
 from .auth_router import router as auth_router
 from .productos_router import router as productos_router
 from .carrusel_router import router as carrusel_router
+from .categorias_router import router as categorias_router
 
-__all__ = ['auth_router', 'productos_router', 'carrusel_router']
\ No newline at end of file
+__all__ = ['auth_router', 'productos_router', 'carrusel_router', 'categorias_router']
\ No newline at end of file
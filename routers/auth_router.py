@@ -17,13 +17,17 @@ from pydantic import BaseModel
 import secrets
 import uuid
 
-from supabase_client import supabase
+from repositories import users
 from schemas import UsuarioCreate, UsuarioLogin, Token
+from pagination import decode_cursor, keyset_page
 from auth import (
-    hash_password,
-    verify_password,
-    create_access_token,
-    decode_access_token,
+    hash_password_async,
+    verify_password_async,
+    create_user_token,
+    get_user_from_token,
+    invalidate_token_version,
+    next_token_version,
+    con_token_version,
 )
 from email_service import (
     send_verification_email,
@@ -56,7 +60,7 @@ def create_user_session_data(user: dict) -> dict:
     }
 
 
-def _get_user_from_request(request: Request) -> dict | None:
+async def _get_user_from_request(request: Request) -> dict | None:
     """
     Obtiene el usuario autenticado desde:
       1. Sesión del servidor (cookie)
@@ -71,22 +75,17 @@ def _get_user_from_request(request: Request) -> dict | None:
     auth_header = request.headers.get("Authorization", "")
     if auth_header.startswith("Bearer "):
         token = auth_header.split(" ", 1)[1]
-        payload = decode_access_token(token)
-        if payload:
-            user_id = payload.get("sub")
-            if user_id:
-                try:
-                    user = supabase.get_user_by_id(str(user_id))
-                    if user:
-                        return create_user_session_data(user)
-                except Exception as e:
-                    print(f"⚠️ Error obteniendo usuario por token: {e}")
+        try:
+            # Claims del token: sin consultar al usuario en cada petición
+            return await get_user_from_token(token)
+        except Exception as e:
+            print(f"⚠️ Error validando token: {e}")
     return None
 
 
-def _require_user(request: Request) -> dict:
+async def _require_user(request: Request) -> dict:
     """Como _get_user_from_request pero lanza 401 si no hay usuario."""
-    user = _get_user_from_request(request)
+    user = await _get_user_from_request(request)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -125,7 +124,7 @@ async def register_user(user_data: UsuarioCreate, request: Request):
     """Registra un nuevo usuario y envía email de verificación."""
 
     # Verificar duplicado
-    existing = supabase.get_user_by_email(user_data.email)
+    existing = await users.get_by_email(user_data.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -138,7 +137,7 @@ async def register_user(user_data: UsuarioCreate, request: Request):
         "id":                   str(uuid.uuid4()),
         "email":                user_data.email,
         "nombre":               user_data.nombre,
-        "password_hash":        hash_password(user_data.password),
+        "password_hash":        await hash_password_async(user_data.password),
         "rol":                  "usuario",
         "email_verified":       False,
         "verification_code":    verification_code,
@@ -147,7 +146,7 @@ async def register_user(user_data: UsuarioCreate, request: Request):
     }
 
     try:
-        new_user = supabase.create_user(new_user_data)
+        new_user = await users.create(new_user_data)
     except Exception as e:
         print(f"❌ Excepción al crear usuario: {e}")
         raise HTTPException(
@@ -168,7 +167,7 @@ async def register_user(user_data: UsuarioCreate, request: Request):
     except Exception as e:
         print(f"⚠️ No se pudo enviar email de verificación: {e}")
 
-    access_token = create_access_token(data={"sub": str(new_user["id"])})
+    access_token = create_user_token(new_user)
     request.session["user"] = create_user_session_data(new_user)
 
     print(f"✅ Registro exitoso: {new_user['email']}")
@@ -182,7 +181,7 @@ async def login(user_data: UsuarioLogin, request: Request):
     """Inicia sesión y devuelve token JWT."""
 
     try:
-        user = supabase.get_user_by_email(user_data.email)
+        user = await users.get_by_email(user_data.email)
     except Exception as e:
         print(f"❌ Error consultando usuario en login: {e}")
         raise HTTPException(
@@ -191,13 +190,13 @@ async def login(user_data: UsuarioLogin, request: Request):
                    "Verifica que el RLS de Supabase esté deshabilitado.",
         )
 
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    if not user or not await verify_password_async(user_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
         )
 
-    access_token = create_access_token(data={"sub": str(user["id"])})
+    access_token = create_user_token(user)
     session_data = create_user_session_data(user)
     request.session["user"] = session_data
 
@@ -218,10 +217,10 @@ async def logout_endpoint(request: Request):
 @router.get("/me")
 async def get_profile(request: Request):
     """Devuelve el perfil completo del usuario (datos frescos de BD)."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
     try:
-        user = supabase.get_user_by_id(user_session["id"])
+        user = await users.get_by_id(user_session["id"])
     except Exception as e:
         print(f"❌ Error obteniendo perfil: {e}")
         raise HTTPException(status_code=500, detail="Error al obtener perfil de la base de datos")
@@ -236,15 +235,25 @@ async def get_profile(request: Request):
 
 @router.put("/me")
 async def update_profile(nombre: str, request: Request):
-    """Actualiza el nombre del usuario."""
-    user_session = _require_user(request)
+    """Actualiza el nombre del usuario (devuelve un token con el nombre nuevo)."""
+    user_session = await _require_user(request)
 
-    updated = supabase.update_user(user_session["id"], {"nombre": nombre})
+    user = await users.get_by_id(user_session["id"])
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    # El nombre es un claim: los tokens con el nombre anterior dejan de valer
+    updated = await users.update(user["id"], con_token_version(user, {"nombre": nombre}))
+    invalidate_token_version(user["id"])
     if not updated:
         raise HTTPException(status_code=500, detail="Error al actualizar usuario")
 
     request.session["user"] = create_user_session_data(updated)
-    return updated
+    return {
+        **updated,
+        "access_token": create_user_token(updated),
+        "token_type":   "bearer",
+    }
 
 
 # ── CAMBIO DE CONTRASEÑA ──────────────────────────────────────────────────────
@@ -252,33 +261,47 @@ async def update_profile(nombre: str, request: Request):
 @router.post("/change-password")
 async def change_password(body: ChangePasswordRequest, request: Request):
     """Cambia la contraseña (requiere la contraseña actual)."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
-    user = supabase.get_user_by_id(user_session["id"])
+    user = await users.get_by_id(user_session["id"])
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    if not verify_password(body.current_password, user["password_hash"]):
+    if not await verify_password_async(body.current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="La contraseña actual es incorrecta")
 
     if len(body.new_password) < 6:
         raise HTTPException(status_code=400, detail="La nueva contraseña debe tener al menos 6 caracteres")
 
-    supabase.update_user(user["id"], {"password_hash": hash_password(body.new_password)})
+    # Nueva token_version: revoca los tokens emitidos con la contraseña anterior
+    updated = await users.update(user["id"], {
+        "password_hash": await hash_password_async(body.new_password),
+        "token_version": next_token_version(user),
+    })
+    invalidate_token_version(user["id"])
+    if not updated:
+        raise HTTPException(status_code=500, detail="Error al actualizar la contraseña")
+
     print(f"✅ Contraseña cambiada: {user['email']}")
-    return {"message": "Contraseña actualizada exitosamente"}
+    return {
+        "message":      "Contraseña actualizada exitosamente",
+        "access_token": create_user_token(updated),
+        "token_type":   "bearer",
+    }
 
 
 # ── VERIFICACIÓN DE EMAIL ─────────────────────────────────────────────────────
 
 @router.get("/verify-email")
-async def verify_email_link(code: str):
+async def verify_email_link(code: str, request: Request):
     """
     Endpoint que se activa al hacer clic en el botón del correo.
     Verifica el email y redirige al perfil.
+
+    Los tokens emitidos con email_verified=False quedan revocados; si el
+    enlace se abre en el navegador con sesión, la sesión se actualiza.
     """
-    all_users = supabase.get_all_users()
-    user = next((u for u in all_users if u.get("verification_code") == code), None)
+    user = await users.get_by_code("verification_code", code)
 
     if not user:
         return RedirectResponse(url="/perfil?verified=error", status_code=303)
@@ -289,11 +312,18 @@ async def verify_email_link(code: str):
         if utc_now() > expires:
             return RedirectResponse(url="/perfil?verified=expired", status_code=303)
 
-    supabase.update_user(user["id"], {
+    updated = await users.update(user["id"], con_token_version(user, {
         "email_verified":       True,
         "verification_code":    None,
         "verification_expires": None,
-    })
+    }))
+    invalidate_token_version(user["id"])
+    if not updated:
+        return RedirectResponse(url="/perfil?verified=error", status_code=303)
+
+    sesion = request.session.get("user")
+    if sesion and sesion.get("id") == str(updated["id"]):
+        request.session["user"] = create_user_session_data(updated)
     print(f"✅ Email verificado (link): {user['email']}")
     return RedirectResponse(url="/perfil?verified=ok", status_code=303)
 
@@ -301,9 +331,9 @@ async def verify_email_link(code: str):
 @router.post("/verify-email-code")
 async def verify_email_with_code(body: VerifyEmailCodeRequest, request: Request):
     """Verifica el email pegando el código manualmente desde el perfil."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
-    user = supabase.get_user_by_id(user_session["id"])
+    user = await users.get_by_id(user_session["id"])
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -322,22 +352,31 @@ async def verify_email_with_code(body: VerifyEmailCodeRequest, request: Request)
         if utc_now() > expires:
             raise HTTPException(status_code=400, detail="El código ha expirado")
 
-    updated = supabase.update_user(user["id"], {
+    # email_verified es un claim: se revocan los tokens anteriores y se emite uno nuevo
+    updated = await users.update(user["id"], con_token_version(user, {
         "email_verified":       True,
         "verification_code":    None,
         "verification_expires": None,
-    })
+    }))
+    invalidate_token_version(user["id"])
+    if not updated:
+        raise HTTPException(status_code=500, detail="Error al verificar el email")
+
     request.session["user"] = create_user_session_data(updated)
     print(f"✅ Email verificado (código): {updated['email']}")
-    return {"message": "Email verificado exitosamente"}
+    return {
+        "message":      "Email verificado exitosamente",
+        "access_token": create_user_token(updated),
+        "token_type":   "bearer",
+    }
 
 
 @router.post("/resend-verification")
 async def resend_verification(request: Request):
     """Reenvía el código de verificación al email del usuario."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
-    user = supabase.get_user_by_id(user_session["id"])
+    user = await users.get_by_id(user_session["id"])
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -347,7 +386,7 @@ async def resend_verification(request: Request):
     new_code    = secrets.token_urlsafe(8)
     new_expires = (utc_now() + timedelta(hours=24)).isoformat()
 
-    supabase.update_user(user["id"], {
+    await users.update(user["id"], {
         "verification_code":    new_code,
         "verification_expires": new_expires,
     })
@@ -368,7 +407,7 @@ async def request_password_reset(body: RequestPasswordResetRequest):
     Genera un código de recuperación y lo envía por email.
     Siempre responde OK (no revela si el email existe).
     """
-    user = supabase.get_user_by_email(body.email)
+    user = await users.get_by_email(body.email)
 
     if not user:
         print(f"⚠️ Reset solicitado para email inexistente: {body.email}")
@@ -377,7 +416,7 @@ async def request_password_reset(body: RequestPasswordResetRequest):
     reset_code    = secrets.token_urlsafe(8)
     reset_expires = (utc_now() + timedelta(hours=1)).isoformat()
 
-    supabase.update_user(user["id"], {
+    await users.update(user["id"], {
         "password_reset_code":    reset_code,
         "password_reset_expires": reset_expires,
     })
@@ -397,8 +436,7 @@ async def reset_password(body: ResetPasswordRequest):
     if len(body.new_password) < 6:
         raise HTTPException(status_code=400, detail="La contraseña debe tener al menos 6 caracteres")
 
-    all_users = supabase.get_all_users()
-    user = next((u for u in all_users if u.get("password_reset_code") == body.code), None)
+    user = await users.get_by_code("password_reset_code", body.code)
 
     if not user:
         raise HTTPException(status_code=400, detail="Código inválido o expirado")
@@ -411,11 +449,13 @@ async def reset_password(body: ResetPasswordRequest):
     if utc_now() > expires:
         raise HTTPException(status_code=400, detail="El código ha expirado. Solicita uno nuevo.")
 
-    supabase.update_user(user["id"], {
-        "password_hash":          hash_password(body.new_password),
+    await users.update(user["id"], {
+        "password_hash":          await hash_password_async(body.new_password),
         "password_reset_code":    None,
         "password_reset_expires": None,
+        "token_version":          next_token_version(user),
     })
+    invalidate_token_version(user["id"])
 
     print(f"✅ Contraseña restablecida: {user['email']}")
     return {"message": "Contraseña restablecida exitosamente"}
@@ -426,21 +466,21 @@ async def reset_password(body: ResetPasswordRequest):
 @router.post("/request-email-change")
 async def request_email_change(body: RequestEmailChangeRequest, request: Request):
     """Solicita cambio de email: envía código al nuevo correo."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
-    if supabase.get_user_by_email(body.new_email):
+    if await users.get_by_email(body.new_email):
         raise HTTPException(status_code=400, detail="Ese email ya está registrado")
 
     code    = secrets.token_urlsafe(8)
     expires = (utc_now() + timedelta(hours=1)).isoformat()
 
-    supabase.update_user(user_session["id"], {
+    await users.update(user_session["id"], {
         "pending_email":         body.new_email,
         "pending_email_code":    code,
         "pending_email_expires": expires,
     })
 
-    user = supabase.get_user_by_id(user_session["id"])
+    user = await users.get_by_id(user_session["id"])
     try:
         send_email_change_verification(body.new_email, user["nombre"], code)
     except Exception as e:
@@ -453,9 +493,9 @@ async def request_email_change(body: RequestEmailChangeRequest, request: Request
 @router.post("/verify-email-change")
 async def verify_email_change(body: VerifyEmailChangeRequest, request: Request):
     """Confirma el cambio de email con el código recibido."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
-    user = supabase.get_user_by_id(user_session["id"])
+    user = await users.get_by_id(user_session["id"])
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -468,15 +508,24 @@ async def verify_email_change(body: VerifyEmailChangeRequest, request: Request):
         if utc_now() > expires:
             raise HTTPException(status_code=400, detail="El código ha expirado")
 
-    updated = supabase.update_user(user["id"], {
+    updated = await users.update(user["id"], {
         "email":                 user["pending_email"],
         "pending_email":         None,
         "pending_email_code":    None,
         "pending_email_expires": None,
+        "token_version":         next_token_version(user),
     })
+    invalidate_token_version(user["id"])
+    if not updated:
+        raise HTTPException(status_code=500, detail="Error al actualizar el email")
+
     request.session["user"] = create_user_session_data(updated)
     print(f"✅ Email cambiado a: {updated['email']}")
-    return {"message": "Email actualizado exitosamente"}
+    return {
+        "message":      "Email actualizado exitosamente",
+        "access_token": create_user_token(updated),
+        "token_type":   "bearer",
+    }
 
 
 # ── ELIMINAR CUENTA ───────────────────────────────────────────────────────────
@@ -484,20 +533,22 @@ async def verify_email_change(body: VerifyEmailChangeRequest, request: Request):
 @router.delete("/delete-account")
 async def delete_account(request: Request):
     """Elimina la cuenta del usuario autenticado."""
-    user_session = _require_user(request)
+    user_session = await _require_user(request)
 
     if user_session.get("rol") == "admin":
-        all_users   = supabase.get_all_users()
-        admin_count = sum(1 for u in all_users if u.get("rol") == "admin")
+        admin_count = await users.count(rol="admin")
+        if admin_count is None:
+            raise HTTPException(status_code=503, detail="No se pudo verificar el número de administradores")
         if admin_count <= 1:
             raise HTTPException(
                 status_code=400,
                 detail="No puedes eliminar la última cuenta de administrador"
             )
 
-    ok = supabase.delete_user(user_session["id"])
+    ok = await users.delete(user_session["id"])
     if not ok:
         raise HTTPException(status_code=500, detail="Error al eliminar cuenta")
+    invalidate_token_version(user_session["id"])
 
     request.session.clear()
     print(f"✅ Cuenta eliminada: {user_session['email']}")
@@ -507,8 +558,24 @@ async def delete_account(request: Request):
 # ── ADMIN ─────────────────────────────────────────────────────────────────────
 
 @router.get("/users")
-async def list_users(skip: int = 0, limit: int = 100, request: Request = None):
-    user_session = _require_user(request)
+async def list_users(skip: int = 0, limit: int = 100, cursor: str | None = None, request: Request = None):
+    """
+    Lista usuarios (solo admin).
+    Con ``cursor`` ("" = primera página) usa paginación keyset por (created_at, id)
+    y devuelve {"items", "next_cursor", "limit"}; sin él, la lista por offset.
+    """
+    user_session = await _require_user(request)
     if user_session.get("rol") != "admin":
         raise HTTPException(status_code=403, detail="No tiene permisos de administrador")
-    return supabase.get_all_users(skip, limit)
\ No newline at end of file
+
+    if cursor is None:
+        return await users.list(skip, limit)
+
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filas = await users.page(limit + 1, after)
+    items, next_cursor = keyset_page(filas, limit)
+    return {"items": items, "next_cursor": next_cursor, "limit": limit}
\ No newline at end of file
@@ -1,24 +1,23 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+﻿from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Request
 from fastapi.responses import JSONResponse
-from typing import List, Optional
-from supabase import create_client, Client
+from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
+import json
 import uuid
-from PIL import Image
-import io
 
-from supabase_client import supabase as supabase_rest
+import storage_service
+from repositories import carousel
+from cache import catalog_cache, invalidate_carrusel
+from page_cache import purge_carrusel
+from http_cache import conditional_json
+from storage_queue import BUCKET_CARRUSEL
+from imagenes import urls_de_srcset, cargar_variantes
 
 load_dotenv()
 
 router = APIRouter(prefix="/carrusel")
 
-# Configurar Supabase Client para Storage
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase_storage: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 # ========== FUNCIONES AUXILIARES ==========
 
 def get_current_admin_from_session(request: Request):
@@ -31,81 +30,34 @@ def get_current_admin_from_session(request: Request):
         )
     return user_session
 
-def optimize_carousel_image(file_content: bytes, max_size: tuple = (1920, 1080)) -> bytes:
-    """Optimiza imagen del carrusel"""
-    image = Image.open(io.BytesIO(file_content))
-    
-    if image.mode in ('RGBA', 'LA', 'P'):
-        background = Image.new('RGB', image.size, (255, 255, 255))
-        if image.mode == 'P':
-            image = image.convert('RGBA')
-        background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-        image = background
-    
-    image.thumbnail(max_size, Image.Resampling.LANCZOS)
-    
-    output = io.BytesIO()
-    image.save(output, format='JPEG', quality=90, optimize=True)
-    return output.getvalue()
+async def upload_carousel_image(file: UploadFile) -> Dict[str, str]:
+    """
+    Sube imagen del carrusel a Supabase Storage con sus variantes responsivas
 
-async def upload_carousel_image(file: UploadFile) -> str:
-    """Sube imagen del carrusel a Supabase Storage"""
-    
-    file_content = await file.read()
-    
-    if not file_content:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El archivo está vacío"
-        )
-    
-    try:
-        optimized_content = optimize_carousel_image(file_content)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error al procesar imagen: {str(e)}"
-        )
-    
-    file_extension = file.filename.split('.')[-1].lower()
-    if file_extension not in ['jpg', 'jpeg', 'png', 'webp']:
-        file_extension = 'jpg'
-    
-    unique_filename = f"carousel_{uuid.uuid4()}.{file_extension}"
-    
-    try:
-        supabase_storage.storage.from_("carrusel-images").upload(
-            path=unique_filename,
-            file=optimized_content,
-            file_options={"content-type": "image/jpeg", "upsert": "false"}
-        )
-        
-        public_url = supabase_storage.storage.from_("carrusel-images").get_public_url(unique_filename)
-        return public_url
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al subir imagen: {str(e)}"
-        )
+    Returns:
+        {"src": URL del JPEG, "webp": srcset, "avif": srcset (si hay codec)}
+    """
+    return await storage_service.subir_imagen(BUCKET_CARRUSEL, file)
 
-async def delete_carousel_image(image_url: str):
-    """Elimina imagen del carrusel de Supabase Storage"""
-    try:
-        filename = image_url.split('/')[-1]
-        supabase_storage.storage.from_("carrusel-images").remove([filename])
-    except Exception as e:
-        print(f"⚠️ Error al eliminar imagen: {e}")
+async def delete_carousel_images(item: dict):
+    """Elimina la imagen del item y todas sus variantes (en un solo lote)"""
+    urls = urls_de_srcset(cargar_variantes(item.get("imagen_variantes")))
+    urls.append(item.get("imagen_url"))
+    await storage_service.borrar_objetos(BUCKET_CARRUSEL, urls)
+
+def _campos_imagen(imagen: Dict[str, str]) -> dict:
+    """Columnas imagen_url / imagen_variantes a partir de la imagen subida"""
+    return {"imagen_url": imagen["src"], "imagen_variantes": json.dumps(imagen)}
 
 # ========== ENDPOINTS PÚBLICOS ==========
 
 @router.get("", response_model=List[dict])
-async def get_carrusel_items(activo: Optional[bool] = None):
-    """Obtiene items del carrusel ordenados"""
+async def get_carrusel_items(request: Request, activo: Optional[bool] = None):
+    """Obtiene items del carrusel ordenados (soporta If-None-Match → 304)"""
     
     try:
-        items = supabase_rest.get_carrusel_items(activo)
-        return items
+        items = await items_carrusel(activo)
+        return conditional_json(request, items, "carrusel", activo)
     except Exception as e:
         print(f"❌ Error obteniendo carrusel: {e}")
         raise HTTPException(
@@ -113,11 +65,19 @@ async def get_carrusel_items(activo: Optional[bool] = None):
             detail=str(e)
         )
 
+async def items_carrusel(activo: Optional[bool] = None) -> List[dict]:
+    """Items del carrusel servidos desde catalog_cache (API y renderizado en servidor)"""
+    items = catalog_cache.get(("carrusel", activo))
+    if items is None:
+        items = await carousel.list(activo)
+        catalog_cache.set(("carrusel", activo), items)
+    return items
+
 @router.get("/{item_id}")
 async def get_carrusel_item(item_id: str):
     """Obtiene un item del carrusel por ID"""
     
-    item = supabase_rest.get_carrusel_by_id(item_id)
+    item = await carousel.get_by_id(item_id)
     
     if not item:
         raise HTTPException(
@@ -145,7 +105,7 @@ async def create_carrusel_item(
     
     try:
         # Subir imagen
-        imagen_url = await upload_carousel_image(imagen)
+        imagen_subida = await upload_carousel_image(imagen)
         
         # Crear item
         carrusel_data = {
@@ -154,10 +114,10 @@ async def create_carrusel_item(
             "descripcion": descripcion,
             "orden": orden,
             "activo": activo,
-            "imagen_url": imagen_url
+            **_campos_imagen(imagen_subida)
         }
         
-        nuevo_item = supabase_rest.create_carrusel(carrusel_data)
+        nuevo_item = await carousel.create(carrusel_data)
         
         if not nuevo_item:
             raise HTTPException(
@@ -165,6 +125,9 @@ async def create_carrusel_item(
                 detail="Error al crear item del carrusel"
             )
         
+        invalidate_carrusel()
+        purge_carrusel()
+        
         return nuevo_item
         
     except HTTPException:
@@ -179,6 +142,7 @@ async def create_carrusel_item(
 @router.put("/{item_id}")
 async def update_carrusel_item(
     request: Request,
+    background_tasks: BackgroundTasks,
     item_id: str,
     titulo: Optional[str] = Form(None),
     descripcion: Optional[str] = Form(None),
@@ -193,7 +157,7 @@ async def update_carrusel_item(
     
     try:
         # Obtener item actual
-        item = supabase_rest.get_carrusel_by_id(item_id)
+        item = await carousel.get_by_id(item_id)
         if not item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -211,14 +175,13 @@ async def update_carrusel_item(
         if activo is not None:
             updates["activo"] = activo
         
-        # Actualizar imagen si se proporciona
-        if imagen and imagen.filename:
-            if item.get("imagen_url"):
-                await delete_carousel_image(item["imagen_url"])
-            updates["imagen_url"] = await upload_carousel_image(imagen)
+        # Actualizar imagen si se proporciona (la anterior se borra tras responder)
+        reemplazar_imagen = bool(imagen and imagen.filename)
+        if reemplazar_imagen:
+            updates.update(_campos_imagen(await upload_carousel_image(imagen)))
         
         # Actualizar item
-        item_actualizado = supabase_rest.update_carrusel(item_id, updates)
+        item_actualizado = await carousel.update(item_id, updates)
         
         if not item_actualizado:
             raise HTTPException(
@@ -226,6 +189,12 @@ async def update_carrusel_item(
                 detail="Error al actualizar item del carrusel"
             )
         
+        invalidate_carrusel()
+        purge_carrusel()
+        
+        if reemplazar_imagen:
+            background_tasks.add_task(delete_carousel_images, item)
+        
         return item_actualizado
         
     except HTTPException:
@@ -238,26 +207,22 @@ async def update_carrusel_item(
         )
 
 @router.delete("/{item_id}")
-async def delete_carrusel_item(request: Request, item_id: str):
+async def delete_carrusel_item(request: Request, background_tasks: BackgroundTasks, item_id: str):
     """Elimina item del carrusel (solo admin)"""
     
     # Verificar admin
     get_current_admin_from_session(request)
     
     try:
-        item = supabase_rest.get_carrusel_by_id(item_id)
+        item = await carousel.get_by_id(item_id)
         if not item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Item del carrusel no encontrado"
             )
         
-        # Eliminar imagen
-        if item.get("imagen_url"):
-            await delete_carousel_image(item["imagen_url"])
-        
         # Eliminar item
-        success = supabase_rest.delete_carrusel(item_id)
+        success = await carousel.delete(item_id)
         
         if not success:
             raise HTTPException(
@@ -265,6 +230,12 @@ async def delete_carrusel_item(request: Request, item_id: str):
                 detail="Error al eliminar item del carrusel"
             )
         
+        invalidate_carrusel()
+        purge_carrusel()
+        
+        # Eliminar imagen y variantes tras responder
+        background_tasks.add_task(delete_carousel_images, item)
+        
         # ✅ SIEMPRE retornar JSON con status 200
         return JSONResponse(
             status_code=200,
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, status, Request
+
+from categorias import categorias_con_conteo
+from http_cache import conditional_json
+
+router = APIRouter(prefix="/categorias")
+
+# ========== ENDPOINTS PÚBLICOS ==========
+
+@router.get("")
+async def get_categorias(request: Request):
+    """
+    Registro de categorías con su número de productos activos (soporta If-None-Match → 304)
+
+    Cada item: slug, valor (productos.categoria), nombre, orden, imagen, url, total.
+    """
+    try:
+        categorias = await categorias_con_conteo()
+        return conditional_json(request, categorias, "categorias")
+    except Exception as e:
+        print(f"❌ Error obteniendo categorías: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
@@ -1,26 +1,31 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+﻿from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
 from fastapi.responses import JSONResponse
-from typing import List, Optional
-from supabase import create_client, Client
+from typing import Dict, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
+import asyncio
 import uuid
-from PIL import Image
-import io
+from datetime import datetime, timezone
 import json
 
-from supabase_client import supabase as supabase_rest
-from schemas import ProductoResponse
-from auth import decode_access_token
+import storage_service
+from supabase_client import ORDENES_PRODUCTOS
+from repositories import products
+from cache import catalog_cache, productos_key, invalidate_productos
+from page_cache import purge_productos
+from http_cache import conditional_json
+from search_index import search_index
+from storage_queue import BUCKET_PRODUCTOS, deletion_queue
+from pagination import decode_cursor, keyset_page
+from imagenes import urls_de_srcset, cargar_variantes, clave_de_url
 
 load_dotenv()
 
 router = APIRouter(prefix="/productos")
 
-# Configurar Supabase Client para Storage
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase_storage: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Máximo de productos activos que se cargan al construir el índice de búsqueda
+SEARCH_INDEX_MAX_PRODUCTS = int(os.getenv("SEARCH_INDEX_MAX_PRODUCTS", "5000"))
+_search_index_lock = asyncio.Lock()
 
 # ========== FUNCIONES AUXILIARES ==========
 
@@ -34,131 +39,293 @@ def get_current_admin_from_session(request: Request):
         )
     return user_session
 
-def optimize_image(file_content: bytes, max_size: tuple = (1200, 1200)) -> bytes:
-    """Optimiza una imagen"""
-    image = Image.open(io.BytesIO(file_content))
-    
-    if image.mode in ('RGBA', 'LA', 'P'):
-        background = Image.new('RGB', image.size, (255, 255, 255))
-        if image.mode == 'P':
-            image = image.convert('RGBA')
-        background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-        image = background
-    
-    image.thumbnail(max_size, Image.Resampling.LANCZOS)
-    
-    output = io.BytesIO()
-    image.save(output, format='JPEG', quality=85, optimize=True)
-    return output.getvalue()
+# 🔥 NUEVA: Subir múltiples imágenes
+async def upload_multiple_images(files: List[UploadFile]) -> Tuple[List[Dict[str, str]], List[dict]]:
+    """
+    Procesa y sube varias imágenes de producto en paralelo
+
+    Los objetos se nombran por contenido (``producto_<sha256>``): si algún
+    producto ya usa la misma foto se reutilizan sus URLs.
+
+    Returns:
+        (estructuras srcset subidas, fallos [{"archivo", "error"}])
+    """
+    return await storage_service.subir_imagenes(BUCKET_PRODUCTOS, files, buscar_existente=_imagen_por_clave)
+
+# 🔥 NUEVA: Eliminar múltiples imágenes
+async def delete_multiple_images(image_urls: List[str]):
+    """
+    Encola el borrado de imágenes de Supabase Storage
+
+    Se llama después de guardar el producto sin ellas. Al vaciar la cola
+    se conservan las que otro producto aún referencia (ver
+    ``_nombres_en_uso``). Pensada para ejecutarse como BackgroundTask.
+    """
+    await storage_service.borrar_objetos(BUCKET_PRODUCTOS, image_urls)
+
+async def _nombres_en_uso(nombres: List[str]) -> set:
+    """
+    Objetos del bucket de productos que alguna fila referencia
+
+    Se comprueba al vaciar la cola de borrados, no al encolar: así cuenta
+    también un producto guardado (con la misma foto) mientras tanto. Los
+    nombres antiguos con uuid no se comparten y no se consultan.
+    """
+    claves = {nombre: clave_de_url(nombre) for nombre in nombres}
+    en_uso = await _claves_en_uso({clave for clave in claves.values() if clave})
+    return {nombre for nombre, clave in claves.items() if clave in en_uso}
+
+deletion_queue.verificar_con(BUCKET_PRODUCTOS, _nombres_en_uso)
+
+async def _imagen_por_clave(clave: str) -> Optional[Dict[str, str]]:
+    """Estructura srcset de la imagen con esa clave, si algún producto la usa"""
+    try:
+        productos = await products.find_by_image(clave)
+    except Exception as e:
+        print(f"⚠️ Error buscando imagen {clave}: {e}")
+        return None
+    for producto in productos:
+        for imagen in _imagenes_producto(producto):
+            if clave_de_url(imagen["src"]) == clave:
+                return imagen
+    return None
+
+async def _claves_en_uso(claves: set, excluir_producto_id: Optional[str] = None) -> set:
+    """Claves de contenido que referencia algún otro producto"""
+    claves = list(claves)
+    resultados = await asyncio.gather(
+        *(products.find_by_image(clave, exclude_id=excluir_producto_id) for clave in claves),
+        return_exceptions=True
+    )
+    # Ante un error se asume que la imagen sigue en uso: mejor un huérfano que un enlace roto
+    return {
+        clave for clave, resultado in zip(claves, resultados)
+        if isinstance(resultado, BaseException) or resultado
+    }
+
+def _imagenes_producto(producto: dict) -> List[Dict[str, str]]:
+    """
+    Imágenes actuales del producto como estructuras srcset
+
+    Alineadas con ``imagenes_urls``; las fotos subidas antes de tener
+    variantes solo traen ``src``.
+    """
+    try:
+        urls = json.loads(producto.get("imagenes_urls") or "[]")
+    except (TypeError, ValueError):
+        urls = []
+    por_src = {
+        v.get("src"): v
+        for v in cargar_variantes(producto.get("imagenes_variantes")) or []
+        if isinstance(v, dict)
+    }
+    return [por_src.get(url, {"src": url}) for url in urls]
+
+def _urls_storage_producto(producto: dict) -> List[str]:
+    """Todos los objetos del storage del producto: fotos, principal y variantes"""
+    urls = []
+    for imagen in _imagenes_producto(producto):
+        urls.extend(urls_de_srcset(imagen))
+    if producto.get("imagen_url"):
+        urls.append(producto["imagen_url"])
+    return list(dict.fromkeys(urls))
+
+def _campos_imagenes(imagenes: List[Dict[str, str]]) -> dict:
+    """Columnas imagen_url / imagenes_urls / imagenes_variantes a partir de las imágenes"""
+    # La misma foto añadida dos veces apunta al mismo objeto: se guarda una sola vez
+    imagenes = list({imagen["src"]: imagen for imagen in imagenes}.values())
+    urls = [imagen["src"] for imagen in imagenes]
+    return {
+        "imagen_url": urls[0] if urls else None,  # Primera imagen (compatibilidad)
+        "imagenes_urls": json.dumps(urls) if urls else None,
+        "imagenes_variantes": json.dumps(imagenes) if imagenes else None,
+    }
 
-async def upload_image_to_supabase(file: UploadFile, bucket: str = "productos-images") -> str:
-    """Sube imagen a Supabase Storage"""
+async def ensure_search_index():
+    """Construye el índice de búsqueda si no existe o está vencido"""
+    if not search_index.is_stale():
+        return
+    async with _search_index_lock:
+        if search_index.is_stale():
+            productos = await products.list({
+                "activo": True,
+                "skip": 0,
+                "limit": SEARCH_INDEX_MAX_PRODUCTS
+            })
+            search_index.build(productos)
+            print(f"🔎 Índice de búsqueda construido: {len(productos)} productos")
+
+# ========== ENDPOINTS PÚBLICOS ==========
+
+@router.get("")
+async def get_productos(
+    request: Request,
+    categoria: Optional[str] = None,
+    destacado: Optional[bool] = None,
+    activo: Optional[bool] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=1000),
+    order: Optional[str] = None,
+    precio_min: Optional[float] = Query(None, ge=0),
+    precio_max: Optional[float] = Query(None, ge=0),
+    stock_min: Optional[int] = Query(None, ge=0),
+    count: Optional[str] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Obtiene lista de productos con filtros (soporta If-None-Match → 304)
     
-    file_content = await file.read()
+    - order: uno de ORDENES_PRODUCTOS (p.ej. "precio-asc")
+    - precio_min / precio_max / stock_min: filtros de rango
+    - count=exact: devuelve {"items", "total", "skip", "limit"} en lugar de la lista
+    - cursor: paginación keyset por (created_at, id); "" pide la primera página.
+      Devuelve {"items", "next_cursor", "limit"} y no admite otro order ni skip.
+    """
     
-    if not file_content:
+    if order is not None and order not in ORDENES_PRODUCTOS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El archivo está vacío"
+            detail=f"order inválido. Opciones: {', '.join(ORDENES_PRODUCTOS)}"
         )
-    
-    try:
-        optimized_content = optimize_image(file_content)
-    except Exception as e:
+    if count is not None and count != "exact":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error al procesar imagen: {str(e)}"
+            detail="count solo admite el valor 'exact'"
         )
     
-    file_extension = file.filename.split('.')[-1].lower()
-    if file_extension not in ['jpg', 'jpeg', 'png', 'webp']:
-        file_extension = 'jpg'
-    
-    unique_filename = f"producto_{uuid.uuid4()}.{file_extension}"
+    after = None
+    if cursor is not None:
+        if order not in (None, "default"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="cursor solo admite el orden por defecto (más recientes)"
+            )
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        skip = 0
     
     try:
-        supabase_storage.storage.from_(bucket).upload(
-            path=unique_filename,
-            file=optimized_content,
-            file_options={"content-type": "image/jpeg", "upsert": "false"}
+        resultado, cache_key = await consultar_productos(
+            categoria, destacado, activo, skip, limit, order,
+            precio_min, precio_max, stock_min, count, cursor, after
         )
-        
-        public_url = supabase_storage.storage.from_(bucket).get_public_url(unique_filename)
-        return public_url
-        
+        return _productos_response(request, resultado, cache_key)
     except Exception as e:
+        print(f"❌ Error obteniendo productos: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al subir imagen: {str(e)}"
+            detail=str(e)
         )
 
-async def delete_image_from_supabase(image_url: str, bucket: str = "productos-images"):
-    """Elimina imagen de Supabase Storage"""
-    try:
-        filename = image_url.split('/')[-1]
-        supabase_storage.storage.from_(bucket).remove([filename])
-    except Exception as e:
-        print(f"⚠️ Error al eliminar imagen: {e}")
-
-# 🔥 NUEVA: Subir múltiples imágenes
-async def upload_multiple_images(files: List[UploadFile]) -> List[str]:
-    """Sube múltiples imágenes y devuelve lista de URLs"""
-    urls = []
-    for file in files:
-        try:
-            url = await upload_image_to_supabase(file)
-            urls.append(url)
-        except Exception as e:
-            print(f"⚠️ Error subiendo {file.filename}: {e}")
-            # Continuar con las demás imágenes
-    return urls
-
-# 🔥 NUEVA: Eliminar múltiples imágenes
-async def delete_multiple_images(image_urls: List[str]):
-    """Elimina múltiples imágenes de Supabase Storage"""
-    for url in image_urls:
-        try:
-            await delete_image_from_supabase(url)
-        except Exception as e:
-            print(f"⚠️ Error eliminando imagen {url}: {e}")
-
-# ========== ENDPOINTS PÚBLICOS ==========
-
-@router.get("", response_model=List[dict])
-async def get_productos(
+async def consultar_productos(
     categoria: Optional[str] = None,
     destacado: Optional[bool] = None,
     activo: Optional[bool] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    order: Optional[str] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+    stock_min: Optional[int] = None,
+    count: Optional[str] = None,
+    cursor: Optional[str] = None,
+    after: Optional[Tuple[str, str]] = None
 ):
-    """Obtiene lista de productos con filtros"""
+    """
+    Listado de productos servido desde catalog_cache (parámetros ya validados)
+
+    Lo comparten GET /productos y el renderizado en servidor de las
+    páginas: la misma consulta usa la misma clave de caché.
+
+    Returns:
+        (lista o sobre paginado, clave de caché)
+    """
+    cache_key = productos_key(
+        categoria or None, destacado, activo, skip, limit,
+        order, precio_min, precio_max, stock_min, count, cursor
+    )
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached, cache_key
+    
+    filters = {}
+    if categoria:
+        filters["categoria"] = categoria
+    if destacado is not None:
+        filters["destacado"] = destacado
+    if activo is not None:
+        filters["activo"] = activo
+    filters["precio_min"] = precio_min
+    filters["precio_max"] = precio_max
+    filters["stock_min"] = stock_min
+    filters["order"] = order
+    filters["skip"] = skip
+    filters["limit"] = limit
+    
+    if cursor is not None:
+        # El keyset exige el orden (created_at, id) también en la primera
+        # página (after=None); limit + 1 filas para saber si hay siguiente
+        filters["order"] = "default"
+        filters["after"] = after
+        filters["limit"] = limit + 1
+        filas = await products.list(filters)
+        productos, next_cursor = keyset_page(filas, limit)
+        resultado = {"items": productos, "next_cursor": next_cursor, "limit": limit}
+    elif count == "exact":
+        productos, total = await products.list_with_total(filters)
+        resultado = {"items": productos, "total": total, "skip": skip, "limit": limit}
+    else:
+        resultado = await products.list(filters)
+    
+    catalog_cache.set(cache_key, resultado)
+    return resultado, cache_key
+
+def _productos_response(request: Request, resultado, cache_key: tuple):
+    """Lista simple o sobre paginado (count=exact / cursor) con validadores HTTP"""
+    if isinstance(resultado, dict) and "next_cursor" in resultado:
+        return conditional_json(
+            request, resultado, *cache_key, resultado["next_cursor"],
+            rows=resultado["items"]
+        )
+    if isinstance(resultado, dict):
+        return conditional_json(
+            request, resultado, *cache_key, resultado["total"],
+            rows=resultado["items"],
+            headers={"X-Total-Count": str(resultado["total"])} if resultado["total"] is not None else None
+        )
+    return conditional_json(request, resultado, *cache_key)
+
+@router.get("/search")
+async def search_productos(
+    q: str = Query("", max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Búsqueda por nombre, categoría y descripción (sin tildes, por prefijo)"""
+    
+    if not q.strip():
+        return []
     
     try:
-        filters = {}
-        if categoria:
-            filters["categoria"] = categoria
-        if destacado is not None:
-            filters["destacado"] = destacado
-        if activo is not None:
-            filters["activo"] = activo
-        filters["skip"] = skip
-        filters["limit"] = limit
-        
-        productos = supabase_rest.get_productos(filters)
-        return productos
+        await ensure_search_index()
     except Exception as e:
-        print(f"❌ Error obteniendo productos: {e}")
+        print(f"❌ Error construyendo índice de búsqueda: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    
+    return JSONResponse(
+        content=search_index.search(q, limit),
+        headers={"Cache-Control": "public, max-age=30"}
+    )
 
 @router.get("/{producto_id}")
-async def get_producto(producto_id: str):
-    """Obtiene un producto por ID"""
+async def get_producto(request: Request, producto_id: str):
+    """Obtiene un producto por ID (soporta If-None-Match → 304)"""
     
-    producto = supabase_rest.get_producto_by_id(producto_id)
+    producto = await obtener_producto(producto_id)
     
     if not producto:
         raise HTTPException(
@@ -166,6 +333,27 @@ async def get_producto(producto_id: str):
             detail="Producto no encontrado"
         )
     
+    return conditional_json(request, producto, "producto")
+
+async def obtener_producto(producto_id: str) -> Optional[dict]:
+    """
+    Producto por ID servido desde catalog_cache (None si no existe)
+
+    Lo comparten GET /productos/{id} y la página /producto/{id}. Un id que
+    no es UUID no llega a la base de datos.
+    """
+    try:
+        producto_id = str(uuid.UUID(producto_id))
+    except ValueError:
+        return None
+    
+    producto = catalog_cache.get(("producto", producto_id))
+    if producto is not None:
+        return producto
+    
+    producto = await products.get_by_id(producto_id)
+    if producto:
+        catalog_cache.set(("producto", producto_id), producto)
     return producto
 
 # ========== ENDPOINTS ADMIN ==========
@@ -189,16 +377,17 @@ async def create_producto(
     
     try:
         # 🔥 Subir múltiples imágenes
-        imagenes_urls = []
+        imagenes_subidas = []
+        imagenes_fallidas = []
         if imagenes and len(imagenes) > 0:
             # Filtrar archivos vacíos
             imagenes_validas = [img for img in imagenes if img.filename]
             if imagenes_validas:
-                imagenes_urls = await upload_multiple_images(imagenes_validas)
+                imagenes_subidas, imagenes_fallidas = await upload_multiple_images(imagenes_validas)
         
         # 🔥 imagen_url = primera imagen (compatibilidad)
         # imagenes_urls = array completo de URLs
-        imagen_principal = imagenes_urls[0] if imagenes_urls else None
+        # imagenes_variantes = srcset WebP/AVIF de cada imagen
         
         # Crear producto
         producto_data = {
@@ -210,11 +399,10 @@ async def create_producto(
             "stock": stock,
             "destacado": destacado,
             "activo": activo,
-            "imagen_url": imagen_principal,  # Primera imagen
-            "imagenes_urls": json.dumps(imagenes_urls) if imagenes_urls else None  # Todas las imágenes como JSON
+            **_campos_imagenes(imagenes_subidas)
         }
         
-        nuevo_producto = supabase_rest.create_producto(producto_data)
+        nuevo_producto = await products.create(producto_data)
         
         if not nuevo_producto:
             raise HTTPException(
@@ -222,7 +410,12 @@ async def create_producto(
                 detail="Error al crear producto"
             )
         
-        print(f"✅ Producto creado con {len(imagenes_urls)} imágenes")
+        invalidate_productos(categoria, producto_id=nuevo_producto.get("id"))
+        purge_productos(categoria, producto_id=nuevo_producto.get("id"))
+        search_index.upsert(nuevo_producto)
+        print(f"✅ Producto creado con {len(imagenes_subidas)} imágenes")
+        if imagenes_fallidas:
+            return {**nuevo_producto, "imagenes_fallidas": imagenes_fallidas}
         return nuevo_producto
         
     except HTTPException:
@@ -237,6 +430,7 @@ async def create_producto(
 @router.put("/{producto_id}")
 async def update_producto(
     request: Request,
+    background_tasks: BackgroundTasks,
     producto_id: str,
     nombre: Optional[str] = Form(None),
     descripcion: Optional[str] = Form(None),
@@ -255,7 +449,7 @@ async def update_producto(
     
     try:
         # Obtener producto actual
-        producto = supabase_rest.get_producto_by_id(producto_id)
+        producto = await products.get_by_id(producto_id)
         if not producto:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -279,38 +473,33 @@ async def update_producto(
         if activo is not None:
             updates["activo"] = activo
         
+        # updated_at explícito: el onupdate del ORM no aplica a PATCH vía REST
+        # y el ETag de los listados depende de este campo
+        updates["updated_at"] = datetime.now(timezone.utc).isoformat()
+        
         # 🔥 Manejar múltiples imágenes
         imagenes_validas = [img for img in imagenes if img.filename]
+        imagenes_fallidas = []
+        urls_reemplazadas = []
         
         if imagenes_validas and len(imagenes_validas) > 0:
-            # Obtener imágenes actuales
-            imagenes_actuales = []
-            if producto.get("imagenes_urls"):
-                try:
-                    imagenes_actuales = json.loads(producto["imagenes_urls"])
-                except:
-                    imagenes_actuales = []
-            
             if not mantener_imagenes:
-                # 🔥 REEMPLAZAR: Eliminar imágenes antiguas
-                if imagenes_actuales:
-                    await delete_multiple_images(imagenes_actuales)
-                elif producto.get("imagen_url"):
-                    await delete_image_from_supabase(producto["imagen_url"])
+                # 🔥 REEMPLAZAR: Subir primero (una foto repetida reutiliza el objeto
+                # actual) y borrar las antiguas solo tras guardar el producto
+                nuevas, imagenes_fallidas = await upload_multiple_images(imagenes_validas)
+                updates.update(_campos_imagenes(nuevas))
                 
-                # Subir nuevas imágenes
-                nuevas_urls = await upload_multiple_images(imagenes_validas)
-                updates["imagen_url"] = nuevas_urls[0] if nuevas_urls else None
-                updates["imagenes_urls"] = json.dumps(nuevas_urls) if nuevas_urls else None
+                urls_nuevas = {url for imagen in nuevas for url in urls_de_srcset(imagen)}
+                urls_reemplazadas = [
+                    url for url in _urls_storage_producto(producto) if url not in urls_nuevas
+                ]
             else:
                 # 🔥 AGREGAR: Mantener antiguas y agregar nuevas
-                nuevas_urls = await upload_multiple_images(imagenes_validas)
-                todas_urls = imagenes_actuales + nuevas_urls
-                updates["imagen_url"] = todas_urls[0] if todas_urls else None
-                updates["imagenes_urls"] = json.dumps(todas_urls)
+                nuevas, imagenes_fallidas = await upload_multiple_images(imagenes_validas)
+                updates.update(_campos_imagenes(_imagenes_producto(producto) + nuevas))
         
         # Actualizar producto
-        producto_actualizado = supabase_rest.update_producto(producto_id, updates)
+        producto_actualizado = await products.update(producto_id, updates)
         
         if not producto_actualizado:
             raise HTTPException(
@@ -318,6 +507,25 @@ async def update_producto(
                 detail="Error al actualizar producto"
             )
         
+        if urls_reemplazadas:
+            # Se borran tras enviar la respuesta
+            background_tasks.add_task(
+                delete_multiple_images, urls_reemplazadas
+            )
+        
+        invalidate_productos(
+            producto.get("categoria"),
+            producto_actualizado.get("categoria"),
+            producto_id=producto_id
+        )
+        purge_productos(
+            producto.get("categoria"),
+            producto_actualizado.get("categoria"),
+            producto_id=producto_id
+        )
+        search_index.upsert(producto_actualizado)
+        if imagenes_fallidas:
+            return {**producto_actualizado, "imagenes_fallidas": imagenes_fallidas}
         return producto_actualizado
         
     except HTTPException:
@@ -330,34 +538,22 @@ async def update_producto(
         )
 
 @router.delete("/{producto_id}")
-async def delete_producto(request: Request, producto_id: str):
+async def delete_producto(request: Request, background_tasks: BackgroundTasks, producto_id: str):
     """Elimina un producto (solo admin)"""
     
     # Verificar admin
     get_current_admin_from_session(request)
     
     try:
-        producto = supabase_rest.get_producto_by_id(producto_id)
+        producto = await products.get_by_id(producto_id)
         if not producto:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Producto no encontrado"
             )
         
-        # 🔥 Eliminar TODAS las imágenes
-        if producto.get("imagenes_urls"):
-            try:
-                imagenes_urls = json.loads(producto["imagenes_urls"])
-                await delete_multiple_images(imagenes_urls)
-            except:
-                pass
-        
-        # Eliminar imagen principal por si acaso
-        if producto.get("imagen_url"):
-            await delete_image_from_supabase(producto["imagen_url"])
-        
         # Eliminar producto
-        success = supabase_rest.delete_producto(producto_id)
+        success = await products.delete(producto_id)
         
         if not success:
             raise HTTPException(
@@ -365,6 +561,15 @@ async def delete_producto(request: Request, producto_id: str):
                 detail="Error al eliminar producto"
             )
         
+        invalidate_productos(producto.get("categoria"), producto_id=producto_id)
+        purge_productos(producto.get("categoria"), producto_id=producto_id)
+        search_index.remove(producto_id)
+        
+        # 🔥 Eliminar TODAS las imágenes (principal, galería y variantes) tras responder
+        background_tasks.add_task(
+            delete_multiple_images, _urls_storage_producto(producto)
+        )
+        
         # ✅ SIEMPRE retornar JSON con status 200
         return JSONResponse(
             status_code=200,
@@ -387,9 +592,14 @@ async def delete_producto(request: Request, producto_id: str):
 @router.get("/categorias/list")
 async def get_categorias():
     """Obtiene lista de categorías"""
+    categorias = catalog_cache.get(("categorias",))
+    if categorias is not None:
+        return categorias
+    
     try:
-        productos = supabase_rest.get_productos({})
+        productos = await products.list({})
         categorias = list(set(p.get("categoria") for p in productos if p.get("categoria")))
+        catalog_cache.set(("categorias",), categorias)
         return categorias
     except Exception as e:
         print(f"❌ Error obteniendo categorías: {e}")
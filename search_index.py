@@ -0,0 +1,203 @@
+# search_index.py - Índice invertido en memoria para la búsqueda de productos
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Set
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# Antigüedad máxima del índice antes de reconstruirlo desde Supabase
+# (cubre cambios hechos desde otras instancias serverless)
+SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", "300"))  # segundos
+
+# Peso de cada campo al puntuar resultados
+PESOS_CAMPOS = {"nombre": 3, "categoria": 2, "descripcion": 1}
+
+# Campos que se devuelven por resultado (payload mínimo para el type-ahead)
+CAMPOS_RESULTADO = ("id", "nombre", "categoria", "imagen_url", "precio")
+
+# Ancho de la miniatura que se sirve en los resultados
+ANCHO_MINIATURA = 200
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas y sin tildes: 'Balinería' -> 'balineria'"""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_tildes.lower()
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    """Divide un texto normalizado en tokens alfanuméricos"""
+    return _TOKEN_RE.findall(normalizar(texto))
+
+
+def _miniatura(producto: Dict[str, Any]) -> Optional[str]:
+    """URL WebP más pequeña (>= ANCHO_MINIATURA) de la primera imagen, si hay variantes"""
+    try:
+        variantes = json.loads(producto.get("imagenes_variantes") or "[]")
+        srcset = variantes[0].get("webp") if variantes else None
+        if not srcset:
+            return None
+        candidatos = sorted(
+            (int(ancho.rstrip("w")), url)
+            for url, _, ancho in (c.strip().partition(" ") for c in srcset.split(","))
+        )
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return next((url for ancho, url in candidatos if ancho >= ANCHO_MINIATURA), candidatos[-1][1])
+
+
+class ProductSearchIndex:
+    """
+    Índice invertido token -> {producto_id: peso}
+
+    Soporta coincidencia por prefijo (type-ahead) con búsqueda binaria sobre
+    la lista ordenada de tokens. Se actualiza de forma incremental con
+    ``upsert``/``remove`` cuando el admin crea, edita o elimina productos.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_tokens: Dict[str, Set[str]] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._sorted_tokens: List[str] = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.built_at: Optional[float] = None
+
+    # ========== CONSTRUCCIÓN ==========
+
+    def build(self, productos: List[Dict[str, Any]]):
+        """Reconstruye el índice completo a partir del catálogo"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_tokens.clear()
+            self._docs.clear()
+            for producto in productos:
+                self._add(producto)
+            self._sorted_tokens = sorted(self._postings)
+            self._dirty = False
+            self.built_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        """True si nunca se construyó o superó SEARCH_INDEX_MAX_AGE"""
+        return self.built_at is None or time.monotonic() - self.built_at > SEARCH_INDEX_MAX_AGE
+
+    def upsert(self, producto: Dict[str, Any]):
+        """Agrega o reemplaza un producto (los inactivos se quitan del índice)"""
+        with self._lock:
+            self._remove(str(producto.get("id")))
+            if producto.get("activo", True):
+                self._add(producto)
+            self._dirty = True
+
+    def remove(self, producto_id: str):
+        """Quita un producto del índice"""
+        with self._lock:
+            self._remove(str(producto_id))
+            self._dirty = True
+
+    def _add(self, producto: Dict[str, Any]):
+        producto_id = str(producto.get("id"))
+        tokens: Set[str] = set()
+        for campo, peso in PESOS_CAMPOS.items():
+            for token in tokenizar(producto.get(campo)):
+                docs = self._postings.setdefault(token, {})
+                docs[producto_id] = max(docs.get(producto_id, 0), peso)
+                tokens.add(token)
+        self._doc_tokens[producto_id] = tokens
+        doc = {campo: producto.get(campo) for campo in CAMPOS_RESULTADO}
+        miniatura = _miniatura(producto)
+        if miniatura:
+            doc["imagen_miniatura"] = miniatura
+        self._docs[producto_id] = doc
+
+    def _remove(self, producto_id: str):
+        for token in self._doc_tokens.pop(producto_id, ()):
+            docs = self._postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(producto_id, None)
+            if not docs:
+                del self._postings[token]
+        self._docs.pop(producto_id, None)
+
+    # ========== BÚSQUEDA ==========
+
+    def _expand(self, prefijo: str) -> Dict[str, int]:
+        """Productos con algún token que empiece por el prefijo (mejor peso)"""
+        encontrados: Dict[str, int] = {}
+        inicio = bisect.bisect_left(self._sorted_tokens, prefijo)
+        for token in self._sorted_tokens[inicio:]:
+            if not token.startswith(prefijo):
+                break
+            # Coincidencia exacta puntúa más que solo prefijo
+            bonus = 1 if token == prefijo else 0
+            for producto_id, peso in self._postings[token].items():
+                encontrados[producto_id] = max(encontrados.get(producto_id, 0), peso + bonus)
+        return encontrados
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Busca productos cuyos campos contengan todos los términos (por prefijo)
+
+        Args:
+            query: Texto libre; se normaliza igual que el catálogo
+            limit: Máximo de resultados
+
+        Returns:
+            Lista de resúmenes de producto ordenados por relevancia
+        """
+        terminos = tokenizar(query)
+        if not terminos:
+            return []
+
+        with self._lock:
+            if self._dirty:
+                self._sorted_tokens = sorted(self._postings)
+                self._dirty = False
+
+            puntajes: Optional[Dict[str, int]] = None
+            for termino in terminos:
+                encontrados = self._expand(termino)
+                if puntajes is None:
+                    puntajes = encontrados
+                else:
+                    puntajes = {
+                        pid: puntajes[pid] + peso
+                        for pid, peso in encontrados.items()
+                        if pid in puntajes
+                    }
+                if not puntajes:
+                    return []
+
+            ordenados = sorted(
+                puntajes.items(),
+                key=lambda item: (-item[1], normalizar(self._docs[item[0]].get("nombre")))
+            )
+            return [dict(self._docs[pid]) for pid, _ in ordenados[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño del índice"""
+        with self._lock:
+            return {
+                "productos": len(self._docs),
+                "tokens": len(self._postings),
+                "edad_segundos": None if self.built_at is None else round(time.monotonic() - self.built_at, 1),
+            }
+
+
+# Instancia global
+search_index = ProductSearchIndex()
@@ -156,7 +156,10 @@ async function cargarProductos() {
         if (categoria) filters.categoria = categoria;
         if (destacado !== undefined) filters.destacado = destacado;
 
-        const productos = await productosAPI.getAll(filters);
+        const [productos, categorias] = await Promise.all([
+            productosAPI.getAll(filters),
+            categoriasAPI.porValor()
+        ]);
 
         if (productos.length === 0) {
             tbody.innerHTML = '<tr><td colspan="8" class="empty-state">No hay productos</td></tr>';
@@ -166,7 +169,7 @@ async function cargarProductos() {
         tbody.innerHTML = '';
 
         productos.forEach(producto => {
-            const row = crearFilaProducto(producto);
+            const row = crearFilaProducto(producto, categorias);
             tbody.appendChild(row);
         });
 
@@ -176,21 +179,14 @@ async function cargarProductos() {
     }
 }
 
-function crearFilaProducto(producto) {
+function crearFilaProducto(producto, categorias = {}) {
     const tr = document.createElement('tr');
 
     const precio = producto.precio ? `$${Number(producto.precio).toLocaleString('es-CO')}` : 'Consultar';
 
-    const nombreCategoria = {
-        'tobilleras': 'Dijes y Herrajes',
-        'otros': 'Combos',
-        'anillos': 'Anillos',
-        'pulseras': 'Pulseras',
-        'cadenas': 'Cadenas',
-        'aretes': 'Aretes',
-        'balineria': 'Balinería'
-    };
-    const categoriaMostrar = nombreCategoria[producto.categoria] || producto.categoria;
+    // Nombre visible desde el registro de categorías (/api/categorias)
+    const categoria = categorias[producto.categoria];
+    const categoriaMostrar = categoria ? categoria.nombre : producto.categoria;
 
     const imagenCell = document.createElement('td');
     const img = document.createElement('img');
@@ -330,13 +326,17 @@ async function guardarProducto(e) {
     const imagenesFiles = imagenInput.files.length > 0 ? Array.from(imagenInput.files) : null;
 
     try {
-        if (id) {
-            await productosAPI.update(id, productoData, imagenesFiles, true);
-            alert('✅ Producto actualizado exitosamente');
-        } else {
-            await productosAPI.create(productoData, imagenesFiles);
-            alert('✅ Producto creado exitosamente');
+        const resultado = id
+            ? await productosAPI.update(id, productoData, imagenesFiles, true)
+            : await productosAPI.create(productoData, imagenesFiles);
+        const fallidas = (resultado && resultado.imagenes_fallidas) || [];
+
+        let mensaje = id ? '✅ Producto actualizado exitosamente' : '✅ Producto creado exitosamente';
+        if (fallidas.length > 0) {
+            mensaje += '\n\n⚠️ No se pudieron subir estas imágenes:\n' +
+                fallidas.map(f => `- ${f.archivo}: ${f.error}`).join('\n');
         }
+        alert(mensaje);
 
         cerrarModal(document.getElementById('modalProducto'));
         await cargarProductos();
@@ -178,6 +178,11 @@ const authAPI = {
       method: 'PUT'
     });
 
+    // El token anterior lleva el nombre viejo y queda revocado: guardar el nuevo
+    if (response && response.access_token) {
+      localStorage.setItem('token', response.access_token);
+    }
+
     const user = getCurrentUser();
     if (user && data.nombre) {
       user.nombre = data.nombre;
@@ -188,13 +193,20 @@ const authAPI = {
   },
 
   async changePassword(currentPassword, newPassword) {
-    return await fetchAPI('/auth/change-password', {
+    const response = await fetchAPI('/auth/change-password', {
       method: 'POST',
       body: JSON.stringify({
         current_password: currentPassword,
         new_password: newPassword
       })
     });
+
+    // El token anterior queda revocado: guardar el nuevo
+    if (response && response.access_token) {
+      localStorage.setItem('token', response.access_token);
+    }
+
+    return response;
   },
 
   async verifyEmailWithCode(code) {
@@ -203,6 +215,11 @@ const authAPI = {
       body: JSON.stringify({ code })
     });
 
+    // El token anterior lleva email_verified=false y queda revocado: guardar el nuevo
+    if (response && response.access_token) {
+      localStorage.setItem('token', response.access_token);
+    }
+
     const user = getCurrentUser();
     if (user) {
       user.email_verified = true;
@@ -250,29 +267,58 @@ const authAPI = {
   },
 
   async verifyEmailChange(code) {
-    return await fetchAPI('/auth/verify-email-change', {
+    const response = await fetchAPI('/auth/verify-email-change', {
       method: 'POST',
       body: JSON.stringify({ code })
     });
+
+    // El token anterior queda revocado: guardar el nuevo
+    if (response && response.access_token) {
+      localStorage.setItem('token', response.access_token);
+    }
+
+    return response;
   }
 };
 
 // ========== API DE PRODUCTOS ==========
 
-const productosAPI = {
-  async getAll(filters = {}) {
-    const params = new URLSearchParams();
+function construirParamsProductos(filters = {}) {
+  const params = new URLSearchParams();
+
+  if (filters.categoria) params.append('categoria', filters.categoria);
+  if (filters.destacado !== undefined) params.append('destacado', filters.destacado);
+  if (filters.activo !== undefined) params.append('activo', filters.activo);
+  if (filters.order) params.append('order', filters.order);
+  if (filters.precio_min !== undefined) params.append('precio_min', filters.precio_min);
+  if (filters.precio_max !== undefined) params.append('precio_max', filters.precio_max);
+  if (filters.stock_min !== undefined) params.append('stock_min', filters.stock_min);
+  if (filters.skip) params.append('skip', filters.skip);
+  if (filters.limit !== undefined) params.append('limit', filters.limit);
 
-    if (filters.categoria) params.append('categoria', filters.categoria);
-    if (filters.destacado !== undefined) params.append('destacado', filters.destacado);
-    if (filters.activo !== undefined) params.append('activo', filters.activo);
-    if (filters.skip) params.append('skip', filters.skip);
-    if (filters.limit) params.append('limit', filters.limit);
+  return params;
+}
 
+const productosAPI = {
+  async getAll(filters = {}) {
+    const params = construirParamsProductos(filters);
     const query = params.toString() ? `?${params.toString()}` : '';
     return await fetchAPI(`/productos${query}`);
   },
 
+  // Una página ordenada/filtrada en el servidor: { items, total, skip, limit }
+  async getPage(filters = {}) {
+    const params = construirParamsProductos(filters);
+    params.append('count', 'exact');
+    return await fetchAPI(`/productos?${params.toString()}`);
+  },
+
+  // Solo el total de productos que cumplen los filtros (limit=0, sin filas)
+  async count(filters = {}) {
+    const pagina = await this.getPage({ ...filters, skip: 0, limit: 0 });
+    return pagina.total;
+  },
+
   async getById(id) {
     return await fetchAPI(`/productos/${id}`);
   },
@@ -357,15 +403,108 @@ const productosAPI = {
   }
 };
 
+// ========== CATEGORÍAS ==========
+
+// Registro de categorías con conteos (/api/categorias): una sola petición por
+// página, compartida por todos los scripts; el navegador la revalida con ETag
+let categoriasPromesa = null;
+
+const categoriasAPI = {
+  // [{ slug, valor, nombre, orden, imagen, url, total }] ordenadas
+  async getAll() {
+    if (!categoriasPromesa) {
+      categoriasPromesa = fetchAPI('/categorias').catch(error => {
+        categoriasPromesa = null;
+        throw error;
+      });
+    }
+    return await categoriasPromesa;
+  },
+
+  // { valor: categoría } para traducir productos.categoria (vacío si falla)
+  async porValor() {
+    try {
+      const categorias = await this.getAll();
+      return Object.fromEntries(categorias.map(c => [c.valor, c]));
+    } catch (error) {
+      console.warn('⚠️ No se pudieron cargar las categorías:', error);
+      return {};
+    }
+  }
+};
+
+// ========== IMÁGENES RESPONSIVAS ==========
+
+// Ancho que ocupa la imagen de una tarjeta de producto (atributo sizes)
+const TAMANOS_TARJETA = '(max-width: 600px) 100vw, 350px';
+
+// Estructuras srcset ({src, webp, avif}) de las imágenes de un producto
+function variantesProducto(producto) {
+  if (!producto || !producto.imagenes_variantes) return [];
+  try {
+    const variantes = JSON.parse(producto.imagenes_variantes);
+    return Array.isArray(variantes) ? variantes : [];
+  } catch (e) {
+    return [];
+  }
+}
+
+// <source> AVIF/WebP para poner dentro de un <picture> antes del <img>
+function fuentesImagenHTML(variantes, sizes) {
+  if (!variantes) return '';
+  return ['avif', 'webp']
+    .filter(formato => variantes[formato])
+    .map(formato => `<source type="image/${formato}" srcset="${variantes[formato]}" sizes="${sizes}">`)
+    .join('');
+}
+
+// URL del candidato más pequeño de un srcset que cubra el ancho pedido
+function urlVariante(srcset, anchoMinimo) {
+  if (!srcset) return null;
+  const candidatos = srcset.split(',')
+    .map(c => c.trim().split(' '))
+    .map(([url, ancho]) => ({ url, ancho: parseInt(ancho, 10) || 0 }))
+    .sort((a, b) => a.ancho - b.ancho);
+  const elegido = candidatos.find(c => c.ancho >= anchoMinimo) || candidatos[candidatos.length - 1];
+  return elegido ? elegido.url : null;
+}
+
+// Miniatura WebP de la primera imagen (o la imagen original si no hay variantes)
+function miniaturaProducto(producto, ancho = 200) {
+  const [primera] = variantesProducto(producto);
+  return (primera && urlVariante(primera.webp, ancho)) || producto.imagen_url || '';
+}
+
+// ========== DATOS INICIALES (RENDERIZADO EN SERVIDOR) ==========
+
+// Primera página que el servidor ya pintó en la plantilla (null si no la hay)
+function leerDatosIniciales() {
+  const nodo = document.getElementById('datos-iniciales');
+  if (!nodo) return null;
+  try {
+    return JSON.parse(nodo.textContent);
+  } catch (e) {
+    console.warn('⚠️ Datos iniciales inválidos, se piden a la API:', e);
+    return null;
+  }
+}
+
 // ========== EXPORTAR PARA USO GLOBAL ==========
 if (typeof window !== 'undefined') {
   window.authAPI = authAPI;
   window.productosAPI = productosAPI;
+  window.categoriasAPI = categoriasAPI;
   window.getToken = getToken;
   window.getCurrentUser = getCurrentUser;
   window.isAdmin = isAdmin;
   window.logout = logout;
   window.saveAuthData = saveAuthData;
+  window.variantesProducto = variantesProducto;
+  window.fuentesImagenHTML = fuentesImagenHTML;
+  window.urlVariante = urlVariante;
+  window.miniaturaProducto = miniaturaProducto;
+  window.TAMANOS_TARJETA = TAMANOS_TARJETA;
+  window.leerDatosIniciales = leerDatosIniciales;
 
   window.API_LOADED = true;
   console.log('✅ API de Aurum Joyería cargada correctamente');
@@ -1,36 +1,56 @@
 // buscar.js - Funcionalidad de búsqueda de productos
+// La búsqueda se resuelve en el servidor (/api/productos/search): cada tecla
+// pide solo los pocos resultados que se muestran, no el catálogo completo.
 
-let productosData = [];
+const SEARCH_LIMIT = 8;
+const SEARCH_DEBOUNCE_MS = 150;
 
-// Cargar productos desde la API
-async function cargarProductos() {
-  try {
-    const response = await fetch('/api/productos');
-    productosData = await response.json();
-  } catch (error) {
-    console.error('Error al cargar productos:', error);
-  }
-}
+const resultadosCache = new Map(); // término normalizado -> resultados
+let busquedaEnCurso = null;        // AbortController de la petición activa
+let debounceTimer = null;
 
-// Función para buscar productos
-function buscarProductos(termino) {
+// Función para buscar productos en el servidor
+async function buscarProductos(termino) {
   if (!termino || termino.trim() === '') {
     return [];
   }
 
-  const terminoLower = termino.toLowerCase().trim();
-  
-  return productosData.filter(producto => {
-    const nombreMatch = producto.nombre.toLowerCase().includes(terminoLower);
-    const categoriaMatch = producto.categoria.toLowerCase().includes(terminoLower);
-    const descripcionMatch = producto.descripcion?.toLowerCase().includes(terminoLower);
-    
-    return nombreMatch || categoriaMatch || descripcionMatch;
+  const terminoNormalizado = termino.toLowerCase().trim();
+
+  if (resultadosCache.has(terminoNormalizado)) {
+    return resultadosCache.get(terminoNormalizado);
+  }
+
+  // Cancelar la búsqueda anterior si sigue en vuelo
+  if (busquedaEnCurso) {
+    busquedaEnCurso.abort();
+  }
+  busquedaEnCurso = new AbortController();
+
+  const params = new URLSearchParams({ q: terminoNormalizado, limit: SEARCH_LIMIT });
+  const response = await fetch(`/api/productos/search?${params.toString()}`, {
+    signal: busquedaEnCurso.signal
   });
+  const resultados = await response.json();
+
+  resultadosCache.set(terminoNormalizado, resultados);
+  return resultados;
+}
+
+// Ejecuta la búsqueda y muestra resultados (ignora búsquedas canceladas)
+async function ejecutarBusqueda(termino) {
+  try {
+    const resultados = await buscarProductos(termino);
+    await mostrarResultados(resultados);
+  } catch (error) {
+    if (error.name !== 'AbortError') {
+      console.error('Error al buscar productos:', error);
+    }
+  }
 }
 
 // Función para mostrar resultados
-function mostrarResultados(resultados) {
+async function mostrarResultados(resultados) {
   const searchResults = document.getElementById('searchResults');
   
   if (resultados.length === 0) {
@@ -39,21 +59,15 @@ function mostrarResultados(resultados) {
     return;
   }
 
-  // Mapeo de categorías a URLs (RUTAS CORREGIDAS - SIN /html/)
-  const categoriasUrls = {
-    'anillos': '/anillos',
-    'pulseras': '/pulseras',
-    'cadenas': '/cadenas',
-    'aretes': '/aretes',
-    'tobilleras': '/dijes',
-    'otros': '/combos',
-    'balineria': '/balineria'
-  };
+  // URL y nombre de cada categoría desde el registro (/api/categorias)
+  const categorias = await categoriasAPI.porValor();
 
   let html = '';
   resultados.forEach(producto => {
-    const urlCategoria = categoriasUrls[producto.categoria] || '/';
-    const imagenUrl = producto.imagen_url || '/static/img/placeholder.jpg';
+    const categoria = categorias[producto.categoria];
+    const urlCategoria = categoria ? categoria.url : '/';
+    // Miniatura WebP precalculada por el índice; si no hay, la imagen original
+    const imagenUrl = producto.imagen_miniatura || producto.imagen_url || '/static/img/placeholder.jpg';
     
     html += `
       <a href="${urlCategoria}" class="search-result-item" data-producto-id="${producto.id}">
@@ -63,7 +77,7 @@ function mostrarResultados(resultados) {
              onerror="this.src='/static/img/placeholder.jpg'">
         <div class="search-result-info">
           <p class="search-result-name">${producto.nombre}</p>
-          <p class="search-result-category">${producto.categoria}</p>
+          <p class="search-result-category">${categoria ? categoria.nombre : producto.categoria}</p>
         </div>
       </a>
     `;
@@ -80,40 +94,34 @@ function ocultarResultados() {
 }
 
 // Inicializar búsqueda
-document.addEventListener('DOMContentLoaded', async () => {
-  // Cargar productos al iniciar
-  await cargarProductos();
-
+document.addEventListener('DOMContentLoaded', () => {
   const searchInput = document.getElementById('searchInput');
   const searchBtn = document.getElementById('searchBtn');
   const searchResults = document.getElementById('searchResults');
 
-  // Búsqueda al escribir
+  // Búsqueda al escribir (con debounce)
   searchInput.addEventListener('input', (e) => {
     const termino = e.target.value;
+    clearTimeout(debounceTimer);
     
     if (termino.trim() === '') {
       ocultarResultados();
       return;
     }
 
-    const resultados = buscarProductos(termino);
-    mostrarResultados(resultados);
+    debounceTimer = setTimeout(() => ejecutarBusqueda(termino), SEARCH_DEBOUNCE_MS);
   });
 
   // Búsqueda al hacer clic en el botón
   searchBtn.addEventListener('click', () => {
-    const termino = searchInput.value;
-    const resultados = buscarProductos(termino);
-    mostrarResultados(resultados);
+    ejecutarBusqueda(searchInput.value);
   });
 
   // Búsqueda al presionar Enter
   searchInput.addEventListener('keypress', (e) => {
     if (e.key === 'Enter') {
-      const termino = searchInput.value;
-      const resultados = buscarProductos(termino);
-      mostrarResultados(resultados);
+      clearTimeout(debounceTimer);
+      ejecutarBusqueda(searchInput.value);
     }
   });
 
@@ -133,8 +141,7 @@ document.addEventListener('DOMContentLoaded', async () => {
   // Limpiar input cuando se ocultan los resultados
   searchInput.addEventListener('focus', () => {
     if (searchInput.value.trim() !== '') {
-      const resultados = buscarProductos(searchInput.value);
-      mostrarResultados(resultados);
+      ejecutarBusqueda(searchInput.value);
     }
   });
 });
\ No newline at end of file
@@ -1,6 +1,6 @@
 // ========================================
 // SISTEMA DE PRODUCTOS DESTACADOS CON PAGINACIÓN
-// Versión 2.0 - Para página de inicio
+// Versión 3.0 - Paginación en el servidor
 // ========================================
 
 document.addEventListener('DOMContentLoaded', async () => {
@@ -16,7 +16,11 @@ document.addEventListener('DOMContentLoaded', async () => {
   // ===== VARIABLES DE ESTADO =====
   let paginaActual = 1;
   let itemsPorPagina = 12;
-  let todosLosProductos = [];
+  let productosPagina = [];
+  let totalProductos = 0;
+
+  // Tope de limit en GET /productos (Query le=1000): "Todo" no puede pedir más
+  const MAX_POR_PAGINA = 1000;
   
   try {
     // ===== VERIFICAR API =====
@@ -26,17 +30,21 @@ document.addEventListener('DOMContentLoaded', async () => {
     
     console.log('✅ API disponible');
     
-    // ===== MOSTRAR LOADING =====
-    productosGrid.innerHTML = '<div class="loading">Cargando productos destacados...</div>';
-    
-    // ===== OBTENER PRODUCTOS DESDE API =====
-    console.log('📡 Solicitando productos destacados...');
-    todosLosProductos = await productosAPI.getAll({ destacado: true, activo: true });
+    // ===== PRIMERA PÁGINA: RENDERIZADA EN EL SERVIDOR O DESDE API =====
+    const datosIniciales = leerDatosIniciales();
+    if (datosIniciales) {
+      productosPagina = datosIniciales.pagina.items || [];
+      totalProductos = datosIniciales.pagina.total ?? productosPagina.length;
+    } else {
+      productosGrid.innerHTML = '<div class="loading">Cargando productos destacados...</div>';
+      console.log('📡 Solicitando productos destacados...');
+      await cargarPagina();
+    }
     
-    console.log(`✅ ${todosLosProductos.length} productos destacados recibidos`);
+    console.log(`✅ ${totalProductos} productos destacados en total`);
     
     // ===== VALIDAR PRODUCTOS =====
-    if (!todosLosProductos || todosLosProductos.length === 0) {
+    if (totalProductos === 0) {
       console.warn('⚠️ No hay productos destacados');
       productosGrid.innerHTML = `
         <div class="error">
@@ -46,15 +54,9 @@ document.addEventListener('DOMContentLoaded', async () => {
       return;
     }
     
-    // ===== ORDENAR POR DEFECTO (MÁS RECIENTES) =====
-    todosLosProductos.sort((a, b) => {
-      const dateA = new Date(a.created_at || 0);
-      const dateB = new Date(b.created_at || 0);
-      return dateB - dateA;
-    });
-    
     // ===== RENDERIZAR PRIMERA PÁGINA =====
-    renderizarProductosPaginados();
+    // Si el servidor ya pintó las tarjetas solo se añaden los controles
+    renderizarProductosPaginados(Boolean(datosIniciales));
     
     console.log('✅ Productos destacados cargados con paginación');
     
@@ -68,21 +70,38 @@ document.addEventListener('DOMContentLoaded', async () => {
     `;
   }
   
+  // ========================================
+  // FUNCIÓN: CARGAR PÁGINA (MÁS RECIENTES PRIMERO)
+  // ========================================
+  async function cargarPagina() {
+    const pagina = await productosAPI.getPage({
+      destacado: true,
+      activo: true,
+      order: 'default',
+      skip: (paginaActual - 1) * itemsPorPagina,
+      limit: itemsPorPagina
+    });
+    
+    productosPagina = pagina.items || [];
+    totalProductos = pagina.total ?? productosPagina.length;
+  }
+  
   // ========================================
   // FUNCIÓN: RENDERIZAR PRODUCTOS PAGINADOS
   // ========================================
-  function renderizarProductosPaginados() {
+  function renderizarProductosPaginados(hidratar = false) {
     console.log(`📄 Renderizando página ${paginaActual} de productos destacados`);
     
+    if (hidratar) {
+      agregarControlesPaginacion();
+      return;
+    }
+    
     // Limpiar grid
     productosGrid.innerHTML = '';
     
-    // Calcular índices
     const inicio = (paginaActual - 1) * itemsPorPagina;
-    const fin = inicio + itemsPorPagina;
-    const productosPagina = todosLosProductos.slice(inicio, fin);
-    
-    console.log(`   → Mostrando ${productosPagina.length} productos (${inicio + 1}-${Math.min(fin, todosLosProductos.length)})`);
+    console.log(`   → Mostrando ${productosPagina.length} productos (${inicio + 1}-${inicio + productosPagina.length})`);
     
     // Renderizar cada producto
     productosPagina.forEach((producto, index) => {
@@ -141,7 +160,11 @@ document.addEventListener('DOMContentLoaded', async () => {
       img.src = 'https://via.placeholder.com/250x250/1a1a1a/f9dc5e?text=Sin+Imagen';
     }
     
-    card.appendChild(img);
+    // <picture> con fuentes AVIF/WebP; el <img> queda como respaldo JPEG
+    const picture = document.createElement('picture');
+    picture.innerHTML = fuentesImagenHTML(variantesProducto(producto)[0], TAMANOS_TARJETA);
+    picture.appendChild(img);
+    card.appendChild(picture);
     
     // Título
     const titulo = document.createElement('h3');
@@ -177,7 +200,7 @@ document.addEventListener('DOMContentLoaded', async () => {
   // FUNCIÓN: AGREGAR CONTROLES
   // ========================================
   function agregarControlesPaginacion() {
-    const totalPaginas = Math.ceil(todosLosProductos.length / itemsPorPagina);
+    const totalPaginas = Math.ceil(totalProductos / itemsPorPagina);
     
     // Si solo hay 1 página, no mostrar controles
     if (totalPaginas <= 1) return;
@@ -186,11 +209,11 @@ document.addEventListener('DOMContentLoaded', async () => {
     paginacionContainer.className = 'paginacion-container';
     
     const inicio = (paginaActual - 1) * itemsPorPagina + 1;
-    const fin = Math.min(paginaActual * itemsPorPagina, todosLosProductos.length);
+    const fin = Math.min(paginaActual * itemsPorPagina, totalProductos);
     
     paginacionContainer.innerHTML = `
       <div class="paginacion-info">
-        Mostrando <strong>${inicio}-${fin}</strong> de <strong>${todosLosProductos.length}</strong> productos
+        Mostrando <strong>${inicio}-${fin}</strong> de <strong>${totalProductos}</strong> productos
       </div>
       
       <div class="paginacion-controles" id="paginacionControles"></div>
@@ -202,7 +225,7 @@ document.addEventListener('DOMContentLoaded', async () => {
           <option value="12" ${itemsPorPagina === 12 ? 'selected' : ''}>12</option>
           <option value="16" ${itemsPorPagina === 16 ? 'selected' : ''}>16</option>
           <option value="24" ${itemsPorPagina === 24 ? 'selected' : ''}>24</option>
-          <option value="${todosLosProductos.length}" ${itemsPorPagina === todosLosProductos.length ? 'selected' : ''}>Todo</option>
+          <option value="${Math.min(totalProductos, MAX_POR_PAGINA)}" ${itemsPorPagina === Math.min(totalProductos, MAX_POR_PAGINA) ? 'selected' : ''}>Todo</option>
         </select>
       </div>
     `;
@@ -213,9 +236,10 @@ document.addEventListener('DOMContentLoaded', async () => {
     generarBotonesPaginacion(totalPaginas);
     
     // Event listener
-    document.getElementById('itemsPerPage').addEventListener('change', (e) => {
+    document.getElementById('itemsPerPage').addEventListener('change', async (e) => {
       itemsPorPagina = parseInt(e.target.value);
       paginaActual = 1;
+      await cargarPagina();
       renderizarProductosPaginados();
     });
   }
@@ -322,12 +346,13 @@ document.addEventListener('DOMContentLoaded', async () => {
   // ========================================
   // FUNCIÓN: CAMBIAR PÁGINA
   // ========================================
-  function cambiarPagina(nuevaPagina) {
-    const totalPaginas = Math.ceil(todosLosProductos.length / itemsPorPagina);
+  async function cambiarPagina(nuevaPagina) {
+    const totalPaginas = Math.ceil(totalProductos / itemsPorPagina);
     
     if (nuevaPagina < 1 || nuevaPagina > totalPaginas) return;
     
     paginaActual = nuevaPagina;
+    await cargarPagina();
     renderizarProductosPaginados();
   }
 });
\ No newline at end of file
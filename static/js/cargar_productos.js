@@ -1,6 +1,6 @@
 // ========================================
 // SISTEMA DE PRODUCTOS CON PAGINACIÓN
-// Versión 2.0 - Con filtrado sincronizado
+// Versión 3.0 - Orden y paginación en el servidor
 // ========================================
 
 document.addEventListener("DOMContentLoaded", async () => {
@@ -10,17 +10,26 @@ document.addEventListener("DOMContentLoaded", async () => {
   // ===== VARIABLES DE ESTADO =====
   let paginaActual = 1;
   let itemsPorPagina = 12;
-  let todosLosProductos = []; // Array original completo (NUNCA modificar)
-  let productosFiltrados = []; // Array con filtro/orden aplicado
+  let ordenActual = 'default';
+  let productosPagina = []; // Solo los productos de la página actual
+  let totalProductos = 0;   // Total en la categoría (Content-Range del servidor)
+
+  // Tope de limit en GET /productos (Query le=1000): "Todo" no puede pedir más
+  const MAX_POR_PAGINA = 1000;
+  let estadisticas = { destacados: 0, conStock: 0 };
+  let categoriaActual = null;
+
+  // Primera página renderizada en el servidor (null → se pide a la API)
+  const datosIniciales = leerDatosIniciales();
 
   // Mostrar estado de carga inicial
-  if (contenedor) {
+  if (contenedor && !datosIniciales) {
     contenedor.innerHTML = '<div class="loading">Cargando productos...</div>';
   }
 
   try {
     // ===== OBTENER CATEGORÍA =====
-    const categoriaActual = document.body.dataset.categoria;
+    categoriaActual = document.body.dataset.categoria;
     
     if (!categoriaActual) {
       throw new Error("No se pudo determinar la categoría actual. Asegúrate de que el body tenga data-categoria.");
@@ -33,26 +42,30 @@ document.addEventListener("DOMContentLoaded", async () => {
       throw new Error('La API de productos no está disponible. Asegúrate de cargar api.js antes de este script.');
     }
 
-    // Mapeo de categorías
-    const nombreCategoria = {
-      'tobilleras': 'Dijes y Herrajes',
-      'otros': 'Combos',
-      'anillos': 'Anillos',
-      'pulseras': 'Pulseras',
-      'cadenas': 'Cadenas',
-      'aretes': 'Aretes'
-    };
-
-    // ===== CARGAR PRODUCTOS DESDE API =====
-    todosLosProductos = await productosAPI.getByCategoria(categoriaActual);
-    productosFiltrados = [...todosLosProductos]; // Copia inicial
+    // Nombre visible de la categoría (lo pone el servidor desde el registro)
+    const nombreCategoria = document.body.dataset.categoriaNombre || categoriaActual;
+
+    // ===== PRIMERA PÁGINA Y CONTADORES (SERVIDOR O API) =====
+    if (datosIniciales) {
+      productosPagina = datosIniciales.pagina.items || [];
+      totalProductos = datosIniciales.pagina.total ?? productosPagina.length;
+      estadisticas = datosIniciales.estadisticas;
+    } else {
+      const filtrosBase = { categoria: categoriaActual, activo: true };
+      const [, destacados, conStock] = await Promise.all([
+        cargarPagina(),
+        productosAPI.count({ ...filtrosBase, destacado: true }),
+        productosAPI.count({ ...filtrosBase, stock_min: 1 })
+      ]);
+      estadisticas = { destacados: destacados || 0, conStock: conStock || 0 };
+    }
     
-    console.log(`✅ ${todosLosProductos.length} productos encontrados en '${categoriaActual}'`);
+    console.log(`✅ ${totalProductos} productos encontrados en '${categoriaActual}'`);
 
-    if (todosLosProductos.length === 0) {
+    if (totalProductos === 0) {
       contenedor.innerHTML = `
         <div class="error">
-          <p>No se encontraron productos en la categoría "${nombreCategoria[categoriaActual] || categoriaActual}".</p>
+          <p>No se encontraron productos en la categoría "${nombreCategoria}".</p>
           <p>Intenta navegar a otra categoría o contacta al administrador.</p>
         </div>
       `;
@@ -60,26 +73,26 @@ document.addEventListener("DOMContentLoaded", async () => {
     }
 
     // ===== MOSTRAR PRODUCTOS INICIALES =====
-    mostrarProductosPaginados();
+    // Si el servidor ya pintó las tarjetas solo se añaden los controles
+    mostrarProductosPaginados(Boolean(datosIniciales));
     actualizarEstadisticasFiltro();
 
     // ===== EVENT LISTENER DEL FILTRO =====
     if (filtro) {
-      filtro.addEventListener("change", () => {
+      filtro.addEventListener("change", async () => {
         const valorFiltro = filtro.value;
         console.log(`🔄 Aplicando filtro: ${valorFiltro}`);
         
-        // Aplicar ordenamiento
-        aplicarOrdenamiento(valorFiltro);
-        
-        // IMPORTANTE: Resetear a página 1
+        // El servidor ordena; solo pedimos la página 1 con el nuevo orden
+        ordenActual = valorFiltro;
         paginaActual = 1;
+        await cargarPagina();
         
         // Actualizar vista
         actualizarEstadisticasFiltro();
         mostrarProductosPaginados();
         
-        console.log(`✅ Mostrando ${productosFiltrados.length} productos filtrados`);
+        console.log(`✅ Mostrando página 1 de ${totalProductos} productos`);
       });
     }
 
@@ -105,82 +118,45 @@ document.addEventListener("DOMContentLoaded", async () => {
   }
 
   // ========================================
-  // FUNCIÓN: APLICAR ORDENAMIENTO
+  // FUNCIÓN: CARGAR PÁGINA DESDE EL SERVIDOR
   // ========================================
-  function aplicarOrdenamiento(tipoOrden) {
-    // Siempre partir del array original
-    productosFiltrados = [...todosLosProductos];
+  async function cargarPagina() {
+    // Los valores de #filtro coinciden con los órdenes de /api/productos
+    const pagina = await productosAPI.getPage({
+      categoria: categoriaActual,
+      activo: true,
+      order: ordenActual,
+      skip: (paginaActual - 1) * itemsPorPagina,
+      limit: itemsPorPagina
+    });
     
-    console.log(`📊 Ordenando ${productosFiltrados.length} productos por: ${tipoOrden}`);
+    productosPagina = pagina.items || [];
+    totalProductos = pagina.total ?? productosPagina.length;
     
-    switch (tipoOrden) {
-      case "nombre-asc":
-        productosFiltrados.sort((a, b) => a.nombre.localeCompare(b.nombre));
-        break;
-        
-      case "nombre-desc":
-        productosFiltrados.sort((a, b) => b.nombre.localeCompare(a.nombre));
-        break;
-        
-      case "precio-asc":
-        productosFiltrados.sort((a, b) => {
-          const precioA = a.precio || 0;
-          const precioB = b.precio || 0;
-          return precioA - precioB;
-        });
-        break;
-        
-      case "precio-desc":
-        productosFiltrados.sort((a, b) => {
-          const precioA = a.precio || 0;
-          const precioB = b.precio || 0;
-          return precioB - precioA;
-        });
-        break;
-        
-      case "destacados":
-        productosFiltrados.sort((a, b) => {
-          // Primero destacados
-          if (a.destacado && !b.destacado) return -1;
-          if (!a.destacado && b.destacado) return 1;
-          // Luego por nombre
-          return a.nombre.localeCompare(b.nombre);
-        });
-        break;
-        
-      case "stock-desc":
-        productosFiltrados.sort((a, b) => b.stock - a.stock);
-        break;
-        
-      default:
-        // Orden por defecto: más recientes primero
-        productosFiltrados.sort((a, b) => {
-          const dateA = new Date(a.created_at || 0);
-          const dateB = new Date(b.created_at || 0);
-          return dateB - dateA;
-        });
-    }
+    console.log(`📊 Página ${paginaActual} (${ordenActual}): ${productosPagina.length} de ${totalProductos} productos`);
   }
 
   // ========================================
   // FUNCIÓN: MOSTRAR PRODUCTOS PAGINADOS
   // ========================================
-  function mostrarProductosPaginados() {
+  function mostrarProductosPaginados(hidratar = false) {
     if (!contenedor) return;
 
-    console.log(`📄 Renderizando página ${paginaActual} (${productosFiltrados.length} productos totales)`);
+    console.log(`📄 Renderizando página ${paginaActual} (${totalProductos} productos totales)`);
 
-    if (productosFiltrados.length === 0) {
+    if (productosPagina.length === 0) {
       contenedor.innerHTML = '<div class="error">No se encontraron productos.</div>';
       return;
     }
 
-    // Calcular productos de esta página
     const inicio = (paginaActual - 1) * itemsPorPagina;
-    const fin = inicio + itemsPorPagina;
-    const productosPagina = productosFiltrados.slice(inicio, fin);
-    
-    console.log(`   → Mostrando ${productosPagina.length} productos (${inicio + 1}-${Math.min(fin, productosFiltrados.length)})`);
+    console.log(`   → Mostrando ${productosPagina.length} productos (${inicio + 1}-${inicio + productosPagina.length})`);
+
+    // Agregar controles de paginación (las tarjetas ya están si se hidrata)
+    if (hidratar) {
+      agregarControlesPaginacion();
+      return;
+    }
 
     // Renderizar productos
     contenedor.innerHTML = productosPagina.map(producto => {
@@ -204,10 +180,13 @@ document.addEventListener("DOMContentLoaded", async () => {
       return `
         <div class="producto-card" data-stock="${stockClass}">
           ${destacadoBadge}
-          <img src="${imagenUrl}" 
-                alt="${producto.nombre}" 
-                loading="lazy"
-                onerror="this.src='https://via.placeholder.com/300x300/1a1a1a/f9dc5e?text=Sin+Imagen'; this.onerror=null;" />
+          <picture>
+            ${fuentesImagenHTML(variantesProducto(producto)[0], TAMANOS_TARJETA)}
+            <img src="${imagenUrl}" 
+                  alt="${producto.nombre}" 
+                  loading="lazy"
+                  onerror="this.src='https://via.placeholder.com/300x300/1a1a1a/f9dc5e?text=Sin+Imagen'; this.onerror=null;" />
+          </picture>
           <h3>${producto.nombre}</h3>
           <p class="descripcion">${producto.descripcion || 'Sin descripción'}</p>
           ${precioHTML}
@@ -245,7 +224,7 @@ document.addEventListener("DOMContentLoaded", async () => {
   // FUNCIÓN: AGREGAR CONTROLES DE PAGINACIÓN
   // ========================================
   function agregarControlesPaginacion() {
-    const totalPaginas = Math.ceil(productosFiltrados.length / itemsPorPagina);
+    const totalPaginas = Math.ceil(totalProductos / itemsPorPagina);
     
     // Si solo hay 1 página, no mostrar controles
     if (totalPaginas <= 1) return;
@@ -254,11 +233,11 @@ document.addEventListener("DOMContentLoaded", async () => {
     paginacionContainer.className = 'paginacion-container';
     
     const inicio = (paginaActual - 1) * itemsPorPagina + 1;
-    const fin = Math.min(paginaActual * itemsPorPagina, productosFiltrados.length);
+    const fin = Math.min(paginaActual * itemsPorPagina, totalProductos);
     
     paginacionContainer.innerHTML = `
       <div class="paginacion-info">
-        Mostrando <strong>${inicio}-${fin}</strong> de <strong>${productosFiltrados.length}</strong> productos
+        Mostrando <strong>${inicio}-${fin}</strong> de <strong>${totalProductos}</strong> productos
       </div>
       
       <div class="paginacion-controles" id="paginacionControles"></div>
@@ -270,7 +249,7 @@ document.addEventListener("DOMContentLoaded", async () => {
           <option value="12" ${itemsPorPagina === 12 ? 'selected' : ''}>12</option>
           <option value="16" ${itemsPorPagina === 16 ? 'selected' : ''}>16</option>
           <option value="24" ${itemsPorPagina === 24 ? 'selected' : ''}>24</option>
-          <option value="${productosFiltrados.length}" ${itemsPorPagina === productosFiltrados.length ? 'selected' : ''}>Todo</option>
+          <option value="${Math.min(totalProductos, MAX_POR_PAGINA)}" ${itemsPorPagina === Math.min(totalProductos, MAX_POR_PAGINA) ? 'selected' : ''}>Todo</option>
         </select>
       </div>
     `;
@@ -281,9 +260,11 @@ document.addEventListener("DOMContentLoaded", async () => {
     generarBotonesPaginacion(totalPaginas);
     
     // Event listener para cambiar items/página
-    document.getElementById('itemsPerPage').addEventListener('change', (e) => {
+    document.getElementById('itemsPerPage').addEventListener('change', async (e) => {
       itemsPorPagina = parseInt(e.target.value);
       paginaActual = 1;
+      await cargarPagina();
+      actualizarEstadisticasFiltro();
       mostrarProductosPaginados();
     });
   }
@@ -390,12 +371,13 @@ document.addEventListener("DOMContentLoaded", async () => {
   // ========================================
   // FUNCIÓN: CAMBIAR DE PÁGINA
   // ========================================
-  function cambiarPagina(nuevaPagina) {
-    const totalPaginas = Math.ceil(productosFiltrados.length / itemsPorPagina);
+  async function cambiarPagina(nuevaPagina) {
+    const totalPaginas = Math.ceil(totalProductos / itemsPorPagina);
     
     if (nuevaPagina < 1 || nuevaPagina > totalPaginas) return;
     
     paginaActual = nuevaPagina;
+    await cargarPagina();
     mostrarProductosPaginados();
   }
 
@@ -406,10 +388,9 @@ document.addEventListener("DOMContentLoaded", async () => {
     const statsContainer = document.getElementById('filtroStats');
     if (!statsContainer) return;
     
-    const totalProductos = todosLosProductos.length;
-    const productosDestacados = todosLosProductos.filter(p => p.destacado).length;
-    const productosConStock = todosLosProductos.filter(p => p.stock > 0).length;
-    const totalPaginas = Math.ceil(productosFiltrados.length / itemsPorPagina);
+    const productosDestacados = estadisticas.destacados;
+    const productosConStock = estadisticas.conStock;
+    const totalPaginas = Math.ceil(totalProductos / itemsPorPagina);
     
     const filtroSelect = document.getElementById('filtro');
     const filtroActual = filtroSelect ? filtroSelect.options[filtroSelect.selectedIndex].text : 'Más recientes';
@@ -425,7 +406,7 @@ document.addEventListener("DOMContentLoaded", async () => {
       </p>
       <p>
         <span class="stat-label">Mostrando:</span>
-        <strong>${productosFiltrados.length}</strong>
+        <strong>${productosPagina.length}</strong>
       </p>
       <hr>
       <p>
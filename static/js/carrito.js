@@ -65,7 +65,7 @@ class CarritoCompras {
         id: producto.id,
         nombre: producto.nombre,
         descripcion: producto.descripcion || '',
-        imagen_url: producto.imagen_url || '',
+        imagen_url: miniaturaProducto(producto),
         precio: producto.precio || 0,
         stock: producto.stock || 0,
         categoria: producto.categoria || '',
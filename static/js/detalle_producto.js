@@ -47,12 +47,15 @@ document.addEventListener('DOMContentLoaded', async () => {
   try {
     // Cargar producto desde la API
     console.log('📡 Obteniendo producto de la API...');
-    const producto = await productosAPI.getById(productoId);
+    const [producto, categorias] = await Promise.all([
+      productosAPI.getById(productoId),
+      categoriasAPI.porValor()
+    ]);
     
     console.log('✅ Producto cargado:', producto);
     
     // Renderizar el producto
-    renderizarProducto(producto);
+    renderizarProducto(producto, infoCategoria(producto, categorias));
     
     // Scroll suave al inicio
     window.scrollTo({ top: 0, behavior: 'smooth' });
@@ -83,11 +86,11 @@ function mostrarCargando() {
 // RENDERIZAR PRODUCTO
 // ========================================
 
-function renderizarProducto(producto) {
+function renderizarProducto(producto, categoria) {
   console.log('🎨 Renderizando producto:', producto.nombre);
   
   // BREADCRUMB
-  actualizarBreadcrumb(producto);
+  actualizarBreadcrumb(producto, categoria);
   
   // TÍTULO
   const nombreProducto = document.getElementById('nombreProducto');
@@ -98,16 +101,7 @@ function renderizarProducto(producto) {
   // CATEGORÍA
   const categoriaProducto = document.getElementById('categoriaProducto');
   if (categoriaProducto) {
-    // Mapeo de categorías DB a nombre visible
-    const categoriasNombres = {
-      'tobilleras': 'Dijes y Herrajes',
-      'otros': 'Combos',
-      'anillos': 'Anillos',
-      'pulseras': 'Pulseras',
-      'cadenas': 'Cadenas',
-      'aretes': 'Aretes'
-    };
-    categoriaProducto.textContent = categoriasNombres[producto.categoria] || capitalizar(producto.categoria);
+    categoriaProducto.textContent = categoria.nombre;
   }
   
   // DESCRIPCIÓN
@@ -132,7 +126,7 @@ function renderizarProducto(producto) {
   configurarBotonCarrito(producto);
   
   // WHATSAPP
-  configurarWhatsApp(producto);
+  configurarWhatsApp(producto, categoria);
   
   console.log('✅ Producto renderizado completamente');
 }
@@ -141,28 +135,13 @@ function renderizarProducto(producto) {
 // BREADCRUMB
 // ========================================
 
-function actualizarBreadcrumb(producto) {
+function actualizarBreadcrumb(producto, categoria) {
   const categoriaBreadcrumb = document.getElementById('categoriaBreadcrumb');
   const nombreBreadcrumb = document.getElementById('nombreBreadcrumb');
   
-  // Mapeo de categorías DB a nombre visible y URL
-  const categoriasMap = {
-    'tobilleras': { nombre: 'Dijes y Herrajes', url: '/dijes' },
-    'otros': { nombre: 'Combos', url: '/combos' },
-    'anillos': { nombre: 'Anillos', url: '/anillos' },
-    'pulseras': { nombre: 'Pulseras', url: '/pulseras' },
-    'cadenas': { nombre: 'Cadenas', url: '/cadenas' },
-    'aretes': { nombre: 'Aretes', url: '/aretes' }
-  };
-  
-  const categoriaInfo = categoriasMap[producto.categoria] || { 
-    nombre: capitalizar(producto.categoria), 
-    url: `/${producto.categoria}` 
-  };
-  
   if (categoriaBreadcrumb) {
-    categoriaBreadcrumb.textContent = categoriaInfo.nombre;
-    categoriaBreadcrumb.href = categoriaInfo.url;
+    categoriaBreadcrumb.textContent = categoria.nombre;
+    categoriaBreadcrumb.href = categoria.url;
   }
   
   if (nombreBreadcrumb) {
@@ -180,7 +159,9 @@ function cargarImagenPrincipal(producto) {
   if (!imagenPrincipal) return;
   
   if (producto.imagen_url && producto.imagen_url.trim() !== '') {
-    imagenPrincipal.src = producto.imagen_url;
+    // Variante de detalle (800px) si existe; el JPEG original si no
+    const [variantes] = variantesProducto(producto);
+    imagenPrincipal.src = (variantes && urlVariante(variantes.webp, 800)) || producto.imagen_url;
     imagenPrincipal.alt = producto.nombre;
     
     imagenPrincipal.onerror = function() {
@@ -208,12 +189,14 @@ function cargarMiniaturas(producto) {
   
   // Por ahora solo mostramos la imagen principal como miniatura
   if (producto.imagen_url && producto.imagen_url.trim() !== '') {
+    const [variantes] = variantesProducto(producto);
+    const imagenDetalle = (variantes && urlVariante(variantes.webp, 800)) || producto.imagen_url;
     miniaturasContainer.innerHTML = `
       <img 
-        src="${producto.imagen_url}" 
+        src="${miniaturaProducto(producto, 100)}" 
         alt="${producto.nombre}" 
         class="active"
-        onclick="cambiarImagenPrincipal('${producto.imagen_url}')"
+        onclick="cambiarImagenPrincipal('${imagenDetalle}')"
         onerror="this.src='https://via.placeholder.com/100x100/1a1a1a/f9dc5e?text=Sin+Imagen'"
       >
     `;
@@ -379,7 +362,7 @@ function agregarAlCarrito(producto) {
       id: producto.id,
       nombre: producto.nombre,
       precio: producto.precio,
-      imagen_url: producto.imagen_url,
+      imagen_url: miniaturaProducto(producto),
       cantidad: cantidad,
       stock: producto.stock
     });
@@ -406,22 +389,12 @@ function agregarAlCarrito(producto) {
 // CONFIGURAR WHATSAPP
 // ========================================
 
-function configurarWhatsApp(producto) {
+function configurarWhatsApp(producto, categoria) {
   const btnWhatsApp = document.getElementById('comprarWhatsApp');
   
   if (!btnWhatsApp) return;
   
-  // Mapeo de categorías para mensaje
-  const categoriasNombres = {
-    'tobilleras': 'Dijes y Herrajes',
-    'otros': 'Combos',
-    'anillos': 'Anillos',
-    'pulseras': 'Pulseras',
-    'cadenas': 'Cadenas',
-    'aretes': 'Aretes'
-  };
-  
-  const nombreCategoria = categoriasNombres[producto.categoria] || capitalizar(producto.categoria);
+  const nombreCategoria = categoria.nombre;
   
   const telefono = '573217798612'; // Número de WhatsApp
   const mensaje = `¡Hola! Estoy interesado en el producto: *${producto.nombre}*\n\n` +
@@ -509,6 +482,14 @@ function capitalizar(texto) {
   return texto.charAt(0).toUpperCase() + texto.slice(1).toLowerCase();
 }
 
+// Nombre y URL de la categoría del producto (registro de /api/categorias)
+function infoCategoria(producto, categorias) {
+  return categorias[producto.categoria] || {
+    nombre: capitalizar(producto.categoria),
+    url: `/${producto.categoria}`
+  };
+}
+
 // ========================================
 // EXPORTAR FUNCIONES GLOBALES
 // ========================================
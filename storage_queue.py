@@ -0,0 +1,353 @@
+# storage_queue.py - Borrado diferido y por lotes de objetos del Storage de Supabase
+
+import asyncio
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from imagenes import cargar_variantes, urls_de_srcset
+
+load_dotenv()
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+BUCKET_PRODUCTOS = "productos-images"
+BUCKET_CARRUSEL = "carrusel-images"
+
+# storage.remove acepta una lista: se envían hasta N nombres por petición
+STORAGE_DELETE_BATCH = int(os.getenv("STORAGE_DELETE_BATCH", "100"))
+
+# Reintentos por flush (con backoff exponencial) y máximo de flushes por objeto
+STORAGE_DELETE_RETRIES = int(os.getenv("STORAGE_DELETE_RETRIES", "3"))
+STORAGE_DELETE_MAX_ATTEMPTS = int(os.getenv("STORAGE_DELETE_MAX_ATTEMPTS", "6"))
+STORAGE_DELETE_BACKOFF = float(os.getenv("STORAGE_DELETE_BACKOFF", "0.5"))  # segundos
+
+# Un objeto que se acaba de subir o reutilizar no se borra durante este tiempo
+# (cubre la ventana entre la subida y el guardado de la fila que lo referencia)
+STORAGE_DELETE_PROTECT = float(os.getenv("STORAGE_DELETE_PROTECT", "300"))  # segundos
+
+# Barrido de huérfanos: cada cuánto en servidores de larga duración (0 = sin
+# bucle; en Vercel lo dispara el cron de vercel.json) y antigüedad mínima de
+# un objeto para considerarlo huérfano (no borrar subidas en curso)
+STORAGE_SWEEP_INTERVAL = float(os.getenv("STORAGE_SWEEP_INTERVAL", "0"))  # segundos
+STORAGE_SWEEP_GRACE = float(os.getenv("STORAGE_SWEEP_GRACE", "3600"))  # segundos
+
+def _storage():
+    """Cliente de Storage compartido (se crea en el primer uso)"""
+    from supabase_client import get_storage_client
+    return get_storage_client()
+
+
+def nombre_objeto(url: str) -> str:
+    """Nombre del objeto en el bucket a partir de su URL pública"""
+    return url.split("?")[0].split("/")[-1]
+
+
+def base_objeto(nombre: str) -> str:
+    """Nombre sin extensión ni ancho: la imagen y todas sus variantes comparten base"""
+    return re.sub(r"_\d+$", "", nombre_objeto(nombre).split(".")[0])
+
+
+# Nombres de la lista que alguna fila todavía referencia
+VerificarEnUso = Callable[[List[str]], Awaitable[Set[str]]]
+
+
+class StorageDeletionQueue:
+    """
+    Cola de borrados pendientes agrupados por bucket
+
+    Los endpoints encolan y responden; ``flush`` (en una BackgroundTask,
+    tras enviar la respuesta, solo del bucket afectado; en el barrido y al
+    apagar, de todos) borra en lotes de STORAGE_DELETE_BATCH con una sola
+    llamada a ``storage.remove``. Un lote que falla se
+    reintenta con backoff; lo que sigue fallando queda en cola para el
+    siguiente flush hasta STORAGE_DELETE_MAX_ATTEMPTS (después lo recoge
+    el barrido de huérfanos).
+
+    Antes de borrar se vuelve a comprobar que ninguna fila use el objeto
+    (``verificar_con``) y se saltan los objetos protegidos por una subida
+    reciente (``proteger``): comprobar y borrar no es atómico, pero una
+    subida protegida nunca coincide con el borrado de su lote.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, int]] = {}  # bucket -> {nombre: intentos}
+        self._protegidos: Dict[str, Dict[str, float]] = {}  # bucket -> {base: hasta}
+        self._verificadores: Dict[str, VerificarEnUso] = {}
+        self._lock = asyncio.Lock()
+        self._lock_borrado = asyncio.Lock()  # un lote en storage.remove / una protección
+        self.enqueued = 0
+        self.deleted = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.still_referenced = 0
+        self.protected = 0
+
+    def verificar_con(self, bucket: str, verificar: VerificarEnUso):
+        """Registra cómo saber, al vaciar la cola, qué objetos del bucket siguen en uso"""
+        self._verificadores[bucket] = verificar
+
+    async def proteger(self, bucket: str, nombres: Iterable[str]):
+        """
+        Evita el borrado de objetos que se van a subir o reutilizar
+
+        Espera a que termine el lote que se esté borrando: desde que
+        vuelve, ni la cola ni un flush en curso tocan esos objetos (ni sus
+        variantes) durante STORAGE_DELETE_PROTECT segundos.
+        """
+        hasta = time.monotonic() + STORAGE_DELETE_PROTECT
+        async with self._lock_borrado:
+            protegidos = self._protegidos.setdefault(bucket, {})
+            for nombre in nombres:
+                if nombre:
+                    protegidos[base_objeto(nombre)] = hasta
+
+    def _protegido(self, bucket: str, nombre: str, ahora: float) -> bool:
+        return self._protegidos.get(bucket, {}).get(base_objeto(nombre), 0) > ahora
+
+    def _limpiar_protegidos(self, ahora: float):
+        for bucket, protegidos in list(self._protegidos.items()):
+            for base in [b for b, hasta in protegidos.items() if hasta <= ahora]:
+                del protegidos[base]
+            if not protegidos:
+                del self._protegidos[bucket]
+
+    def enqueue(self, bucket: str, urls: Iterable[str]):
+        """Agrega objetos (por URL o nombre) a la cola del bucket"""
+        pendientes = self._pending.setdefault(bucket, {})
+        for url in urls:
+            if not url:
+                continue
+            nombre = nombre_objeto(url)
+            if nombre not in pendientes:
+                pendientes[nombre] = 0
+                self.enqueued += 1
+        if not pendientes:
+            del self._pending[bucket]
+
+    def pending(self) -> int:
+        """Objetos en cola"""
+        return sum(len(nombres) for nombres in self._pending.values())
+
+    async def _remove(self, bucket: str, nombres: List[str]):
+        await asyncio.to_thread(_storage().storage.from_(bucket).remove, nombres)
+
+    async def _retenidos(self, bucket: str, pendientes: Dict[str, int]) -> Set[str]:
+        """
+        Comprueba las referencias justo antes de borrar
+
+        Lo que alguna fila volvió a usar desde que se encoló sale de la
+        cola. Si la comprobación falla, nada del bucket se borra en este
+        flush (se devuelven todos los nombres para dejarlos en cola).
+        """
+        verificar = self._verificadores.get(bucket)
+        if verificar is None or not pendientes:
+            return set()
+        try:
+            en_uso = await verificar(list(pendientes))
+        except Exception as e:
+            print(f"⚠️ Error comprobando referencias de {bucket}: {e}")
+            return set(pendientes)
+        for nombre in en_uso:
+            if pendientes.pop(nombre, None) is not None:
+                self.still_referenced += 1
+        return set()
+
+    async def flush(self, bucket: Optional[str] = None) -> int:
+        """
+        Borra lo pendiente que ninguna fila usa, por lotes y con reintentos
+
+        Args:
+            bucket: Solo ese bucket (None = todos)
+
+        Returns:
+            Objetos borrados en esta llamada
+        """
+        borrados = 0
+        async with self._lock:
+            for intento in range(STORAGE_DELETE_RETRIES):
+                if intento:
+                    await asyncio.sleep(STORAGE_DELETE_BACKOFF * 2 ** (intento - 1))
+
+                # Solo se reintenta si falló algún lote (no por lo retenido o protegido)
+                fallo = False
+                for nombre_bucket, pendientes in list(self._pending.items()):
+                    if bucket is not None and nombre_bucket != bucket:
+                        continue
+                    retenidos = await self._retenidos(nombre_bucket, pendientes)
+                    nombres = [nombre for nombre in pendientes if nombre not in retenidos]
+                    for inicio in range(0, len(nombres), STORAGE_DELETE_BATCH):
+                        async with self._lock_borrado:
+                            # Lo protegido por una subida (aun después de la comprobación) se queda en cola
+                            ahora = time.monotonic()
+                            candidatos = nombres[inicio:inicio + STORAGE_DELETE_BATCH]
+                            lote = [nombre for nombre in candidatos if not self._protegido(nombre_bucket, nombre, ahora)]
+                            self.protected += len(candidatos) - len(lote)
+                            if not lote:
+                                continue
+                            try:
+                                await self._remove(nombre_bucket, lote)
+                            except Exception as e:
+                                print(f"⚠️ Error borrando {len(lote)} objetos de {nombre_bucket}: {e}")
+                                self.failed_batches += 1
+                                fallo = True
+                                continue
+                        for nombre in lote:
+                            pendientes.pop(nombre, None)
+                        borrados += len(lote)
+                    if not pendientes:
+                        del self._pending[nombre_bucket]
+                if not fallo:
+                    break
+
+            self._count_attempts(bucket)
+            self._limpiar_protegidos(time.monotonic())
+
+        self.deleted += borrados
+        if borrados:
+            print(f"🗑️ Storage: {borrados} objetos borrados")
+        return borrados
+
+    def _count_attempts(self, solo_bucket: Optional[str] = None):
+        """Suma un intento a lo que quedó en cola y descarta lo que agotó sus intentos"""
+        for bucket, pendientes in list(self._pending.items()):
+            if solo_bucket is not None and bucket != solo_bucket:
+                continue
+            for nombre in list(pendientes):
+                pendientes[nombre] += 1
+                if pendientes[nombre] >= STORAGE_DELETE_MAX_ATTEMPTS:
+                    print(f"⚠️ Se descarta el borrado de {bucket}/{nombre} tras {pendientes[nombre]} intentos")
+                    del pendientes[nombre]
+                    self.dropped += 1
+            if not pendientes:
+                del self._pending[bucket]
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la cola"""
+        return {
+            "pending": self.pending(),
+            "enqueued": self.enqueued,
+            "deleted": self.deleted,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+            "still_referenced": self.still_referenced,
+            "protected": self.protected,
+        }
+
+
+# Instancia global
+deletion_queue = StorageDeletionQueue()
+
+
+# ========================================
+# BARRIDO DE HUÉRFANOS
+# ========================================
+
+def _nombres_fila(fila: Dict[str, Any], columna_variantes: str) -> Set[str]:
+    """Nombres de objeto que referencia una fila de productos o carrusel"""
+    urls = [fila.get("imagen_url")]
+    variantes = cargar_variantes(fila.get(columna_variantes))
+    if isinstance(variantes, dict):
+        variantes = [variantes]
+    for imagen in variantes or []:
+        if isinstance(imagen, dict):
+            urls.extend(urls_de_srcset(imagen))
+    urls.extend(cargar_variantes(fila.get("imagenes_urls")) or [])
+    return {nombre_objeto(url) for url in urls if isinstance(url, str) and url}
+
+
+async def _listar_bucket(bucket: str) -> List[Dict[str, Any]]:
+    """Todos los objetos de la raíz del bucket (paginado)"""
+    objetos, offset, limite = [], 0, 1000
+    while True:
+        pagina = await asyncio.to_thread(
+            _storage().storage.from_(bucket).list, "", {"limit": limite, "offset": offset}
+        )
+        objetos.extend(pagina)
+        if len(pagina) < limite:
+            return objetos
+        offset += limite
+
+
+async def _referencias() -> Dict[str, Set[str]]:
+    """Nombres de objeto referenciados por la base de datos, por bucket"""
+    from repositories import carousel, products
+
+    productos: Set[str] = set()
+    skip, limite = 0, 1000
+    while True:
+        filas = await products.list_images(skip, limite)
+        for fila in filas:
+            productos |= _nombres_fila(fila, "imagenes_variantes")
+        if len(filas) < limite:
+            break
+        skip += limite
+
+    carrusel: Set[str] = set()
+    for fila in await carousel.list():
+        carrusel |= _nombres_fila(fila, "imagen_variantes")
+
+    return {BUCKET_PRODUCTOS: productos, BUCKET_CARRUSEL: carrusel}
+
+
+def _es_reciente(objeto: Dict[str, Any], limite: datetime) -> bool:
+    creado = objeto.get("created_at") or objeto.get("updated_at")
+    if not creado:
+        return True
+    try:
+        return datetime.fromisoformat(creado.replace("Z", "+00:00")) > limite
+    except ValueError:
+        return True
+
+
+async def sweep_orphans(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Encola (y borra) los objetos de los buckets que ninguna fila referencia
+
+    Solo considera objetos más antiguos que STORAGE_SWEEP_GRACE, para no
+    tocar imágenes recién subidas cuyo producto aún no se ha guardado.
+
+    Args:
+        dry_run: Solo informa, no borra
+
+    Returns:
+        {bucket: {"objetos", "huerfanos", ...}, "borrados"}
+    """
+    referencias = await _referencias()
+    limite = datetime.now(timezone.utc) - timedelta(seconds=STORAGE_SWEEP_GRACE)
+
+    resumen: Dict[str, Any] = {}
+    for bucket, referenciados in referencias.items():
+        objetos = await _listar_bucket(bucket)
+        huerfanos = [
+            objeto["name"] for objeto in objetos
+            if objeto.get("id")  # las "carpetas" no tienen id
+            and objeto["name"] not in referenciados
+            and not _es_reciente(objeto, limite)
+        ]
+        resumen[bucket] = {"objetos": len(objetos), "huerfanos": len(huerfanos)}
+        if dry_run:
+            resumen[bucket]["muestra"] = huerfanos[:20]
+        else:
+            deletion_queue.enqueue(bucket, huerfanos)
+
+    resumen["borrados"] = 0 if dry_run else await deletion_queue.flush()
+    return resumen
+
+
+async def sweep_loop(interval: Optional[float] = None):
+    """Barrido periódico (tarea de fondo para servidores de larga duración)"""
+    interval = interval or STORAGE_SWEEP_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            resumen = await sweep_orphans()
+            print(f"🧹 Barrido de huérfanos: {resumen}")
+        except Exception as e:
+            print(f"⚠️ Error en barrido de huérfanos: {e}")
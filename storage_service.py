@@ -0,0 +1,310 @@
+# storage_service.py - Servicio único de imágenes en Supabase Storage: procesado, subida por lotes y borrado
+
+import asyncio
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+
+from imagenes import (
+    VARIANTES_CARRUSEL, VARIANTES_PRODUCTO, ImagenRechazada, a_rgb, abrir_imagen,
+    clave_contenido, construir_srcset, generar_variantes, tamano_archivo, validar_tamano,
+)
+from storage_queue import BUCKET_CARRUSEL, BUCKET_PRODUCTOS, deletion_queue
+from supabase_client import get_storage_client
+
+# ========================================
+# CONFIGURACIÓN
+# ========================================
+
+# Procesamiento de imágenes: Pillow libera el GIL al decodificar/redimensionar,
+# así que un pool de hilos procesa varias fotos en paralelo sin bloquear el loop
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Subidas simultáneas al storage (compartido por todos los buckets)
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+_image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="imagenes")
+_upload_semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+# Política de cada bucket:
+#   prefijo          nombre de los objetos (<prefijo>_<clave o uuid>[_<ancho>].<ext>)
+#   max_size         caja del JPEG de respaldo
+#   calidad_jpeg     calidad del JPEG de respaldo
+#   variantes        anchos de las variantes WebP/AVIF
+#   variantes_del_original  las variantes salen del original y no del JPEG
+#                    reducido (la de zoom de productos supera los 1200px)
+#   por_contenido    nombre por sha256 del archivo: una foto repetida se
+#                    reutiliza y subir es idempotente (upsert)
+POLITICAS_BUCKET: Dict[str, Dict[str, Any]] = {
+    BUCKET_PRODUCTOS: {
+        "prefijo": "producto",
+        "max_size": (1200, 1200),
+        "calidad_jpeg": 85,
+        "variantes": VARIANTES_PRODUCTO,
+        "variantes_del_original": True,
+        "por_contenido": True,
+    },
+    BUCKET_CARRUSEL: {
+        "prefijo": "carousel",
+        "max_size": (1920, 1080),
+        "calidad_jpeg": 90,
+        "variantes": VARIANTES_CARRUSEL,
+        "variantes_del_original": False,
+        "por_contenido": False,
+    },
+}
+
+# (bucket, clave) -> estructura srcset de una imagen ya subida, o None
+BuscarExistente = Callable[[str], Awaitable[Optional[Dict[str, str]]]]
+
+
+# ========================================
+# MÉTRICAS
+# ========================================
+
+_lock_metricas = threading.Lock()
+_metricas: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+
+def _medir(bucket: str, operacion: str, inicio: float, objetos: int = 1, bytes_: int = 0):
+    """Acumula duración, objetos y bytes de una operación sobre un bucket"""
+    duracion = time.perf_counter() - inicio
+    with _lock_metricas:
+        m = _metricas.setdefault((bucket, operacion), {"calls": 0, "objects": 0, "bytes": 0, "total": 0.0, "max": 0.0})
+        m["calls"] += 1
+        m["objects"] += objetos
+        m["bytes"] += bytes_
+        m["total"] += duracion
+        m["max"] = max(m["max"], duracion)
+
+
+def storage_stats() -> Dict[str, Any]:
+    """Métricas por bucket y operación (procesar, subir, reutilizar, borrar)"""
+    with _lock_metricas:
+        resultado: Dict[str, Any] = {}
+        for (bucket, operacion), m in _metricas.items():
+            resultado.setdefault(bucket, {})[operacion] = {
+                "calls": m["calls"],
+                "objects": m["objects"],
+                "bytes": m["bytes"],
+                "avg_ms": round(m["total"] / m["calls"] * 1000, 2),
+                "max_ms": round(m["max"] * 1000, 2),
+            }
+        return resultado
+
+
+# ========================================
+# PROCESADO
+# ========================================
+
+def procesar_imagen(fileobj: BinaryIO, politica: Dict[str, Any]) -> Tuple[bytes, List[dict]]:
+    """
+    JPEG de respaldo + variantes responsivas según la política del bucket
+
+    Lee directamente del archivo subido (no de una copia en memoria) y
+    cierra cada imagen decodificada en cuanto deja de usarse.
+
+    Returns:
+        (JPEG de hasta ``max_size``, variantes WebP/AVIF)
+
+    Raises:
+        ImagenRechazada: Si supera MAX_IMAGE_PIXELS
+    """
+    from PIL import Image
+
+    max_size, anchos = politica["max_size"], politica["variantes"]
+    ancho_necesario = max(max_size[0], *anchos.values()) if politica["variantes_del_original"] else max_size[0]
+    original = abrir_imagen(fileobj, ancho_necesario)
+    image = a_rgb(original)
+    if image is not original:
+        original.close()
+
+    try:
+        if politica["variantes_del_original"]:
+            variantes = generar_variantes(image, anchos)
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        else:
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+            variantes = generar_variantes(image, anchos)
+
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=politica["calidad_jpeg"], optimize=True)
+        return output.getvalue(), variantes
+    finally:
+        image.close()
+
+
+# ========================================
+# SUBIDA
+# ========================================
+
+async def _subir_objeto(bucket: str, path: str, contenido: bytes, content_type: str, upsert: bool) -> str:
+    """Sube un objeto y devuelve su URL pública"""
+    # El cliente de storage es síncrono: se sube en un hilo, con tope de concurrencia
+    storage = get_storage_client().storage
+    async with _upload_semaphore:
+        await asyncio.to_thread(
+            storage.from_(bucket).upload,
+            path=path,
+            file=contenido,
+            file_options={"content-type": content_type, "upsert": "true" if upsert else "false"}
+        )
+    return storage.from_(bucket).get_public_url(path)
+
+
+async def subir_objetos(bucket: str, objetos: List[Tuple[str, bytes, str]], upsert: bool = False) -> List[str]:
+    """
+    Sube un lote de objetos en paralelo (acotado por UPLOAD_CONCURRENCY)
+
+    Args:
+        objetos: (path, contenido, content-type) de cada objeto
+
+    Returns:
+        URLs públicas, en el orden de ``objetos``
+    """
+    inicio = time.perf_counter()
+    urls = await asyncio.gather(*(
+        _subir_objeto(bucket, path, contenido, mime, upsert) for path, contenido, mime in objetos
+    ))
+    _medir(bucket, "subir", inicio, len(objetos), sum(len(contenido) for _, contenido, _ in objetos))
+    return urls
+
+
+async def subir_imagen(bucket: str, file: UploadFile, buscar_existente: Optional[BuscarExistente] = None) -> Dict[str, str]:
+    """
+    Procesa y sube una imagen con sus variantes según la política del bucket
+
+    En buckets ``por_contenido``, si ``buscar_existente`` encuentra la
+    misma foto (por su clave) se devuelven sus URLs sin redimensionar ni
+    subir nada.
+
+    Returns:
+        {"src": URL del JPEG, "webp": srcset, "avif": srcset (si hay codec)}
+
+    Raises:
+        HTTPException: 400 vacía o ilegible, 413 demasiado grande, 500 al subir
+    """
+    politica = POLITICAS_BUCKET[bucket]
+
+    # Starlette ya volcó el archivo a un SpooledTemporaryFile (disco si es grande):
+    # se valida el tamaño y Pillow lee de ahí, sin copiar los bytes a memoria
+    file_size = file.size if file.size is not None else tamano_archivo(file.file)
+
+    if not file_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo está vacío"
+        )
+
+    loop = asyncio.get_running_loop()
+    try:
+        validar_tamano(file_size)
+
+        if politica["por_contenido"]:
+            clave = await loop.run_in_executor(_image_executor, clave_contenido, file.file)
+            # Antes de buscar/reutilizar: un borrado pendiente de la misma foto ya no la toca
+            await deletion_queue.proteger(bucket, [f"{politica['prefijo']}_{clave}"])
+            if buscar_existente is not None:
+                inicio = time.perf_counter()
+                existente = await buscar_existente(clave)
+                if existente:
+                    _medir(bucket, "reutilizar", inicio)
+                    print(f"♻️ Imagen reutilizada: {clave}")
+                    return existente
+        else:
+            clave = str(uuid.uuid4())
+
+        inicio = time.perf_counter()
+        optimized_content, variantes = await loop.run_in_executor(_image_executor, procesar_imagen, file.file, politica)
+        _medir(bucket, "procesar", inicio, bytes_=file_size)
+    except ImagenRechazada as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error al procesar imagen: {str(e)}"
+        )
+    finally:
+        await file.close()
+
+    base_name = f"{politica['prefijo']}_{clave}"
+
+    try:
+        src, *variant_urls = await subir_objetos(
+            bucket,
+            [(f"{base_name}.jpg", optimized_content, "image/jpeg")]
+            + [(f"{base_name}_{v['ancho']}.{v['ext']}", v["contenido"], v["mime"]) for v in variantes],
+            upsert=politica["por_contenido"],
+        )
+        return construir_srcset(
+            src, [(v["formato"], v["ancho"], url) for v, url in zip(variantes, variant_urls)]
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al subir imagen: {str(e)}"
+        )
+
+
+async def subir_imagenes(
+    bucket: str,
+    files: List[UploadFile],
+    buscar_existente: Optional[BuscarExistente] = None,
+) -> Tuple[List[Dict[str, str]], List[dict]]:
+    """
+    Procesa y sube varias imágenes en paralelo
+
+    La latencia total es la de la imagen más lenta (acotada por
+    IMAGE_WORKERS y UPLOAD_CONCURRENCY). Las imágenes conservan el orden
+    de ``files``; una imagen que falla no impide subir las demás.
+
+    Returns:
+        (estructuras srcset subidas, fallos [{"archivo", "error"}])
+    """
+    resultados = await asyncio.gather(
+        *(subir_imagen(bucket, file, buscar_existente) for file in files),
+        return_exceptions=True
+    )
+
+    imagenes, fallidas = [], []
+    for file, resultado in zip(files, resultados):
+        if isinstance(resultado, BaseException):
+            error = resultado.detail if isinstance(resultado, HTTPException) else str(resultado)
+            print(f"⚠️ Error subiendo {file.filename}: {error}")
+            fallidas.append({"archivo": file.filename, "error": error})
+        else:
+            imagenes.append(resultado)
+    return imagenes, fallidas
+
+
+# ========================================
+# BORRADO
+# ========================================
+
+async def borrar_objetos(bucket: str, urls: List[Optional[str]]) -> int:
+    """
+    Borra objetos (por URL o nombre) del bucket en lotes vía ``deletion_queue``
+
+    Pensada para ejecutarse como BackgroundTask, tras enviar la respuesta:
+    vacía en ese momento la cola del bucket (con lo que hubiera quedado
+    pendiente de llamadas anteriores). En una instancia serverless no hay
+    un después con el que contar.
+
+    Returns:
+        Objetos borrados del bucket en este flush
+    """
+    inicio = time.perf_counter()
+    urls = [url for url in urls if url]
+    deletion_queue.enqueue(bucket, urls)
+    borrados = await deletion_queue.flush(bucket)
+    _medir(bucket, "borrar", inicio, len(urls))
+    return borrados
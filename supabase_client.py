@@ -1,22 +1,79 @@
 # supabase_client.py - Cliente REST para Supabase (Serverless-friendly)
 
 import os
-import requests
-from typing import Optional, Dict, Any, List
+import re
+from urllib.parse import quote
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import httpx
+    import requests
+
 load_dotenv()
 
-class SupabaseClient:
-    """Cliente REST para Supabase - Compatible con Vercel Serverless"""
-    
+# ========== CONFIGURACIÓN DEL TRANSPORTE HTTP ==========
+# Un solo Session por proceso: en una instancia serverless "caliente" las
+# conexiones TCP+TLS a Supabase se reutilizan entre peticiones (keep-alive).
+# httpx / requests / supabase se importan en el primer uso, no al arrancar.
+POOL_CONNECTIONS = int(os.getenv("SUPABASE_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("SUPABASE_POOL_MAXSIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "15"))
+
+# Ordenamientos permitidos para productos (nombre público -> order de PostgREST).
+# Siempre terminan en id para que la paginación sea estable entre páginas.
+ORDENES_PRODUCTOS = {
+    "default": "created_at.desc,id.desc",
+    "nombre-asc": "nombre.asc,id.asc",
+    "nombre-desc": "nombre.desc,id.desc",
+    "precio-asc": "precio.asc.nullsfirst,id.asc",
+    "precio-desc": "precio.desc.nullslast,id.desc",
+    "destacados": "destacado.desc,nombre.asc,id.asc",
+    "stock-desc": "stock.desc,id.desc",
+}
+
+
+# Columnas de códigos de un solo uso por las que se puede buscar un usuario
+# (cada una tiene su índice parcial, ver migrations/001_usuarios_codigos_idx.sql)
+CODIGOS_USUARIO = ("verification_code", "password_reset_code", "pending_email_code")
+
+
+# ========== HELPERS DE RESPUESTA ==========
+
+def _first(response, ok_codes=(200,)) -> Optional[Dict[str, Any]]:
+    """Devuelve la primera fila de la respuesta o None"""
+    if response.status_code in ok_codes:
+        rows = response.json()
+        return rows[0] if rows else None
+    return None
+
+def _rows(response) -> List[Dict[str, Any]]:
+    """Devuelve todas las filas de la respuesta o lista vacía"""
+    if response.status_code in (200, 206):
+        return response.json()
+    return []
+
+def _total(response) -> Optional[int]:
+    """Total de filas desde Content-Range ("0-11/57" o "*/57") con count=exact"""
+    content_range = response.headers.get("Content-Range", "")
+    _, _, total = content_range.partition("/")
+    return int(total) if total.isdigit() else None
+
+# Cabecera para pedir a PostgREST el total de filas en Content-Range
+COUNT_EXACT = {"Prefer": "count=exact"}
+
+
+class _SupabaseBase:
+    """Configuración y construcción de queries compartidas por ambos clientes"""
+
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL")
         self.key = os.getenv("SUPABASE_KEY")
-        
+
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL y SUPABASE_KEY deben estar configuradas")
-        
+
         self.rest_url = f"{self.url}/rest/v1"
         self.headers = {
             "apikey": self.key,
@@ -24,178 +81,418 @@ class SupabaseClient:
             "Content-Type": "application/json",
             "Prefer": "return=representation"
         }
-    
-    def _request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
-        """Realiza una petición HTTP a Supabase REST API"""
+
+    @staticmethod
+    def _productos_query(filters: Dict[str, Any] = None) -> str:
+        """Construye la query de productos con filtros opcionales"""
+        query_parts = ["productos?select=*"]
+
+        if filters:
+            if filters.get("categoria"):
+                query_parts.append(f"categoria=eq.{filters['categoria']}")
+            if filters.get("destacado") is not None:
+                query_parts.append(f"destacado=eq.{filters['destacado']}")
+            if filters.get("activo") is not None:
+                query_parts.append(f"activo=eq.{filters['activo']}")
+            if filters.get("precio_min") is not None:
+                query_parts.append(f"precio=gte.{filters['precio_min']}")
+            if filters.get("precio_max") is not None:
+                query_parts.append(f"precio=lte.{filters['precio_max']}")
+            if filters.get("stock_min") is not None:
+                query_parts.append(f"stock=gte.{filters['stock_min']}")
+            if filters.get("after"):
+                query_parts.append(_SupabaseBase._keyset_filter(*filters["after"]))
+            if "after" in filters:
+                # Keyset: solo válido con el orden por defecto (created_at, id),
+                # también en la primera página (after=None)
+                query_parts.append(f"order={ORDENES_PRODUCTOS['default']}")
+            elif filters.get("order"):
+                query_parts.append(f"order={ORDENES_PRODUCTOS[filters['order']]}")
+
+            skip = filters.get("skip", 0)
+            limit = filters.get("limit", 100)
+            query_parts.append(f"offset={skip}")
+            query_parts.append(f"limit={limit}")
+
+        return "&".join(query_parts)
+
+    @staticmethod
+    def _keyset_filter(created_at: str, row_id: str) -> str:
+        """Filas estrictamente después de (created_at, id) en orden descendente"""
+        expr = f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id}))'
+        return "or=" + quote(expr, safe='(),."')
+
+    @staticmethod
+    def _users_page_query(limit: int, after: Optional[Tuple[str, str]] = None) -> str:
+        """Página keyset de usuarios ordenada por (created_at, id) descendente"""
+        query = f"usuarios?select=*&order=created_at.desc,id.desc&limit={limit}"
+        if after:
+            query += "&" + _SupabaseBase._keyset_filter(*after)
+        return query
+
+    @staticmethod
+    def _user_by_code_query(column: str, code: str) -> str:
+        """Query de usuario por código de un solo uso (igualdad indexada)"""
+        if column not in CODIGOS_USUARIO:
+            raise ValueError(f"Columna de código no permitida: {column}")
+        return f"usuarios?{column}=eq.{quote(code, safe='')}&select=*&limit=1"
+
+    @staticmethod
+    def _users_count_query(rol: Optional[str] = None) -> str:
+        """Query sin filas para contar usuarios (el total llega en Content-Range)"""
+        query = "usuarios?select=id"
+        if rol is not None:
+            query += f"&rol=eq.{quote(rol, safe='')}"
+        return query
+
+    @staticmethod
+    def _productos_imagenes_query(skip: int, limit: int) -> str:
+        """Solo las columnas de imágenes, en orden estable para paginar"""
+        return (
+            "productos?select=id,imagen_url,imagenes_urls,imagenes_variantes"
+            f"&order=id.asc&offset={skip}&limit={limit}"
+        )
+
+    @staticmethod
+    def _productos_by_imagen_query(clave: str, exclude_id: Optional[str] = None, limit: int = 1) -> str:
+        """Productos cuyas imágenes contienen la clave de contenido (hex)"""
+        if not re.fullmatch(r"[0-9a-f]+", clave):
+            raise ValueError(f"Clave de imagen no válida: {clave}")
+        query = f"productos?select=id,imagenes_urls,imagenes_variantes&imagenes_urls=like.*{clave}*&limit={limit}"
+        if exclude_id is not None:
+            query += f"&id=neq.{exclude_id}"
+        return query
+
+    @staticmethod
+    def _carrusel_query(activo: Optional[bool] = None) -> str:
+        """Construye la query del carrusel"""
+        query = "carrusel?select=*&order=orden.asc"
+
+        if activo is not None:
+            query += f"&activo=eq.{activo}"
+        return query
+
+
+class SupabaseClient(_SupabaseBase):
+    """
+    Cliente REST síncrono para Supabase
+
+    Fachada para scripts y tareas fuera del event loop (p.ej. startup).
+    Los routers async usan ``AsyncSupabaseClient``.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self._session: Optional["requests.Session"] = None
+
+    @property
+    def session(self) -> "requests.Session":
+        """Sesión compartida (se crea en el primer uso)"""
+        if self._session is None:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> "requests.Session":
+        """Crea la sesión HTTP persistente con pool de conexiones keep-alive"""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            pool_block=False
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def _request(self, method: str, endpoint: str, **kwargs) -> "requests.Response":
+        """
+        Realiza una petición HTTP a Supabase REST API
+
+        Usa la sesión compartida (reutiliza conexiones). Acepta ``timeout``
+        por llamada; si no se indica se usa (CONNECT_TIMEOUT, READ_TIMEOUT).
+        """
         url = f"{self.rest_url}/{endpoint}"
-        
-        if "headers" in kwargs:
-            headers = {**self.headers, **kwargs["headers"]}
-            kwargs["headers"] = headers
-        else:
-            kwargs["headers"] = self.headers
-        
-        response = requests.request(method, url, **kwargs)
+        kwargs.setdefault("timeout", self.timeout)
+
+        response = self.session.request(method, url, **kwargs)
         return response
-    
+
+    def close(self):
+        """Cierra las conexiones del pool"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
     # ========== USUARIOS ==========
-    
+
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Obtiene un usuario por email"""
-        response = self._request("GET", f"usuarios?email=eq.{email}&select=*")
-        
-        if response.status_code == 200:
-            users = response.json()
-            return users[0] if users else None
-        return None
-    
+        return _first(self._request("GET", f"usuarios?email=eq.{email}&select=*"))
+
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene un usuario por ID"""
-        response = self._request("GET", f"usuarios?id=eq.{user_id}&select=*")
-        
-        if response.status_code == 200:
-            users = response.json()
-            return users[0] if users else None
-        return None
-    
+        return _first(self._request("GET", f"usuarios?id=eq.{user_id}&select=*"))
+
+    def get_user_by_code(self, column: str, code: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el usuario que tiene ``code`` en la columna de código indicada"""
+        if not code:
+            return None
+        return _first(self._request("GET", self._user_by_code_query(column, code)))
+
     def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo usuario"""
-        response = self._request("POST", "usuarios", json=user_data)
-        
-        if response.status_code in [200, 201]:
-            users = response.json()
-            return users[0] if users else None
-        return None
-    
+        return _first(self._request("POST", "usuarios", json=user_data), (200, 201))
+
     def update_user(self, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Actualiza un usuario"""
-        response = self._request("PATCH", f"usuarios?id=eq.{user_id}", json=updates)
-        
-        if response.status_code == 200:
-            users = response.json()
-            return users[0] if users else None
-        return None
-    
+        return _first(self._request("PATCH", f"usuarios?id=eq.{user_id}", json=updates))
+
     def delete_user(self, user_id: str) -> bool:
         """Elimina un usuario"""
         response = self._request("DELETE", f"usuarios?id=eq.{user_id}")
         return response.status_code == 204
-    
+
     def get_all_users(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """Obtiene todos los usuarios"""
-        response = self._request(
-            "GET", 
-            f"usuarios?select=*&offset={skip}&limit={limit}"
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        return []
-    
+        return _rows(self._request("GET", f"usuarios?select=*&offset={skip}&limit={limit}"))
+
+    def get_users_page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Obtiene usuarios después del cursor (created_at, id)"""
+        return _rows(self._request("GET", self._users_page_query(limit, after)))
+
+    def count_users(self, rol: Optional[str] = None) -> Optional[int]:
+        """Cuenta usuarios (opcionalmente por rol) con HEAD + count=exact, sin traer filas"""
+        return _total(self._request("HEAD", self._users_count_query(rol), headers=COUNT_EXACT))
+
     # ========== PRODUCTOS ==========
-    
+
     def get_productos(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Obtiene productos con filtros opcionales"""
-        query_parts = ["productos?select=*"]
-        
-        if filters:
-            if filters.get("categoria"):
-                query_parts.append(f"categoria=eq.{filters['categoria']}")
-            if filters.get("destacado") is not None:
-                query_parts.append(f"destacado=eq.{filters['destacado']}")
-            if filters.get("activo") is not None:
-                query_parts.append(f"activo=eq.{filters['activo']}")
-            
-            skip = filters.get("skip", 0)
-            limit = filters.get("limit", 100)
-            query_parts.append(f"offset={skip}")
-            query_parts.append(f"limit={limit}")
-        
-        query = "&".join(query_parts)
-        response = self._request("GET", query)
-        
-        if response.status_code == 200:
-            return response.json()
-        return []
-    
+        return _rows(self._request("GET", self._productos_query(filters)))
+
+    def get_productos_con_total(self, filters: Dict[str, Any] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Obtiene una página de productos y el total que cumple los filtros"""
+        response = self._request("GET", self._productos_query(filters), headers=COUNT_EXACT)
+        return _rows(response), _total(response)
+
     def get_producto_by_id(self, producto_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene un producto por ID"""
-        response = self._request("GET", f"productos?id=eq.{producto_id}&select=*")
-        
-        if response.status_code == 200:
-            productos = response.json()
-            return productos[0] if productos else None
-        return None
-    
+        return _first(self._request("GET", f"productos?id=eq.{producto_id}&select=*"))
+
+    def get_productos_imagenes(self, skip: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Columnas de imágenes de todos los productos (barrido de huérfanos)"""
+        return _rows(self._request("GET", self._productos_imagenes_query(skip, limit)))
+
+    def get_productos_by_imagen(self, clave: str, exclude_id: Optional[str] = None, limit: int = 1) -> List[Dict[str, Any]]:
+        """Productos que referencian la imagen con esa clave de contenido"""
+        return _rows(self._request("GET", self._productos_by_imagen_query(clave, exclude_id, limit)))
+
     def create_producto(self, producto_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo producto"""
-        response = self._request("POST", "productos", json=producto_data)
-        
-        if response.status_code in [200, 201]:
-            productos = response.json()
-            return productos[0] if productos else None
-        return None
-    
+        return _first(self._request("POST", "productos", json=producto_data), (200, 201))
+
     def update_producto(self, producto_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Actualiza un producto"""
-        response = self._request("PATCH", f"productos?id=eq.{producto_id}", json=updates)
-        
-        if response.status_code == 200:
-            productos = response.json()
-            return productos[0] if productos else None
-        return None
-    
+        return _first(self._request("PATCH", f"productos?id=eq.{producto_id}", json=updates))
+
     def delete_producto(self, producto_id: str) -> bool:
         """Elimina un producto"""
         response = self._request("DELETE", f"productos?id=eq.{producto_id}")
         return response.status_code == 204
-    
+
     # ========== CARRUSEL ==========
-    
+
     def get_carrusel_items(self, activo: Optional[bool] = None) -> List[Dict[str, Any]]:
         """Obtiene items del carrusel"""
-        query = "carrusel?select=*&order=orden.asc"
-        
-        if activo is not None:
-            query += f"&activo=eq.{activo}"
-        
-        response = self._request("GET", query)
-        
-        if response.status_code == 200:
-            return response.json()
-        return []
-    
+        return _rows(self._request("GET", self._carrusel_query(activo)))
+
     def get_carrusel_by_id(self, carrusel_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene un item del carrusel por ID"""
-        response = self._request("GET", f"carrusel?id=eq.{carrusel_id}&select=*")
-        
-        if response.status_code == 200:
-            items = response.json()
-            return items[0] if items else None
-        return None
-    
+        return _first(self._request("GET", f"carrusel?id=eq.{carrusel_id}&select=*"))
+
     def create_carrusel(self, carrusel_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Crea un nuevo item del carrusel"""
-        response = self._request("POST", "carrusel", json=carrusel_data)
-        
-        if response.status_code in [200, 201]:
-            items = response.json()
-            return items[0] if items else None
-        return None
-    
+        return _first(self._request("POST", "carrusel", json=carrusel_data), (200, 201))
+
     def update_carrusel(self, carrusel_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Actualiza un item del carrusel"""
-        response = self._request("PATCH", f"carrusel?id=eq.{carrusel_id}", json=updates)
-        
-        if response.status_code == 200:
-            items = response.json()
-            return items[0] if items else None
-        return None
-    
+        return _first(self._request("PATCH", f"carrusel?id=eq.{carrusel_id}", json=updates))
+
     def delete_carrusel(self, carrusel_id: str) -> bool:
         """Elimina un item del carrusel"""
         response = self._request("DELETE", f"carrusel?id=eq.{carrusel_id}")
         return response.status_code == 204
 
-# Instancia global
-supabase = SupabaseClient()
\ No newline at end of file
+
+class AsyncSupabaseClient(_SupabaseBase):
+    """
+    Cliente REST asíncrono para Supabase (httpx)
+
+    Misma superficie de métodos que ``SupabaseClient`` pero con ``await``,
+    para que los handlers async no bloqueen el event loop de uvicorn.
+    El ``httpx.AsyncClient`` se crea de forma perezosa en el primer uso
+    y mantiene su propio pool de conexiones keep-alive.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Cliente httpx compartido (se crea en el primer uso)"""
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.rest_url,
+                headers=self.headers,
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=POOL_MAXSIZE,
+                    max_keepalive_connections=POOL_MAXSIZE
+                )
+            )
+        return self._client
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> "httpx.Response":
+        """
+        Realiza una petición HTTP asíncrona a Supabase REST API
+
+        Acepta ``timeout`` por llamada (segundos o ``httpx.Timeout``).
+        """
+        return await self.client.request(method, f"/{endpoint}", **kwargs)
+
+    async def aclose(self):
+        """Cierra las conexiones del pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ========== USUARIOS ==========
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un usuario por email"""
+        return _first(await self._request("GET", f"usuarios?email=eq.{email}&select=*"))
+
+    async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un usuario por ID"""
+        return _first(await self._request("GET", f"usuarios?id=eq.{user_id}&select=*"))
+
+    async def get_user_by_code(self, column: str, code: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el usuario que tiene ``code`` en la columna de código indicada"""
+        if not code:
+            return None
+        return _first(await self._request("GET", self._user_by_code_query(column, code)))
+
+    async def create_user(self, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Crea un nuevo usuario"""
+        return _first(await self._request("POST", "usuarios", json=user_data), (200, 201))
+
+    async def update_user(self, user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Actualiza un usuario"""
+        return _first(await self._request("PATCH", f"usuarios?id=eq.{user_id}", json=updates))
+
+    async def delete_user(self, user_id: str) -> bool:
+        """Elimina un usuario"""
+        response = await self._request("DELETE", f"usuarios?id=eq.{user_id}")
+        return response.status_code == 204
+
+    async def get_all_users(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Obtiene todos los usuarios"""
+        return _rows(await self._request("GET", f"usuarios?select=*&offset={skip}&limit={limit}"))
+
+    async def get_users_page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Obtiene usuarios después del cursor (created_at, id)"""
+        return _rows(await self._request("GET", self._users_page_query(limit, after)))
+
+    async def count_users(self, rol: Optional[str] = None) -> Optional[int]:
+        """Cuenta usuarios (opcionalmente por rol) con HEAD + count=exact, sin traer filas"""
+        return _total(await self._request("HEAD", self._users_count_query(rol), headers=COUNT_EXACT))
+
+    # ========== PRODUCTOS ==========
+
+    async def get_productos(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Obtiene productos con filtros opcionales"""
+        return _rows(await self._request("GET", self._productos_query(filters)))
+
+    async def get_productos_con_total(self, filters: Dict[str, Any] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Obtiene una página de productos y el total que cumple los filtros"""
+        response = await self._request("GET", self._productos_query(filters), headers=COUNT_EXACT)
+        return _rows(response), _total(response)
+
+    async def get_producto_by_id(self, producto_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un producto por ID"""
+        return _first(await self._request("GET", f"productos?id=eq.{producto_id}&select=*"))
+
+    async def get_productos_imagenes(self, skip: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Columnas de imágenes de todos los productos (barrido de huérfanos)"""
+        return _rows(await self._request("GET", self._productos_imagenes_query(skip, limit)))
+
+    async def get_productos_by_imagen(self, clave: str, exclude_id: Optional[str] = None, limit: int = 1) -> List[Dict[str, Any]]:
+        """Productos que referencian la imagen con esa clave de contenido"""
+        return _rows(await self._request("GET", self._productos_by_imagen_query(clave, exclude_id, limit)))
+
+    async def create_producto(self, producto_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Crea un nuevo producto"""
+        return _first(await self._request("POST", "productos", json=producto_data), (200, 201))
+
+    async def update_producto(self, producto_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Actualiza un producto"""
+        return _first(await self._request("PATCH", f"productos?id=eq.{producto_id}", json=updates))
+
+    async def delete_producto(self, producto_id: str) -> bool:
+        """Elimina un producto"""
+        response = await self._request("DELETE", f"productos?id=eq.{producto_id}")
+        return response.status_code == 204
+
+    # ========== CARRUSEL ==========
+
+    async def get_carrusel_items(self, activo: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Obtiene items del carrusel"""
+        return _rows(await self._request("GET", self._carrusel_query(activo)))
+
+    async def get_carrusel_by_id(self, carrusel_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene un item del carrusel por ID"""
+        return _first(await self._request("GET", f"carrusel?id=eq.{carrusel_id}&select=*"))
+
+    async def create_carrusel(self, carrusel_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Crea un nuevo item del carrusel"""
+        return _first(await self._request("POST", "carrusel", json=carrusel_data), (200, 201))
+
+    async def update_carrusel(self, carrusel_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Actualiza un item del carrusel"""
+        return _first(await self._request("PATCH", f"carrusel?id=eq.{carrusel_id}", json=updates))
+
+    async def delete_carrusel(self, carrusel_id: str) -> bool:
+        """Elimina un item del carrusel"""
+        response = await self._request("DELETE", f"carrusel?id=eq.{carrusel_id}")
+        return response.status_code == 204
+
+# Instancias globales
+supabase = SupabaseClient()
+supabase_async = AsyncSupabaseClient()
+
+
+# ========== STORAGE ==========
+
+_storage_client = None
+
+
+def get_storage_client():
+    """
+    Cliente de Supabase (supabase-py) para Storage, compartido por todo el proceso
+
+    Se crea en el primer uso: importar ``supabase`` y construir el cliente
+    no retrasa el arranque de las peticiones que no tocan imágenes.
+    """
+    global _storage_client
+    if _storage_client is None:
+        from supabase import create_client
+        _storage_client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return _storage_client
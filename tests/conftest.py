@@ -0,0 +1,13 @@
+# tests/conftest.py - Entorno mínimo para importar la aplicación sin servicios externos
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Los clientes se crean sin conectar: basta con que la configuración exista
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "test")
+os.environ.setdefault("URL_DATABASE", "postgresql://u:p@127.0.0.1:9/db")
+os.environ.setdefault("SECRET_KEY", "test")
@@ -0,0 +1,92 @@
+# tests/test_auth_claims.py - Los claims del token siguen a los cambios del usuario
+
+import asyncio
+import sys
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware.sessions import SessionMiddleware
+
+import auth
+from repositories import users
+
+USER_ID = str(uuid.uuid4())
+
+
+@pytest.fixture
+def usuario(monkeypatch):
+    """Usuario en memoria detrás del repositorio"""
+    fila = {
+        "id": USER_ID,
+        "email": "ana@example.com",
+        "nombre": "Ana",
+        "rol": "usuario",
+        "email_verified": False,
+        "verification_code": "123456",
+        "verification_expires": None,
+        "token_version": 0,
+    }
+
+    async def get_by_id(user_id):
+        return dict(fila) if user_id == fila["id"] else None
+
+    async def get_by_code(column, code):
+        return dict(fila) if fila.get(column) == code else None
+
+    async def update(user_id, updates):
+        fila.update(updates)
+        return dict(fila)
+
+    monkeypatch.setattr(users, "get_by_id", get_by_id)
+    monkeypatch.setattr(users, "get_by_code", get_by_code)
+    monkeypatch.setattr(users, "update", update)
+    auth.invalidate_token_version(USER_ID)
+    return fila
+
+
+@pytest.fixture
+def client():
+    import routers  # noqa: F401  (registra los submódulos)
+    app = FastAPI()
+    app.add_middleware(SessionMiddleware, secret_key="test")
+    app.include_router(sys.modules["routers.auth_router"].router, prefix="/api")
+    return TestClient(app)
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_verificar_email_emite_token_con_claims_nuevos(usuario, client):
+    viejo = auth.create_user_token(usuario)
+
+    response = client.post("/api/auth/verify-email-code", json={"code": "123456"}, headers=_bearer(viejo))
+    assert response.status_code == 200
+
+    nuevo = response.json()["access_token"]
+    claims = auth.decode_access_token(nuevo)
+    assert claims["email_verified"] is True
+    assert claims["ver"] == 1
+
+    assert asyncio.run(auth.get_user_from_token(nuevo))["email_verified"] is True
+    assert asyncio.run(auth.get_user_from_token(viejo)) is None
+
+
+def test_verificar_por_enlace_revoca_tokens_viejos(usuario, client):
+    viejo = auth.create_user_token(usuario)
+
+    response = client.get("/api/auth/verify-email?code=123456", follow_redirects=False)
+    assert response.headers["location"] == "/perfil?verified=ok"
+    assert usuario["email_verified"] is True
+    assert asyncio.run(auth.get_user_from_token(viejo)) is None
+
+
+def test_cambiar_nombre_emite_token_con_nombre_nuevo(usuario, client):
+    viejo = auth.create_user_token(usuario)
+
+    response = client.put("/api/auth/me?nombre=Ana%20María", headers=_bearer(viejo))
+    assert response.status_code == 200
+    assert auth.decode_access_token(response.json()["access_token"])["nombre"] == "Ana María"
+    assert asyncio.run(auth.get_user_from_token(viejo)) is None
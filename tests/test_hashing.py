@@ -0,0 +1,31 @@
+# tests/test_hashing.py - Admisión del pool de bcrypt
+
+import asyncio
+import threading
+
+import pytest
+
+from hashing import BoundedHashPool, HashPoolSaturado
+
+
+def test_cancelar_la_espera_no_libera_el_hueco():
+    pool = BoundedHashPool(workers=1, max_pending=1)
+    liberar = threading.Event()
+
+    async def escenario():
+        tarea = asyncio.ensure_future(pool.run(liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        tarea.cancel()  # el cliente se desconecta; bcrypt sigue en el hilo
+        await asyncio.sleep(0.05)
+        assert pool.stats()["pending"] == 1
+        with pytest.raises(HashPoolSaturado):
+            await pool.run(lambda: None)
+
+        liberar.set()
+        for _ in range(100):
+            if pool.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.run(lambda: "ok") == "ok"
+
+    asyncio.run(escenario())
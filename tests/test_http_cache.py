@@ -0,0 +1,34 @@
+# tests/test_http_cache.py - Validadores HTTP de la API pública
+
+from starlette.requests import Request
+
+from http_cache import conditional_json
+
+PRODUCTO = {"id": "1", "nombre": "Anillo", "updated_at": "2024-05-01T10:00:00+00:00"}
+OTRO = {"id": "2", "nombre": "Cadena", "updated_at": "2024-04-01T10:00:00+00:00"}
+DESPUES = "Wed, 01 May 2024 12:00:00 GMT"
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def test_recurso_individual_respeta_if_modified_since():
+    response = conditional_json(_request(if_modified_since=DESPUES), PRODUCTO, "producto")
+    assert response.status_code == 304
+    assert "last-modified" in response.headers
+
+
+def test_listado_sin_last_modified_ni_304_por_fecha():
+    """Borrar OTRO no cambia la fila más reciente: solo el ETag lo detecta"""
+    antes = conditional_json(_request(), [PRODUCTO, OTRO], "productos")
+    assert "last-modified" not in antes.headers
+
+    despues = conditional_json(_request(if_modified_since=DESPUES), [PRODUCTO], "productos")
+    assert despues.status_code == 200
+
+    revalidado = conditional_json(_request(if_none_match=antes.headers["etag"]), [PRODUCTO], "productos")
+    assert revalidado.status_code == 200
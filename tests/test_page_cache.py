@@ -0,0 +1,19 @@
+# tests/test_page_cache.py - Clave de la caché de páginas
+
+from starlette.requests import Request
+
+from page_cache import PageCache
+
+
+def _request(path: str, query: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": []})
+
+
+def test_clave_ignora_parametros_que_la_pagina_no_lee():
+    assert PageCache.clave(_request("/anillos", "utm_source=x&r=123")) == PageCache.clave(_request("/anillos", ""))
+
+
+def test_clave_incluye_parametros_declarados():
+    a = PageCache.clave(_request("/anillos", "orden=precio&r=1"), params=["orden"])
+    b = PageCache.clave(_request("/anillos", "r=2&orden=precio"), params=["orden"])
+    assert a == b == ("pagina", "/anillos", (("orden", "precio"),))
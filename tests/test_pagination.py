@@ -0,0 +1,73 @@
+# tests/test_pagination.py - Cursores keyset y consulta de la primera página
+
+import asyncio
+import base64
+import json
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+from supabase_client import ORDENES_PRODUCTOS, _SupabaseBase
+
+ROW_ID = "6f1c2f8e-7d1a-4c55-9a43-0c6b7e3f2a10"
+
+
+def _cursor(created_at, row_id) -> str:
+    raw = json.dumps([created_at, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_roundtrip_normaliza():
+    cursor = encode_cursor({"created_at": "2024-05-01T10:00:00.123456+00:00", "id": ROW_ID.upper()})
+    assert decode_cursor(cursor) == ("2024-05-01T10:00:00.123456+00:00", ROW_ID)
+
+
+def test_cursor_vacio_es_primera_pagina():
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!!",
+    base64.urlsafe_b64encode(b"{}").decode(),
+    _cursor("ayer", ROW_ID),
+    _cursor("2024-05-01T10:00:00+00:00", "123"),
+    _cursor(1714557600, ROW_ID),
+])
+def test_cursor_malformado(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("created_at, row_id", [
+    ('2024-05-01")),or=(id.neq.0', ROW_ID),
+    ("2024-05-01T10:00:00+00:00", f"{ROW_ID}),or=(rol.eq.admin"),
+    ("2024-05-01T10:00:00+00:00", f"{ROW_ID}&select=password_hash"),
+])
+def test_cursor_con_filtro_inyectado(created_at, row_id):
+    with pytest.raises(ValueError):
+        decode_cursor(_cursor(created_at, row_id))
+
+
+def test_keyset_filter_solo_recibe_valores_normalizados():
+    after = decode_cursor(_cursor("2024-05-01T10:00:00+00:00", ROW_ID))
+    query = _SupabaseBase._productos_query({"after": after, "skip": 0, "limit": 13})
+    assert f"id.lt.{ROW_ID}" in query
+    assert f"order={ORDENES_PRODUCTOS['default']}" in query
+
+
+def test_primera_pagina_con_cursor_ordena(monkeypatch):
+    import sys
+    import routers  # noqa: F401  (registra los submódulos)
+    productos_router = sys.modules["routers.productos_router"]
+
+    consultas = []
+
+    async def listar(filters):
+        consultas.append(_SupabaseBase._productos_query(filters))
+        return []
+
+    monkeypatch.setattr(productos_router.products, "list", listar)
+    productos_router.catalog_cache.clear()
+    asyncio.run(productos_router.consultar_productos(activo=True, limit=12, cursor="", after=None))
+
+    assert consultas == ["productos?select=*&activo=eq.True&order=created_at.desc,id.desc&offset=0&limit=13"]
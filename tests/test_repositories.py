@@ -0,0 +1,14 @@
+# tests/test_repositories.py - Configuración de backends de los repositorios
+
+import pytest
+
+from repositories import _parse_backends
+
+
+def test_parse_backends():
+    assert _parse_backends("users=sql, products.list=rest,") == {"users": "sql", "products.list": "rest"}
+
+
+def test_backend_desconocido_falla_al_arrancar():
+    with pytest.raises(ValueError, match="users=sqll"):
+        _parse_backends("users=sqll")
@@ -0,0 +1,92 @@
+# tests/test_storage_queue.py - Cola de borrados del Storage: umbrales, referencias y protección
+
+import asyncio
+
+import pytest
+
+import storage_queue
+from storage_queue import StorageDeletionQueue
+
+BUCKET = "productos-images"
+CLAVE = "0123456789abcdef0123456789abcdef"
+
+
+@pytest.fixture
+def cola(monkeypatch):
+    cola = StorageDeletionQueue()
+    cola.borrados = []
+
+    async def remove(bucket, nombres):
+        cola.borrados.extend(nombres)
+
+    monkeypatch.setattr(cola, "_remove", remove)
+    return cola
+
+
+def test_un_solo_borrado_se_vacia_sin_otra_llamada(cola, monkeypatch):
+    import storage_service
+    monkeypatch.setattr(storage_service, "deletion_queue", cola)
+
+    asyncio.run(storage_service.borrar_objetos(BUCKET, ["https://x/storage/v1/object/public/b/a.jpg", None]))
+    assert cola.borrados == ["a.jpg"]
+    assert cola.pending() == 0
+
+
+def test_flush_de_un_bucket_no_toca_los_demas(cola):
+    cola.enqueue(BUCKET, ["a.jpg", "b.jpg"])
+    cola.enqueue("carrusel-images", ["c.jpg"])
+    assert asyncio.run(cola.flush(BUCKET)) == 2
+    assert cola.borrados == ["a.jpg", "b.jpg"]
+    assert cola.pending() == 1
+
+
+def test_referencia_nueva_se_comprueba_al_vaciar(cola):
+    nombre = f"producto_{CLAVE}.jpg"
+
+    async def en_uso(nombres):
+        return {nombre}
+
+    cola.verificar_con(BUCKET, en_uso)
+    cola.enqueue(BUCKET, [nombre, "producto_viejo.jpg"])
+    asyncio.run(cola.flush())
+    assert cola.borrados == ["producto_viejo.jpg"]
+    assert cola.pending() == 0
+
+
+def test_error_al_comprobar_no_borra(cola):
+    async def falla(nombres):
+        raise RuntimeError("bd caída")
+
+    cola.verificar_con(BUCKET, falla)
+    cola.enqueue(BUCKET, [f"producto_{CLAVE}.jpg"])
+    asyncio.run(cola.flush())
+    assert cola.borrados == []
+    assert cola.pending() == 1
+
+
+def test_subida_entre_comprobacion_y_borrado(cola):
+    """La misma foto se sube mientras el flush ya comprobó las referencias"""
+    async def en_uso(nombres):
+        await cola.proteger(BUCKET, [f"producto_{CLAVE}"])
+        return set()
+
+    cola.verificar_con(BUCKET, en_uso)
+    cola.enqueue(BUCKET, [f"producto_{CLAVE}.jpg", f"producto_{CLAVE}_800.webp"])
+    asyncio.run(cola.flush())
+    assert cola.borrados == []
+    assert cola.pending() == 2
+
+
+def test_lote_fallido_se_reintenta(cola, monkeypatch):
+    monkeypatch.setattr(storage_queue, "STORAGE_DELETE_BACKOFF", 0)
+    fallos = [RuntimeError("timeout")]
+
+    async def remove(bucket, nombres):
+        if fallos:
+            raise fallos.pop()
+        cola.borrados.extend(nombres)
+
+    monkeypatch.setattr(cola, "_remove", remove)
+    cola.enqueue(BUCKET, ["a.jpg"])
+    assert asyncio.run(cola.flush()) == 1
+    assert cola.failed_batches == 1